@@ -0,0 +1,207 @@
+"""
+Measure `cbincode` parse and stream throughput, and peak memory, on synthetic
+`Coin`, `CoinSpend` and `SpendBundle` workloads.
+
+Run from the repository root with `python -m benchmarks.bench_codec`. Use `--help`
+for the options that size the workloads. `--json PATH` writes the results in a
+machine-readable form (`-` for stdout) for tracking regressions.
+
+For each workload and each operation, this reports calls per second, bytes per
+second, and the peak memory `tracemalloc` sees during one call. Where `chia_rs`
+has a native type with the same serialization, its `from_bytes` and `to_bytes`
+are measured too, for comparison.
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+
+from typing import Any, Callable, Dict, List, Optional
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.cbincode import (
+    from_bytes,
+    make_compiled_parser,
+    make_compiled_streamer,
+    make_parser,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+def random_program(rng: random.Random, atoms: int, max_atom_size: int) -> Program:
+    "build a tree with `atoms` leaves of up to `max_atom_size` bytes"
+    if atoms <= 1:
+        return Program.to(rng.randbytes(rng.randint(0, max_atom_size)))
+    left = rng.randint(1, atoms - 1)
+    return Program.to(
+        (
+            random_program(rng, left, max_atom_size),
+            random_program(rng, atoms - left, max_atom_size),
+        )
+    )
+
+
+def make_workloads(
+    spends: int, atoms: int, max_atom_size: int, seed: int
+) -> Dict[str, Any]:
+    "build one sample of each workload"
+    rng = random.Random(seed)
+    coin_spends = []
+    for index in range(spends):
+        puzzle = random_program(rng, atoms, max_atom_size)
+        solution = random_program(rng, atoms, max_atom_size)
+        coin = Coin(std_hash(b"%d" % index), puzzle.tree_hash(), rng.randrange(1 << 40))
+        coin_spends.append(CoinSpend(coin, puzzle, solution))
+    signature = BLSSecretExponent.from_int(seed + 1).sign(b"bench")
+    return {
+        "Coin": coin_spends[0].coin,
+        "CoinSpend": coin_spends[0],
+        "SpendBundle": SpendBundle(coin_spends, signature),
+    }
+
+
+def operations(obj: Any, blob: bytes) -> Dict[str, Callable[[], Any]]:
+    "return the operations to measure for `obj`, keyed by name"
+    cls = type(obj)
+    parse = make_parser(cls)
+    stream = make_streamer(cls)
+    compiled_parse = make_compiled_parser(cls)
+    compiled_stream = make_compiled_streamer(cls)
+    ops: Dict[str, Callable[[], Any]] = {
+        "make_parser": lambda: parse(io.BytesIO(blob)),
+        "make_streamer": lambda: stream(obj, io.BytesIO()),
+        "make_compiled_parser": lambda: compiled_parse(io.BytesIO(blob)),
+        "make_compiled_streamer": lambda: compiled_stream(obj, io.BytesIO()),
+        "from_bytes": lambda: from_bytes(cls, blob),
+        "from_bytes_trusted": lambda: from_bytes(cls, blob, trusted=True),
+        "to_bytes": lambda: to_bytes(obj),
+    }
+    native = native_type(cls.__name__, blob)
+    if native is not None:
+        native_obj = native.from_bytes(blob)
+        ops["chia_rs.from_bytes"] = lambda: native.from_bytes(blob)
+        ops["chia_rs.to_bytes"] = lambda: native_obj.to_bytes()
+    return ops
+
+
+def native_type(name: str, blob: bytes) -> Optional[type]:
+    "return the `chia_rs` type called `name` if it serializes like we do"
+    try:
+        import chia_rs  # type: ignore
+    except ImportError:
+        return None
+    native = getattr(chia_rs, name, None)
+    if native is None:
+        return None
+    try:
+        if bytes(native.from_bytes(blob)) != blob:
+            return None
+    except Exception:
+        return None
+    return native
+
+
+def peak_memory(f: Callable[[], Any]) -> int:
+    "return the peak memory traced during one call to `f`"
+    f()
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(f: Callable[[], Any], min_time: float) -> float:
+    "return the best time per call to `f`, out of a few runs of `min_time` seconds"
+    timer = timeit.Timer(f)
+    count, total = timer.autorange()
+    count = max(1, int(count * min_time / max(total, 1e-9)))
+    return min(timer.repeat(repeat=3, number=count)) / count
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workloads = make_workloads(args.spends, args.atoms, args.max_atom_size, args.seed)
+    results: List[Dict[str, Any]] = []
+    for name, obj in workloads.items():
+        if args.workload and name not in args.workload:
+            continue
+        blob = to_bytes(obj)
+        for op_name, f in operations(obj, blob).items():
+            if args.op and op_name not in args.op:
+                continue
+            seconds = measure(f, args.min_time)
+            results.append(
+                dict(
+                    workload=name,
+                    op=op_name,
+                    size=len(blob),
+                    seconds_per_op=seconds,
+                    ops_per_second=1 / seconds,
+                    bytes_per_second=len(blob) / seconds,
+                    peak_memory=peak_memory(f),
+                )
+            )
+            if args.json != "-":
+                report(results[-1])
+    return dict(
+        config=dict(
+            spends=args.spends,
+            atoms=args.atoms,
+            max_atom_size=args.max_atom_size,
+            seed=args.seed,
+        ),
+        python=sys.version,
+        platform=platform.platform(),
+        results=results,
+    )
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(
+        f"{result['workload']:>12} {result['op']:>22}: "
+        f"{result['ops_per_second']:12.1f} ops/s "
+        f"{result['bytes_per_second'] / 1e6:9.2f} MB/s "
+        f"{result['peak_memory'] / 1024:9.1f} KiB peak"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--spends", type=int, default=20, help="spends per bundle")
+    parser.add_argument("--atoms", type=int, default=16, help="atoms per Program")
+    parser.add_argument(
+        "--max-atom-size", type=int, default=32, help="maximum bytes per atom"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per timing run"
+    )
+    parser.add_argument(
+        "--workload", action="append", help="only run this workload (repeatable)"
+    )
+    parser.add_argument("--op", action="append", help="only run this op (repeatable)")
+    parser.add_argument("--json", help="write the results as JSON here (- for stdout)")
+    args = parser.parse_args(argv)
+
+    summary = run(args)
+    if args.json == "-":
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
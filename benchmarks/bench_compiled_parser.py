@@ -0,0 +1,47 @@
+"""
+Compare `make_parser` with `make_compiled_parser` on `Coin`, `CoinSpend` and
+`SpendBundle`.
+
+Run from the repository root with `python -m benchmarks.bench_compiled_parser`.
+"""
+
+import io
+import timeit
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.cbincode import make_compiled_parser, make_parser, to_bytes
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+def sample_objects():
+    puzzle = Program.to([1, [2, 3], [4, 5, 6]])
+    solution = Program.to([[51, std_hash(b"ph"), 1000]])
+    coin = Coin(std_hash(b"parent"), puzzle.tree_hash(), 1000)
+    coin_spend = CoinSpend(coin, puzzle, solution)
+    signature = BLSSecretExponent.from_int(1).sign(b"foo")
+    spend_bundle = SpendBundle([coin_spend] * 20, signature)
+    return [coin, coin_spend, spend_bundle]
+
+
+def main():
+    for obj in sample_objects():
+        cls = type(obj)
+        blob = to_bytes(obj)
+        reference = make_parser(cls)
+        compiled = make_compiled_parser(cls)
+        assert compiled(io.BytesIO(blob)) == reference(io.BytesIO(blob))
+        timings = []
+        for parse in (reference, compiled):
+            count, total = timeit.Timer(lambda: parse(io.BytesIO(blob))).autorange()
+            timings.append(total / count)
+        print(
+            f"{cls.__name__:>12}: {timings[0] * 1e6:9.2f} us -> "
+            f"{timings[1] * 1e6:9.2f} us ({timings[0] / timings[1]:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare `make_streamer` with `make_compiled_streamer` on `Coin`, `CoinSpend` and
+`SpendBundle`.
+
+Run from the repository root with `python -m benchmarks.bench_compiled_streamer`.
+"""
+
+import io
+import timeit
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.cbincode import make_compiled_streamer, make_streamer, to_bytes
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+def sample_objects():
+    puzzle = Program.to([1, [2, 3], [4, 5, 6]])
+    solution = Program.to([[51, std_hash(b"ph"), 1000]])
+    coin = Coin(std_hash(b"parent"), puzzle.tree_hash(), 1000)
+    coin_spend = CoinSpend(coin, puzzle, solution)
+    signature = BLSSecretExponent.from_int(1).sign(b"foo")
+    spend_bundle = SpendBundle([coin_spend] * 20, signature)
+    return [coin, coin_spend, spend_bundle]
+
+
+def time_per_call(f) -> float:
+    count, total = timeit.Timer(f).autorange()
+    return total / count
+
+
+def report(label: str, before: float, after: float) -> None:
+    print(
+        f"{label:>20}: {before * 1e6:9.2f} us -> "
+        f"{after * 1e6:9.2f} us ({before / after:.2f}x)"
+    )
+
+
+def main():
+    for obj in sample_objects():
+        cls = type(obj)
+        blob = to_bytes(obj)
+        reference = make_streamer(cls)
+        compiled = make_compiled_streamer(cls)
+        f = io.BytesIO()
+        compiled(obj, f)
+        assert f.getvalue() == blob
+        report(
+            cls.__name__,
+            time_per_call(lambda: reference(obj, io.BytesIO())),
+            time_per_call(lambda: compiled(obj, io.BytesIO())),
+        )
+
+
+if __name__ == "__main__":
+    main()
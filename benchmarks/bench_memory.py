@@ -0,0 +1,105 @@
+"""
+Report the memory each `Coin` takes, with its `bytes32` and `uint64` fields, for
+the slotted classes in `chia_base` and for the same classes with a `__dict__` per
+instance, as they were defined before. Then compare a `dict` of `Coin` objects
+keyed by coin id with a `CoinSet`.
+
+Run from the repository root with `python -m benchmarks.bench_memory`.
+"""
+
+import argparse
+import tracemalloc
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from chia_base.atoms import bytes32, uint64
+from chia_base.cbincode import from_bytes, to_bytes
+from chia_base.core import Coin, CoinSet
+from chia_base.util.std_hash import std_hash
+
+
+class dict_bytes32(bytes):
+    "like `bytes32` without `__slots__`"
+
+
+class dict_uint64(int):
+    "like `uint64` without `__slots__`"
+
+
+@dataclass(frozen=True)
+class DictCoin:
+    "like `Coin` without `__slots__`"
+
+    parent_coin_info: dict_bytes32
+    puzzle_hash: dict_bytes32
+    amount: dict_uint64
+
+
+def bytes_per_item(make: Callable[[int], object], count: int) -> float:
+    "the memory `tracemalloc` sees allocated per item for `count` items"
+    tracemalloc.start()
+    try:
+        items = [make(_) for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # don't count the list holding them
+    return (size - len(items) * 8) / count
+
+
+def bytes_per_coin(make: Callable[[List[Coin]], object], coins: List[Coin]) -> float:
+    "the memory `tracemalloc` sees allocated per coin by `make(coins)`"
+    tracemalloc.start()
+    try:
+        container = make(coins)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del container
+    return size / len(coins)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--count", type=int, default=100000, help="coins to build")
+    args = parser.parse_args(argv)
+
+    hashes = [std_hash(b"%d" % _) for _ in range(2 * args.count)]
+    blob = to_bytes(Coin(hashes[0], hashes[1], uint64(1)))
+    assert from_bytes(Coin, blob) == Coin(hashes[0], hashes[1], uint64(1))
+
+    def dict_coin(i: int) -> DictCoin:
+        return DictCoin(
+            dict_bytes32(hashes[2 * i]),
+            dict_bytes32(hashes[2 * i + 1]),
+            dict_uint64(i + 1 << 40),
+        )
+
+    def slotted_coin(i: int) -> Coin:
+        return Coin(
+            bytes32(hashes[2 * i]), bytes32(hashes[2 * i + 1]), uint64(i + 1 << 40)
+        )
+
+    before = bytes_per_item(dict_coin, args.count)
+    after = bytes_per_item(slotted_coin, args.count)
+    print(f"{'with __dict__':>14}: {before:7.1f} bytes per Coin")
+    print(f"{'slotted':>14}: {after:7.1f} bytes per Coin ({before / after:.2f}x less)")
+    print(f"{'payload':>14}: {72:7d} bytes")
+
+    # the coins themselves are built first, so only the container is counted, along
+    # with the coin ids it hashes
+    coins = [slotted_coin(_) for _ in range(args.count)]
+    in_dict = bytes_per_coin(lambda coins: {_.name(): _ for _ in coins}, coins)
+    # the coins aren't kept, so count them for the `dict`
+    in_dict += after
+    in_coin_set = bytes_per_coin(CoinSet, coins)
+    print(f"{'dict of Coin':>14}: {in_dict:7.1f} bytes per coin")
+    print(
+        f"{'CoinSet':>14}: {in_coin_set:7.1f} bytes per coin "
+        f"({in_dict / in_coin_set:.2f}x less)"
+    )
+
+
+if __name__ == "__main__":
+    main()
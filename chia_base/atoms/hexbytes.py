@@ -4,6 +4,8 @@ class hexbytes(bytes):
     which is much easier on the eyes for binary data that is very non-ascii .
     """
 
+    __slots__ = ()
+
     def __str__(self):
         return self.hex()
 
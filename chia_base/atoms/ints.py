@@ -1,10 +1,19 @@
 """
 Some ints of fixed size. Their fixed size makes them easier to parse and serialize.
 
-Each implements these two class methods:
+Each implements these class methods:
 
 *  `.parse(f: BinaryIO)`
+*  `.parse_from_buffer(buf, offset: int)`
 *  `._class_stream(obj, f: BinaryIO)`
+*  `.stream_to_buffer(obj, buf, offset: int)`
+
+and these for many values in a row, as in the body of a `List[uint64]`:
+
+*  `.parse_many(f: BinaryIO, count: int)`
+*  `.parse_many_from_buffer(buf, offset: int, count: int)`
+*  `.stream_many(values, f: BinaryIO)`
+*  `.stream_many_to_buffer(values, buf, offset: int)`
 
 """
 
@@ -14,46 +23,62 @@ from .struct_stream import struct_stream
 class int8(int, struct_stream):
     "signed 8-bit int"
 
+    __slots__ = ()
+
     PACK = "!b"
 
 
 class uint8(int, struct_stream):
     "unsigned 8-bit int"
 
+    __slots__ = ()
+
     PACK = "!B"
 
 
 class int16(int, struct_stream):
     "signed 16-bit int"
 
+    __slots__ = ()
+
     PACK = "!h"
 
 
 class uint16(int, struct_stream):
     "unsigned 16-bit int"
 
+    __slots__ = ()
+
     PACK = "!H"
 
 
 class int32(int, struct_stream):
     "signed 32-bit int"
 
+    __slots__ = ()
+
     PACK = "!l"
 
 
 class uint32(int, struct_stream):
     "unsigned 32-bit int"
 
+    __slots__ = ()
+
     PACK = "!L"
 
 
 class int64(int, struct_stream):
     "signed 64-bit int"
 
+    __slots__ = ()
+
     PACK = "!q"
 
 
 class uint64(int, struct_stream):
     "unsigned 64-bit int"
 
+    __slots__ = ()
+
     PACK = "!Q"
@@ -1,4 +1,4 @@
-from typing import BinaryIO
+from typing import BinaryIO, Tuple
 from .hexbytes import hexbytes
 
 
@@ -10,14 +10,16 @@ class SizedBytes(hexbytes):
     Having a specific number of bytes means we can easily parse and stream
     """
 
+    __slots__ = ()
+
     _size: int
 
     def __new__(cls, v):
         "`v` must be castable to `bytes`"
-        v = bytes(v)
-        if not isinstance(v, bytes) or len(v) != cls._size:
-            raise ValueError("bad %s initializer %s" % (cls.__name__, v))
-        return hexbytes.__new__(cls, v)
+        r = hexbytes.__new__(cls, v)
+        if len(r) != cls._size:
+            raise ValueError("bad %s initializer %s" % (cls.__name__, bytes(r)))
+        return r
 
     @classmethod
     def parse(cls, f: BinaryIO) -> bytes:
@@ -27,6 +29,19 @@ class SizedBytes(hexbytes):
             raise ValueError(msg)
         return cls(b)
 
+    @classmethod
+    def parse_from_buffer(cls, buf, offset: int = 0) -> Tuple[bytes, int]:
+        """
+        parse from a `bytes`-like buffer at `offset`, returning the new offset too.
+        Pass a `memoryview` to copy the bytes only once.
+        """
+        end = offset + cls._size
+        if end > len(buf):
+            got = max(len(buf) - offset, 0)
+            msg = f"unexpected EOS: {got} bytes available, {cls._size} expected"
+            raise ValueError(msg)
+        return bytes.__new__(cls, buf[offset:end]), end
+
     @classmethod
     def _class_stream(cls, obj: bytes, f: BinaryIO) -> None:
         if len(obj) != cls._size:
@@ -34,10 +49,24 @@ class SizedBytes(hexbytes):
             raise ValueError(msg)
         f.write(obj)
 
+    @classmethod
+    def stream_to_buffer(cls, obj: bytes, buf, offset: int = 0) -> int:
+        "write into a preallocated `bytearray` at `offset`, returning the new offset"
+        end = offset + cls._size
+        if len(obj) != cls._size:
+            msg = f"got {len(obj)} bytes when we expected {cls._size}"
+            raise ValueError(msg)
+        if end > len(buf):
+            raise ValueError(f"buffer too small: need {end} bytes, have {len(buf)}")
+        buf[offset:end] = obj
+        return end
+
 
 class bytes32(SizedBytes):
     """
     A subclass of `bytes` that requires the length to be 32.
     """
 
+    __slots__ = ()
+
     _size = 32
@@ -1,24 +1,153 @@
+import array
 import struct
+import sys
 
-from typing import BinaryIO, TypeVar, Type
-
+from typing import BinaryIO, ClassVar, Iterable, List, Optional, Tuple, TypeVar, Type
 
 _T = TypeVar("_T", bound="struct_stream")
 
+_NEEDS_BYTESWAP = sys.byteorder == "little"
+
+# larger reads are made in pieces of this size, so a bogus size prefix can't make
+# us allocate much more memory than the data that actually arrives
+READ_CHUNK_SIZE = 1 << 20
+
+
+def array_typecode(pack: str) -> Optional[str]:
+    """
+    return the `array` type code for a big-endian `struct` template of one integer,
+    like `!Q`, or `None` if there isn't one
+    """
+    if len(pack) != 2 or pack[0] not in "!>":
+        return None
+    code = pack[1]
+    size = struct.calcsize(pack)
+    for typecode in (code, code.replace("l", "i").replace("L", "I")):
+        if typecode in array.typecodes and array.array(typecode).itemsize == size:
+            return typecode
+    return None
+
 
 class struct_stream:
     """
     This is a base class. Subclasses should define `cls.PACK` as a struct.pack
-    template string. In return, you get implementations of `parse` and
-    `_class_stream`.
+    template string. In return, you get implementations of `parse`,
+    `parse_from_buffer`, `_class_stream` and `stream_to_buffer`, using a
+    `struct.Struct` compiled once per class.
+
+    If `PACK` is a single big-endian integer, you also get `parse_many`,
+    `parse_many_from_buffer`, `stream_many`, `stream_many_to_buffer`, `unpack_many`
+    and `pack_many`, which handle many values in a row at once using `array`.
     """
 
+    __slots__ = ()
+
     PACK: str
+    _struct: ClassVar[struct.Struct]
+    _typecode: ClassVar[Optional[str]] = None
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        pack = getattr(cls, "PACK", None)
+        if pack is not None:
+            cls._struct = struct.Struct(pack)
+            cls._typecode = array_typecode(pack)
 
     @classmethod
     def parse(cls: Type[_T], f: BinaryIO) -> _T:
-        return cls(*struct.unpack(cls.PACK, f.read(struct.calcsize(cls.PACK))))
+        s = cls._struct
+        return cls(*s.unpack(f.read(s.size)))
+
+    @classmethod
+    def parse_from_buffer(cls: Type[_T], buf, offset: int = 0) -> Tuple[_T, int]:
+        "parse from a `bytes`-like buffer at `offset`, returning the new offset too"
+        s = cls._struct
+        return cls(*s.unpack_from(buf, offset)), offset + s.size
 
     @classmethod
     def _class_stream(cls: Type[_T], obj: _T, f: BinaryIO) -> None:
-        f.write(struct.pack(cls.PACK, obj))
+        f.write(cls._struct.pack(obj))
+
+    @classmethod
+    def stream_to_buffer(cls: Type[_T], obj: _T, buf, offset: int = 0) -> int:
+        "write into a preallocated `bytearray` at `offset`, returning the new offset"
+        s = cls._struct
+        s.pack_into(buf, offset, obj)
+        return offset + s.size
+
+    @classmethod
+    def unpack_many(cls: Type[_T], blob) -> List[_T]:
+        "unpack a `bytes`-like `blob` holding values in a row"
+        items = array.array(cls._typecode)  # type: ignore[arg-type]
+        items.frombytes(blob)
+        if _NEEDS_BYTESWAP:
+            items.byteswap()
+        return list(map(cls, items))
+
+    @classmethod
+    def pack_many(cls, values: Iterable[int]) -> memoryview:
+        "pack values in a row, returning a `bytes`-like `memoryview`"
+        items = array.array(cls._typecode, values)  # type: ignore[arg-type]
+        if _NEEDS_BYTESWAP:
+            items.byteswap()
+        return memoryview(items).cast("B")
+
+    @classmethod
+    def parse_many(cls: Type[_T], f: BinaryIO, count: int) -> List[_T]:
+        "parse `count` values in a row, reading at most `READ_CHUNK_SIZE` bytes at once"
+        size = cls._struct.size
+        step = max(READ_CHUNK_SIZE // size, 1)
+        items: List[_T] = []
+        for start in range(0, count, step):
+            expected = size * min(step, count - start)
+            blob = f.read(expected)
+            if len(blob) != expected:
+                got = size * start + len(blob)
+                raise ValueError(
+                    f"unexpected EOS: {got} bytes read, {size * count} expected"
+                )
+            items.extend(cls.unpack_many(blob))
+        return items
+
+    @classmethod
+    def parse_many_from_buffer(
+        cls: Type[_T], buf, offset: int, count: int
+    ) -> Tuple[List[_T], int]:
+        "parse `count` values in a row from a `bytes`-like buffer at `offset`"
+        end = offset + cls._struct.size * count
+        if end > len(buf):
+            got = max(len(buf) - offset, 0)
+            raise ValueError(
+                f"unexpected EOS: {got} bytes available, {end - offset} expected"
+            )
+        return cls.unpack_many(buf[offset:end]), end
+
+    @classmethod
+    def stream_many(cls: Type[_T], values: Iterable[int], f: BinaryIO) -> None:
+        "write many values in a row"
+        f.write(cls.pack_many(values))
+
+    @classmethod
+    def stream_many_to_buffer(
+        cls: Type[_T], values: Iterable[int], buf, offset: int
+    ) -> int:
+        "write many values in a row into a preallocated `bytearray` at `offset`"
+        blob = cls.pack_many(values)
+        end = offset + len(blob)
+        if end > len(buf):
+            raise ValueError(f"buffer too small: need {end} bytes, have {len(buf)}")
+        buf[offset:end] = blob
+        return end
+
+
+def bulk_atom(t: object) -> bool:
+    """
+    return `True` if `t` is a `struct_stream` integer type whose `parse_many` and
+    `stream_many` can stand in for calls to its stock `parse` and `_class_stream`
+    """
+    if not (isinstance(t, type) and issubclass(t, struct_stream) and t._typecode):
+        return False
+    return all(
+        getattr(t, name).__func__ is getattr(struct_stream, name).__func__
+        for name in ("parse", "parse_from_buffer", "_class_stream", "stream_to_buffer")
+    )
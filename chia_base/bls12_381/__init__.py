@@ -1,11 +1,27 @@
 """
 The `chia_rs` wheel has some rough edges in its api. This module smooths them over
 with a more ergonomic api.
+
+`chia_rs` is imported the first time one of these classes is used.
 """
 
-from .bls_public_key import BLSPublicKey
-from .bls_secret_exponent import BLSSecretExponent
-from .bls_signature import BLSSignature
+from typing import TYPE_CHECKING
+
+from chia_base.util.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .bls_public_key import BLSPublicKey
+    from .bls_secret_exponent import BLSSecretExponent
+    from .bls_signature import BLSSignature
 
 
 __all__ = ["BLSPublicKey", "BLSSecretExponent", "BLSSignature"]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "BLSPublicKey": ".bls_public_key",
+        "BLSSecretExponent": ".bls_secret_exponent",
+        "BLSSignature": ".bls_signature",
+    },
+)
@@ -16,6 +16,9 @@ class BLSPublicKey:
     when serialized by a 48-byte x element (with a few extra bits at the
     beginning for metadata).
     """
+
+    _size = 48
+
     def __init__(self, g1: chia_rs.G1Element):
         assert isinstance(g1, chia_rs.G1Element)
         self._g1 = g1
@@ -26,10 +29,15 @@ class BLSPublicKey:
         bls_public_hd_key = chia_rs.G1Element.from_bytes(blob)
         return BLSPublicKey(bls_public_hd_key)
 
+    @classmethod
+    def from_bytes_unchecked(cls, blob):
+        "parse from a binary blob without validating the point. Only for trusted data"
+        return cls(chia_rs.G1Element.from_bytes_unchecked(blob))
+
     @classmethod
     def parse(cls, f: BinaryIO):
         "parse from a stream"
-        return cls.from_bytes(f.read(48))
+        return cls.from_bytes(f.read(cls._size))
 
     @classmethod
     def generator(cls):
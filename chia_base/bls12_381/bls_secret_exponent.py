@@ -20,6 +20,8 @@ class BLSSecretExponent:
     `__bytes__` which could cause confusion.
     """
 
+    _size = 32
+
     def __init__(self, sk: chia_rs.PrivateKey):
         self._sk = sk
 
@@ -41,10 +43,15 @@ class BLSSecretExponent:
         "deserialize from the given blob. A blob of length 32 bytes is expected"
         return cls(chia_rs.PrivateKey.from_bytes(blob))
 
+    @classmethod
+    def from_bytes_unchecked(cls, blob) -> "BLSSecretExponent":
+        "deserialize from the given blob without validating it. Only for trusted data"
+        return cls(chia_rs.PrivateKey.from_bytes_unchecked(blob))
+
     @classmethod
     def parse(cls, f: BinaryIO):
         "deserialize from the given stream"
-        return cls.from_bytes(f.read(32))
+        return cls.from_bytes(f.read(cls._size))
 
     def stream(self, f: BinaryIO) -> None:
         "serialize to the given stream"
@@ -112,7 +119,10 @@ class BLSSecretExponent:
     @classmethod
     def zero(cls) -> "BLSSecretExponent":
         "returns the secret exponent corresponding to 0. This shouldn't be used to sign"
-        return ZERO
+        global _ZERO
+        if _ZERO is None:
+            _ZERO = BLSSecretExponent.from_int(0)
+        return _ZERO
 
     def __add__(self, other):
         return self.from_int(int(self) + int(other))
@@ -135,4 +145,11 @@ class BLSSecretExponent:
         return "<%s: %s>" % (self.__class__.__name__, self)
 
 
-ZERO = BLSSecretExponent.from_int(0)
+_ZERO: Optional[BLSSecretExponent] = None
+
+
+def __getattr__(name: str) -> BLSSecretExponent:
+    # `ZERO` is built on first use rather than at import time
+    if name == "ZERO":
+        return BLSSecretExponent.zero()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -16,6 +16,8 @@ class BLSSignature:
     around aggregation and validation.
     """
 
+    _size = 96
+
     @dataclass
     class aggsig_pair:
         public_key: BLSPublicKey
@@ -31,10 +33,15 @@ class BLSSignature:
         bls_public_hd_key = chia_rs.G2Element.from_bytes(blob)
         return cls(bls_public_hd_key)
 
+    @classmethod
+    def from_bytes_unchecked(cls, blob):
+        "parse from a binary blob without validating the point. Only for trusted data"
+        return cls(chia_rs.G2Element.from_bytes_unchecked(blob))
+
     @classmethod
     def parse(cls, f: BinaryIO):
         "parse from a stream"
-        return cls.from_bytes(f.read(96))
+        return cls.from_bytes(f.read(cls._size))
 
     @classmethod
     def generator(cls):
@@ -25,13 +25,108 @@ Supported types include:
 - classes decorated with `@dataclass` where each field is of a supported type
 
 Transitive closures of the above list are also supported.
+
+`make_compiled_parser` and `make_compiled_streamer` are opt-in alternatives to
+`make_parser` and `make_streamer` that generate one specialized, straight-line
+function per type.
+
+`make_buffer_parser` creates parsers that work directly on a `bytes`-like buffer
+and offset instead of a stream, returning `(value, new_offset)`. With
+`retain=True`, parsed `dataclass` objects keep their source bytes, and streamers
+and `to_bytes` write those out again instead of re-serializing.
+
+`make_skipper` finds where a serialized value ends without building it, and
+`make_lazy_view` creates views of serialized `dataclass` objects that decode each
+field on first access, and `view_of` makes one for a value in a buffer.
+
+`serialized_size` returns the number of bytes an object serializes to without
+serializing it, and `make_buffer_streamer` writes into a preallocated `bytearray`.
+
+`chia_base.cbincode.columnar` decodes lists of fixed-size records like `Coin`
+into NumPy structured arrays, and back. It needs the optional `numpy` dependency,
+so isn't imported here.
+
+`MappedFile` parses records straight out of a memory-mapped file, and
+`chia_base.cbincode.parallel` parses large sets of records on several cores.
+
+`IncrementalDecoder` decodes values from data fed to it in chunks of any size,
+like data arriving on a socket, without blocking. `chia_base.cbincode.aio` has
+`asyncio` versions of parsing and streaming, and a length-prefixed frame codec.
+
+`iter_parse` and `stream_iter` handle a `List[T]` one item at a time.
+
+`make_limited_parser` creates buffer parsers for untrusted input that enforce
+`ParseLimits` on total size, list lengths, blob sizes and nesting depth.
+
+`InternTable` shares repeated `bytes32` and `Program` values between the objects
+parsed by `make_interning_parser`, or `from_bytes(..., intern=table)`.
+
+`HashSink` hashes whatever a streamer writes to it, and `cbincode_hash` uses one to
+hash the serialization of an object without collecting it first. `SegmentSink`
+collects the output of a streamer as segments to send with `os.writev` or
+`socket.sendmsg`, and `BufferSink` writes it into a reusable `bytearray`.
+
+`precompile_codecs` saves the compiled codecs for a list of types to a file, and
+`load_codecs` loads them in another process, skipping code generation. Entries are
+keyed by `schema_fingerprint`, so changing a field invalidates them.
+
+Codecs are built once per type and cached in `CODEC_REGISTRY`.
 """
 
+from .buffer_parser import make_buffer_parser, BufferParseFunction
+from .buffer_streamer import make_buffer_streamer, BufferStreamFunction
+from .codec_cache import load_codecs, precompile_codecs, schema_fingerprint
+from .compiled_parser import make_compiled_parser
+from .compiled_streamer import make_compiled_streamer
+from .incremental import IncrementalDecoder, make_step_parser
+from .intern import InternTable, make_interning_parser
+from .iterators import iter_parse, stream_iter
+from .limits import LimitedReader, ParseLimits, make_limited_parser
+from .lazy_view import LazyView, make_lazy_view, view_of
+from .mapped_file import MappedFile
 from .parser import make_parser, ParseFunction
+from .registry import CODEC_REGISTRY, CodecRegistry
+from .sinks import BufferSink, HashSink, SegmentSink
+from .sizer import make_sizer, serialized_size, SizeFunction
+from .skipper import fixed_size, make_skipper, SkipFunction
 from .streamer import make_streamer, StreamFunction
-from .util import from_bytes, from_hex, to_bytes, to_hex
+from .util import cbincode_hash, from_bytes, from_hex, to_bytes, to_hex
 
 __all__ = [
+    "CODEC_REGISTRY",
+    "CodecRegistry",
+    "make_buffer_parser",
+    "BufferParseFunction",
+    "make_buffer_streamer",
+    "BufferStreamFunction",
+    "BufferSink",
+    "HashSink",
+    "SegmentSink",
+    "cbincode_hash",
+    "make_sizer",
+    "serialized_size",
+    "SizeFunction",
+    "LazyView",
+    "make_lazy_view",
+    "view_of",
+    "fixed_size",
+    "make_skipper",
+    "SkipFunction",
+    "MappedFile",
+    "LimitedReader",
+    "ParseLimits",
+    "make_limited_parser",
+    "IncrementalDecoder",
+    "make_step_parser",
+    "InternTable",
+    "make_interning_parser",
+    "iter_parse",
+    "stream_iter",
+    "load_codecs",
+    "precompile_codecs",
+    "schema_fingerprint",
+    "make_compiled_parser",
+    "make_compiled_streamer",
     "make_parser",
     "make_streamer",
     "ParseFunction",
@@ -0,0 +1,124 @@
+"""
+`asyncio` counterparts of `parse` and `stream`, for `asyncio.StreamReader` and
+`asyncio.StreamWriter`.
+
+`aparse` drives a step parser (see `incremental`), awaiting `readexactly` for
+precisely the bytes each step needs, so it never reads past the end of a value
+and each `bytes` it gets goes straight into the parsed object. `astream` writes
+the compiled streamer's output directly to the writer, then waits on `drain`
+so a slow peer applies backpressure.
+
+`FrameCodec` adds a `uint32` length prefix to each message, so a reader can
+reject an oversized message before buffering it, and a malformed message can't
+desynchronize the connection.
+"""
+
+from typing import Any, Generic, Optional, TypeVar
+
+import asyncio
+import io
+
+from chia_base.atoms import uint32
+from chia_base.meta.type_tree import Gtype
+
+from .buffer_parser import make_buffer_parser
+from .compiled_streamer import make_compiled_streamer
+from .incremental import Peek, make_step_parser
+from .limits import ParseLimits, make_limited_parser
+
+_T = TypeVar("_T")
+
+DEFAULT_MAX_FRAME_SIZE = 1 << 26
+
+
+async def aparse(
+    cls: Gtype, reader: asyncio.StreamReader, limits: Optional[ParseLimits] = None
+) -> Any:
+    """
+    parse a `cls` from `reader`, enforcing `limits` if given. Raises
+    `asyncio.IncompleteReadError` if the stream ends first
+    """
+    gen = make_step_parser(cls, limits)()
+    peeked = b""
+    try:
+        request = next(gen)
+        while True:
+            if isinstance(request, Peek):
+                # a `.parse` of unknown size: read as much as it last came up short
+                if len(peeked) < request.at_least:
+                    peeked += await reader.readexactly(request.at_least - len(peeked))
+                request = gen.send(peeked)
+                continue
+            if peeked:
+                data, peeked = peeked[:request], peeked[request:]
+                if len(data) < request:
+                    data += await reader.readexactly(request - len(data))
+            else:
+                data = await reader.readexactly(request)
+            request = gen.send(data)
+    except StopIteration as ex:
+        return ex.value
+
+
+async def astream(cls: Gtype, obj: Any, writer: asyncio.StreamWriter) -> None:
+    "stream `obj` as a `cls` to `writer`, then wait for it to drain"
+    make_compiled_streamer(cls)(obj, writer)
+    await writer.drain()
+
+
+class FrameCodec(Generic[_T]):
+    """
+    Read and write `cls` values as frames: a `uint32` size followed by exactly
+    that many bytes. Frames larger than `max_frame_size` are rejected with
+    `ValueError` before their payload is read or sent. Pass `limits` to bound
+    what's inside a frame too.
+    """
+
+    def __init__(
+        self,
+        cls: Gtype,
+        max_frame_size: int = DEFAULT_MAX_FRAME_SIZE,
+        limits: Optional[ParseLimits] = None,
+    ):
+        self.cls = cls
+        self.max_frame_size = max_frame_size
+        if limits is None:
+            self._parse = make_buffer_parser(cls)
+        else:
+            self._parse = make_limited_parser(cls, limits)
+        self._stream = make_compiled_streamer(cls)
+
+    def encode(self, obj: _T) -> bytes:
+        "return the frame for `obj`, size prefix included"
+        f = io.BytesIO()
+        f.write(bytes(4))
+        self._stream(obj, f)
+        size = f.tell() - 4
+        if size > self.max_frame_size:
+            raise ValueError(f"frame of {size} bytes exceeds {self.max_frame_size}")
+        f.seek(0)
+        f.write(uint32._struct.pack(size))
+        # no copy: `BytesIO` hands over its buffer when nothing else refers to it
+        return f.getvalue()
+
+    def decode(self, payload: bytes) -> _T:
+        "parse the payload of a frame, which must be exactly one `cls`"
+        obj, end = self._parse(payload)
+        if end != len(payload):
+            raise ValueError(f"frame has {len(payload) - end} bytes left over")
+        return obj
+
+    async def read(self, reader: asyncio.StreamReader) -> _T:
+        """
+        read and parse one frame. Raises `asyncio.IncompleteReadError` if the
+        stream ends first
+        """
+        (size,) = uint32._struct.unpack(await reader.readexactly(4))
+        if size > self.max_frame_size:
+            raise ValueError(f"frame of {size} bytes exceeds {self.max_frame_size}")
+        return self.decode(await reader.readexactly(size))
+
+    async def write(self, writer: asyncio.StreamWriter, obj: _T) -> None:
+        "write one frame, then wait for `writer` to drain"
+        writer.write(self.encode(obj))
+        await writer.drain()
@@ -0,0 +1,474 @@
+"""
+Create a parser function at runtime that parses directly out of a `bytes`-like
+buffer rather than a `BinaryIO` stream. This supports the same types as `parser`.
+
+A buffer parser is called as `parse(buf, offset)` and returns `(value, new_offset)`.
+Internally the buffer is handled as a `memoryview`, so the only copies made are
+the ones needed to build the parsed objects. With `zero_copy=True`, `bytes` fields
+are returned as `memoryview` slices of the buffer, and no copy is made at all.
+
+With `trusted=True`, the redundant checks are skipped, which is only safe for data
+we wrote ourselves and have checksummed. `dataclass` objects are built with
+`object.__new__` and have their fields filled in directly instead of going through
+`__init__`, and types with a `from_bytes_unchecked` class method, like the BLS
+types, skip validation.
+
+With `retain=True`, frozen `dataclass` objects keep the bytes they were parsed
+from, so streaming them again is just a copy. See `retain`.
+"""
+
+from dataclasses import fields, is_dataclass
+
+import io
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import bulk_atom
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import GenericAlias, UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .codegen import CodeBuilder, function_name
+from .registry import CODEC_REGISTRY
+from .retain import retains_source, source_setter
+from .sizer import min_serialized_size
+
+_T = TypeVar("_T")
+
+BufferParseFunction = Callable[[Any, int], Tuple[_T, int]]
+
+
+def as_byte_view(buf) -> memoryview:
+    "return a flat `memoryview` of unsigned bytes for a `bytes`-like object"
+    view = memoryview(buf)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def program_size(buf, offset: int = 0) -> int:
+    """
+    Return the size of the serialized clvm `Program` starting at `offset`,
+    without building it.
+    """
+    cursor = offset
+    end = len(buf)
+    to_skip = 1
+    while to_skip:
+        if cursor >= end:
+            raise ValueError("bad encoding")
+        b = buf[cursor]
+        cursor += 1
+        to_skip -= 1
+        if b == 0xFF:
+            to_skip += 2
+            continue
+        if b <= 0x80:
+            continue
+        bit_count = 0
+        bit_mask = 0x80
+        while b & bit_mask:
+            bit_count += 1
+            b &= 0xFF ^ bit_mask
+            bit_mask >>= 1
+        size = b
+        for _ in range(bit_count - 1):
+            if cursor >= end:
+                raise ValueError("bad encoding")
+            size = (size << 8) | buf[cursor]
+            cursor += 1
+        if size >= 0x400000000:
+            raise ValueError("blob too large")
+        cursor += size
+    if cursor > end:
+        raise ValueError("bad encoding")
+    return cursor - offset
+
+
+def program_from_bytes(blob) -> Program:
+    """
+    Build a `Program` from its serialization. `Program.from_bytes` returns one backed
+    by a `memoryview`, which can't be pickled or deep-copied, so parse it from a
+    stream instead, as `make_parser` does.
+    """
+    return Program.parse(io.BytesIO(blob))
+
+
+def parse_program(buf, offset: int) -> Tuple[Program, int]:
+    "a buffer parser for `Program`"
+    end = offset + program_size(buf, offset)
+    return program_from_bytes(buf[offset:end]), end
+
+
+def bytes_span(buf, offset: int) -> Tuple[int, int]:
+    "return the `(start, end)` of the size-prefixed blob at `offset`"
+    (size,) = uint32._struct.unpack_from(buf, offset)
+    start = offset + 4
+    end = start + size
+    if end > len(buf):
+        msg = f"unexpected EOS: {len(buf) - start} bytes available, {size} expected"
+        raise ValueError(msg)
+    return start, end
+
+
+def parse_bytes(buf, offset: int) -> Tuple[bytes, int]:
+    "a buffer parser for `bytes`"
+    start, end = bytes_span(buf, offset)
+    return bytes(buf[start:end]), end
+
+
+def parse_bytes_view(buf, offset: int) -> Tuple[memoryview, int]:
+    "a buffer parser for `bytes` that returns a `memoryview` slice of `buf`"
+    start, end = bytes_span(buf, offset)
+    return buf[start:end], end
+
+
+def parse_str(buf, offset: int) -> Tuple[str, int]:
+    "a buffer parser for `str`"
+    start, end = bytes_span(buf, offset)
+    return str(buf[start:end], "utf8"), end
+
+
+class BufferReader:
+    """
+    A minimal read-only stand-in for `BinaryIO` over a buffer, so types that only
+    provide a stream `.parse` method can still be parsed from a buffer.
+    """
+
+    def __init__(self, buf, offset: int):
+        self.buf = buf
+        self.offset = offset
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        start = self.offset
+        if size is None or size < 0:
+            end = len(self.buf)
+        else:
+            end = min(start + size, len(self.buf))
+        self.offset = end
+        return bytes(self.buf[start:end])
+
+
+def buffer_parser_for_stream_parser(parse: Callable[[Any], Any]) -> BufferParseFunction:
+    "adapt a stream `.parse` function to a buffer parser"
+
+    def parse_f(buf, offset: int) -> Tuple[Any, int]:
+        f = BufferReader(buf, offset)
+        return parse(f), f.offset
+
+    return parse_f
+
+
+def raise_too_long(length: int, item_min_size: int, available: int) -> None:
+    raise ValueError(
+        f"list of {length} items of at least {item_min_size} bytes "
+        f"can't fit in {available} bytes"
+    )
+
+
+def buffer_parser_for_list(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferParseFunction],
+) -> BufferParseFunction:
+    "create a buffer parser for a `List[X]`"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+
+    item_type = args_type[0]
+    if bulk_atom(item_type):
+        parse_many = item_type.parse_many_from_buffer
+        item_size = item_type._struct.size
+
+        def parse_many_f(buf, offset: int) -> Tuple[List[Any], int]:
+            (length,) = uint32._struct.unpack_from(buf, offset)
+            offset += 4
+            if length * item_size > len(buf) - offset:
+                raise_too_long(length, item_size, len(buf) - offset)
+            return parse_many(buf, offset, length)
+
+        return parse_many_f
+
+    inner_parse: BufferParseFunction = type_tree(item_type)
+    item_min_size = min_serialized_size(item_type)
+
+    def parse_f(buf, offset: int) -> Tuple[List[Any], int]:
+        (length,) = uint32._struct.unpack_from(buf, offset)
+        offset += 4
+        if length * item_min_size > len(buf) - offset:
+            raise_too_long(length, item_min_size, len(buf) - offset)
+        items = []
+        for _ in range(length):
+            item, offset = inner_parse(buf, offset)
+            items.append(item)
+        return items, offset
+
+    return parse_f
+
+
+def buffer_parser_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferParseFunction],
+) -> BufferParseFunction:
+    "create a buffer parser for a `Tuple[X, ...]`"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    subparsers: List[BufferParseFunction] = [type_tree(_) for _ in args_type]
+
+    def parse_f(buf, offset: int) -> Tuple[Tuple[Any, ...], int]:
+        items = []
+        for subparser in subparsers:
+            item, offset = subparser(buf, offset)
+            items.append(item)
+        return tuple(items), offset
+
+    return parse_f
+
+
+def buffer_parser_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferParseFunction],
+) -> BufferParseFunction:
+    "create a buffer parser for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    parser = type_tree(item_type)
+
+    def parse_f(buf, offset: int) -> Tuple[Optional[Any], int]:
+        if buf[offset] == 0:
+            return None, offset + 1
+        return parser(buf, offset + 1)
+
+    return parse_f
+
+
+def buffer_parser_for_dataclass(
+    cls: Type, type_tree: TypeTree[BufferParseFunction]
+) -> BufferParseFunction:
+    "create a buffer parser for the given `dataclass`"
+    new_types = tuple(f.type for f in fields(cls))
+    g: Any = GenericAlias(tuple, new_types)
+    tuple_parser = type_tree(g)
+
+    def parser(buf, offset: int) -> Tuple[Any, int]:
+        args, offset = tuple_parser(buf, offset)
+        return cls(*args), offset
+
+    return parser
+
+
+def buffer_parser_for_unchecked(
+    from_bytes_unchecked: Callable[[bytes], Any], size: int
+) -> BufferParseFunction:
+    "create a buffer parser from a `from_bytes_unchecked` method"
+
+    def parse_f(buf, offset: int) -> Tuple[Any, int]:
+        end = offset + size
+        if end > len(buf):
+            got = max(len(buf) - offset, 0)
+            raise ValueError(f"unexpected EOS: {got} bytes available, {size} expected")
+        return from_bytes_unchecked(bytes(buf[offset:end])), end
+
+    return parse_f
+
+
+def trusted_dataclass_builder(cls: Type) -> Optional[Callable[[Tuple[Any, ...]], Any]]:
+    """
+    return a generated function that builds a `cls` out of a tuple of field values
+    without calling `__init__`, or `None` if `__init__` does more than fill in fields
+    """
+    all_fields = fields(cls)
+    if hasattr(cls, "__post_init__") or not all(f.init for f in all_fields):
+        return None
+    b = CodeBuilder(function_name("build_trusted", cls), "args")
+    obj = b.var("obj")
+    b.line(f"{obj} = {b.ref(object.__new__, 'new')}({b.ref(cls, 'cls')})")
+    if all_fields and cls.__dictoffset__ == 0:
+        # no `__dict__`, so fill in the slots one by one
+        values = [b.var() for _ in all_fields]
+        b.line(f"{', '.join(values)}, = args")
+        setattr_ = b.ref(object.__setattr__, "setattr")
+        for f, v in zip(all_fields, values):
+            b.line(f"{setattr_}({obj}, {f.name!r}, {v})")
+    elif all_fields:
+        d = b.var("d")
+        b.line(f"{d} = {obj}.__dict__")
+        targets = ", ".join(f"{d}[{f.name!r}]" for f in all_fields)
+        b.line(f"{targets}, = args")
+    b.line(f"return {obj}")
+    return b.build()
+
+
+def trusted_buffer_parser_for_dataclass(
+    cls: Type, type_tree: TypeTree[BufferParseFunction]
+) -> BufferParseFunction:
+    "create a buffer parser for the given `dataclass` that skips `__init__`"
+    build = trusted_dataclass_builder(cls)
+    if build is None:
+        return buffer_parser_for_dataclass(cls, type_tree)
+    new_types = tuple(f.type for f in fields(cls))
+    g: Any = GenericAlias(tuple, new_types)
+    tuple_parser = type_tree(g)
+
+    def parser(buf, offset: int) -> Tuple[Any, int]:
+        args, offset = tuple_parser(buf, offset)
+        return build(args), offset
+
+    return parser
+
+
+def trusted_buffer_parsers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[BufferParseFunction]
+) -> Optional[BufferParseFunction]:
+    "like `extra_buffer_parsers`, but skipping checks that trusted data doesn't need"
+    size = getattr(origin, "_size", None)
+    if hasattr(origin, "from_bytes_unchecked") and isinstance(size, int):
+        return buffer_parser_for_unchecked(origin.from_bytes_unchecked, size)
+    if is_dataclass(origin) and not hasattr(origin, "parse"):
+        return trusted_buffer_parser_for_dataclass(origin, type_tree)
+    return extra_buffer_parsers(origin, args_type, type_tree)
+
+
+def retaining_buffer_parser(
+    parse: BufferParseFunction, keep_source: Callable[[Any, bytes], None]
+) -> BufferParseFunction:
+    "wrap a `dataclass` buffer parser to keep the source bytes of each object"
+
+    def parser(buf, offset: int) -> Tuple[Any, int]:
+        obj, end = parse(buf, offset)
+        keep_source(obj, bytes(buf[offset:end]))
+        return obj, end
+
+    return parser
+
+
+def retaining_buffer_parsers(
+    other_handler: Callable[
+        [Type, ArgsType, TypeTree[BufferParseFunction]],
+        Optional[BufferParseFunction],
+    ],
+    inner_type_tree: TypeTree[BufferParseFunction],
+) -> Callable[
+    [Type, ArgsType, TypeTree[BufferParseFunction]], Optional[BufferParseFunction]
+]:
+    """
+    wrap `other_handler` so the parsers it makes retain source bytes where they can.
+    The values inside a retained object are parsed with `inner_type_tree`, so they
+    don't keep another copy of the same bytes
+    """
+
+    def handler(
+        origin: Type, args_type: ArgsType, type_tree: TypeTree[BufferParseFunction]
+    ) -> Optional[BufferParseFunction]:
+        if retains_source(origin):
+            parse = other_handler(origin, args_type, inner_type_tree)
+            if parse is not None:
+                return retaining_buffer_parser(parse, source_setter(origin))
+        return other_handler(origin, args_type, type_tree)
+
+    return handler
+
+
+def extra_buffer_parsers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[BufferParseFunction]
+) -> Optional[BufferParseFunction]:
+    """
+    deal with `dataclass` objects and objects that have a `.parse_from_buffer`
+    or `.parse` class method
+    """
+    if hasattr(origin, "parse_from_buffer"):
+        return origin.parse_from_buffer
+    if hasattr(origin, "parse"):
+        return buffer_parser_for_stream_parser(origin.parse)
+    if is_dataclass(origin):
+        return buffer_parser_for_dataclass(origin, type_tree)
+    return None
+
+
+def buffer_parser_type_tree(
+    zero_copy: bool = False, trusted: bool = False, retain: bool = False
+) -> TypeTree[BufferParseFunction]:
+    """
+    Return a `TypeTree[BufferParseFunction]` that's able to create `cbincode`
+    buffer parsers for many different types.
+    """
+    simple_type_lookup: Dict[OriginArgsType, BufferParseFunction] = {
+        (Program, None): parse_program,
+        (bytes, None): parse_bytes_view if zero_copy else parse_bytes,
+        (str, None): parse_str,
+    }
+    compound_type_lookup: Dict[
+        Any,
+        Callable[[Type, ArgsType, TypeTree[BufferParseFunction]], BufferParseFunction],
+    ] = {
+        list: buffer_parser_for_list,
+        tuple: buffer_parser_for_tuple,
+        Union: buffer_parser_for_union,
+        UnionType: buffer_parser_for_union,
+    }
+    other_handler = trusted_buffer_parsers if trusted else extra_buffer_parsers
+    if retain:
+        inner_type_tree = buffer_parser_type_tree(zero_copy, trusted)
+        other_handler = retaining_buffer_parsers(other_handler, inner_type_tree)
+    type_tree: TypeTree[BufferParseFunction] = TypeTree(
+        simple_type_lookup,
+        compound_type_lookup,
+        other_handler,
+        codec_wrapper("buffer_parse"),
+    )
+    return type_tree
+
+
+def build_buffer_parser(
+    cls: Gtype, zero_copy: bool = False, trusted: bool = False, retain: bool = False
+) -> BufferParseFunction:
+    "build a new buffer parser for `cls`"
+    inner_parse = buffer_parser_type_tree(zero_copy, trusted, retain)(cls)
+
+    def parse_f(buf, offset: int = 0) -> Tuple[Any, int]:
+        return inner_parse(as_byte_view(buf), offset)
+
+    return parse_f
+
+
+def make_buffer_parser(
+    cls: Gtype, zero_copy: bool = False, trusted: bool = False, retain: bool = False
+) -> BufferParseFunction:
+    """
+    return a buffer parser for `cls`. It takes a `bytes`, `bytearray` or `memoryview`
+    and an optional offset, and returns `(value, new_offset)`.
+    Only pass `trusted=True` for data known to be valid. Pass `retain=True` to keep
+    the source bytes on the objects parsed, for re-streaming them unchanged
+    """
+    if not (zero_copy or trusted or retain):
+        return CODEC_REGISTRY.get("buffer_parse", cls, build_buffer_parser)
+    kind = (
+        "buffer_parse"
+        + "_zero_copy" * zero_copy
+        + "_trusted" * trusted
+        + "_retain" * retain
+    )
+    return CODEC_REGISTRY.get(
+        kind, cls, lambda t: build_buffer_parser(t, zero_copy, trusted, retain)
+    )
@@ -0,0 +1,255 @@
+"""
+Create a streamer function at runtime that writes directly into a preallocated
+`bytearray` rather than a `BinaryIO` stream. This supports the same types as
+`streamer`.
+
+A buffer streamer is called as `stream(obj, buf, offset)` and returns the offset
+just past what it wrote, filling the buffer with `pack_into` and slice assignment.
+The buffer must already be large enough, which is what `serialized_size` is for.
+This is useful for writing many objects into one caller-owned buffer, like an
+`mmap` or a shared memory block. The buffer is never resized: running out of room
+raises an exception instead.
+"""
+
+from dataclasses import fields, is_dataclass
+
+from typing import Any, Callable, Dict, Optional, Type, TypeVar, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import bulk_atom
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import UnionType
+
+from .registry import CODEC_REGISTRY
+from .retain import retains_source, source_bytes
+
+_T = TypeVar("_T")
+
+BufferStreamFunction = Callable[[_T, bytearray, int], int]
+
+
+def copy_into(blob, buf: bytearray, offset: int) -> int:
+    "copy `blob` into `buf` at `offset` without ever resizing `buf`"
+    end = offset + len(blob)
+    if end > len(buf):
+        raise ValueError(f"buffer too small: need {end} bytes, have {len(buf)}")
+    buf[offset:end] = blob
+    return end
+
+
+class BufferWriter:
+    """
+    A minimal write-only stand-in for `BinaryIO` over a preallocated buffer, so
+    types that only provide a stream `.stream` or `._class_stream` method can still
+    be streamed into it.
+    """
+
+    def __init__(self, buf: bytearray, offset: int):
+        self.buf = buf
+        self.offset = offset
+
+    def write(self, blob: bytes) -> int:
+        self.offset = copy_into(blob, self.buf, self.offset)
+        return len(blob)
+
+
+def stream_bytes(blob: bytes, buf: bytearray, offset: int) -> int:
+    "a buffer streamer for `bytes`"
+    uint32._struct.pack_into(buf, offset, len(blob))
+    return copy_into(blob, buf, offset + 4)
+
+
+def stream_str(s: str, buf: bytearray, offset: int) -> int:
+    "a buffer streamer for `str`"
+    return stream_bytes(s.encode(), buf, offset)
+
+
+def stream_program(p: Program, buf: bytearray, offset: int) -> int:
+    "a buffer streamer for `Program`"
+    return copy_into(bytes(p), buf, offset)
+
+
+def buffer_streamer_for_class_stream(
+    stream_f: Callable[[Any, Any], None],
+) -> BufferStreamFunction:
+    "adapt a `._class_stream` function to a buffer streamer"
+
+    def stream_into(obj: Any, buf: bytearray, offset: int) -> int:
+        f = BufferWriter(buf, offset)
+        stream_f(obj, f)
+        return f.offset
+
+    return stream_into
+
+
+def self_stream_into(obj: Any, buf: bytearray, offset: int) -> int:
+    "a buffer streamer for types that have a `.stream` method"
+    f = BufferWriter(buf, offset)
+    obj.stream(f)
+    return f.offset
+
+
+def buffer_streamer_for_list(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferStreamFunction],
+) -> BufferStreamFunction:
+    "create a buffer streamer for `List[X]` types"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+    item_type = args_type[0]
+    if bulk_atom(item_type):
+        stream_many = item_type.stream_many_to_buffer
+
+        def stream_many_into(items: list, buf: bytearray, offset: int) -> int:
+            uint32._struct.pack_into(buf, offset, len(items))
+            return stream_many(items, buf, offset + 4)
+
+        return stream_many_into
+
+    item_stream = type_tree(item_type)
+
+    def stream_into(items: list, buf: bytearray, offset: int) -> int:
+        uint32._struct.pack_into(buf, offset, len(items))
+        offset += 4
+        for item in items:
+            offset = item_stream(item, buf, offset)
+        return offset
+
+    return stream_into
+
+
+def buffer_streamer_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferStreamFunction],
+) -> BufferStreamFunction:
+    "create a buffer streamer for `Tuple[X, ...]` types"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    streamers = [type_tree(_) for _ in args_type]
+
+    def stream_into(item: tuple, buf: bytearray, offset: int) -> int:
+        if len(item) != len(streamers):
+            raise ValueError("incorrect number of items in tuple")
+        for s, v in zip(streamers, item):
+            offset = s(v, buf, offset)
+        return offset
+
+    return stream_into
+
+
+def buffer_streamer_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[BufferStreamFunction],
+) -> BufferStreamFunction:
+    "create a buffer streamer for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    streamer = type_tree(item_type)
+
+    def stream_into(item: Any, buf: bytearray, offset: int) -> int:
+        if item is None:
+            buf[offset] = 0
+            return offset + 1
+        buf[offset] = 1
+        return streamer(item, buf, offset + 1)
+
+    return stream_into
+
+
+def buffer_streamer_for_dataclass(
+    cls: type, type_tree: TypeTree[BufferStreamFunction]
+) -> BufferStreamFunction:
+    "create a buffer streamer for the given `dataclass`"
+    field_streamers = [(f.name, type_tree(f.type)) for f in fields(cls)]
+
+    def stream_into(v: Any, buf: bytearray, offset: int) -> int:
+        for name, stream_f in field_streamers:
+            offset = stream_f(getattr(v, name), buf, offset)
+        return offset
+
+    if not retains_source(cls):
+        return stream_into
+
+    def retained_stream_into(v: Any, buf: bytearray, offset: int) -> int:
+        source = source_bytes(v)
+        if source is None:
+            return stream_into(v, buf, offset)
+        return copy_into(source, buf, offset)
+
+    return retained_stream_into
+
+
+def _defining_class(cls: type, name: str) -> Optional[type]:
+    for k in cls.__mro__:
+        if name in k.__dict__:
+            return k
+    return None
+
+
+def extra_buffer_streamers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[BufferStreamFunction]
+) -> Optional[BufferStreamFunction]:
+    """
+    deal with `dataclass` objects and objects that have a `.stream_to_buffer`
+    or `._class_stream` class method, or a `.stream` object method
+    """
+    if hasattr(origin, "_class_stream"):
+        if hasattr(origin, "stream_to_buffer") and isinstance(origin, type):
+            # don't bypass a `_class_stream` overridden by a subclass
+            owner = _defining_class(origin, "stream_to_buffer")
+            if issubclass(owner, _defining_class(origin, "_class_stream")):  # type: ignore
+                return origin.stream_to_buffer
+        return buffer_streamer_for_class_stream(origin._class_stream)
+    if hasattr(origin, "stream"):
+        return self_stream_into
+    if is_dataclass(origin):
+        return buffer_streamer_for_dataclass(origin, type_tree)
+    return None
+
+
+def buffer_streamer_type_tree() -> TypeTree[BufferStreamFunction]:
+    """
+    Return a `TypeTree[BufferStreamFunction]` that's able to create `cbincode`
+    buffer streamers for many different types.
+    """
+    simple_type_lookup: Dict[OriginArgsType, BufferStreamFunction] = {
+        (Program, None): stream_program,
+        (bytes, None): stream_bytes,
+        (str, None): stream_str,
+    }
+    compound_type_lookup: Dict[
+        Any,
+        Callable[
+            [Type, ArgsType, TypeTree[BufferStreamFunction]], BufferStreamFunction
+        ],
+    ] = {
+        list: buffer_streamer_for_list,
+        tuple: buffer_streamer_for_tuple,
+        Union: buffer_streamer_for_union,
+        UnionType: buffer_streamer_for_union,
+    }
+    type_tree: TypeTree[BufferStreamFunction] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_buffer_streamers
+    )
+    return type_tree
+
+
+def make_buffer_streamer(cls: Gtype) -> BufferStreamFunction:
+    """
+    return a buffer streamer for `cls`. It takes an object, a `bytearray` that's
+    big enough and an offset, and returns the offset just past what it wrote
+    """
+    return CODEC_REGISTRY.get(
+        "buffer_stream", cls, lambda t: buffer_streamer_type_tree()(t)
+    )
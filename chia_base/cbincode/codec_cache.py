@@ -0,0 +1,271 @@
+"""
+Save compiled codecs to disk, so short-lived processes don't have to generate and
+compile them again.
+
+`precompile_codecs(types, path)` generates the compiled parser and streamer for
+each type and writes their code objects to `path`. `load_codecs(types, path)`
+registers them in `CODEC_REGISTRY` without walking the types with `TypeTree` or
+compiling any source, so the first call to `make_compiled_parser` or
+`make_compiled_streamer` for those types is a cache hit.
+
+Each codec is keyed by `schema_fingerprint` of its type: a hash of the names and
+types of the fields of every `dataclass` reachable from it, and of the
+serialization methods and struct formats of every other class. Changing a field
+changes the fingerprint, so the old codec is ignored, a new one is built as usual,
+and `load_codecs` adds it to the cache. The whole cache is ignored if it was written
+by a different Python version or a different version of the code generators.
+
+The objects generated code refers to (classes, `struct.Struct` objects, module
+functions and their methods) are saved by name and looked up again when loading.
+
+The cache is read with `marshal`, so only load files you wrote yourself.
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import marshal
+import os
+import struct
+
+from dataclasses import fields, is_dataclass
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, get_args, get_origin
+
+from chia_base.meta.type_tree import Gtype
+from chia_base.util.instrumentation import codec_wrapper
+
+from .codegen import CodeBuilder, exec_function
+from .compiled_parser import compiled_parser_code, make_compiled_parser
+from .compiled_streamer import compiled_streamer_code, make_compiled_streamer
+from .registry import CODEC_REGISTRY
+
+# bump this when the layout of the cache file changes
+CACHE_FORMAT = 1
+
+# the kinds of codec that are cached, with the functions that generate their code
+# and the functions that build them the usual way
+CODE_GENERATORS: Dict[str, Tuple[Callable[[Gtype], CodeBuilder], Callable]] = {
+    "compiled_parse": (compiled_parser_code, make_compiled_parser),
+    "compiled_stream": (compiled_streamer_code, make_compiled_streamer),
+}
+
+# modules whose source decides what code is generated for a given type
+_GENERATOR_MODULES = [
+    "chia_base.atoms.sized_bytes",
+    "chia_base.atoms.struct_stream",
+    "chia_base.cbincode.codegen",
+    "chia_base.cbincode.compiled_parser",
+    "chia_base.cbincode.compiled_streamer",
+    "chia_base.cbincode.parser",
+    "chia_base.cbincode.retain",
+    "chia_base.cbincode.sizer",
+    __name__,
+]
+
+# class attributes that change how a class is serialized
+_CODEC_ATTRIBUTES = [
+    "PACK",
+    "_size",
+    "__new__",
+    "parse",
+    "parse_many",
+    "_class_stream",
+    "pack_many",
+    "stream",
+]
+
+# (name, source, code, refs)
+CacheEntry = Tuple[str, str, Any, Tuple[Tuple[str, Any], ...]]
+
+_generator_version: Optional[str] = None
+
+
+def generator_version() -> str:
+    "a hash of the Python version and the source of the code generators"
+    global _generator_version
+    if _generator_version is None:
+        h = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+        h.update(b"%d" % CACHE_FORMAT)
+        for name in _GENERATOR_MODULES:
+            with open(importlib.import_module(name).__file__ or "", "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        _generator_version = h.hexdigest()
+    return _generator_version
+
+
+def _attribute_summary(v: Any) -> str:
+    if callable(v):
+        v = getattr(v, "__func__", v)
+        return "%s.%s" % (getattr(v, "__module__", ""), getattr(v, "__qualname__", ""))
+    return repr(v)
+
+
+def _describe_type(t: Gtype, seen: Dict[type, int]) -> Any:
+    "a nested tuple of strings describing everything about `t` that codecs depend on"
+    origin = get_origin(t)
+    if origin is not None:
+        args = tuple(_describe_type(_, seen) for _ in get_args(t))
+        return ("generic", repr(origin), args)
+    if not isinstance(t, type):
+        return ("other", repr(t))
+    if t in seen:
+        return ("seen", seen[t])
+    seen[t] = len(seen)
+    attributes = tuple(
+        (name, _attribute_summary(getattr(t, name)))
+        for name in _CODEC_ATTRIBUTES
+        if hasattr(t, name)
+    )
+    r: Tuple[Any, ...] = ("class", t.__module__, t.__qualname__, attributes)
+    if is_dataclass(t):
+        params = t.__dataclass_params__  # type: ignore[attr-defined]
+        r += (
+            params.frozen,
+            t.__dictoffset__ != 0,
+            repr(getattr(t, "__slots__", None)),
+            tuple((f.name, _describe_type(f.type, seen)) for f in fields(t)),
+        )
+    return r
+
+
+def schema_fingerprint(t: Gtype) -> str:
+    """
+    return a hash of the structure of `t` that changes whenever a field definition
+    reachable from `t` does
+    """
+    description = _describe_type(t, {})
+    return hashlib.sha256(repr(description).encode()).hexdigest()
+
+
+def _resolve_name(module: str, qualname: str) -> Any:
+    obj: Any = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def describe_ref(obj: Any) -> Any:
+    """
+    return a marshal-able description of `obj`, an object generated code refers to,
+    that `resolve_ref` turns back into an equal object
+    """
+    if isinstance(obj, struct.Struct):
+        return ("struct", obj.format)
+    if isinstance(obj, bytes) and type(obj) is bytes:
+        return ("bytes", obj)
+    owner = getattr(obj, "__self__", None)
+    if owner is not None and not isinstance(owner, ModuleType):
+        r: Any = ("attr", describe_ref(owner), obj.__name__)
+    elif isinstance(obj, type) or callable(obj):
+        r = ("name", obj.__module__, obj.__qualname__)
+    else:
+        raise ValueError(f"can't save a reference to {obj!r}")
+    try:
+        found = resolve_ref(r) == obj
+    except (ImportError, AttributeError):
+        found = False
+    if not found:
+        raise ValueError(f"can't find {obj!r} by name")
+    return r
+
+
+def resolve_ref(description: Any) -> Any:
+    "return the object `description` from `describe_ref` refers to"
+    kind = description[0]
+    if kind == "struct":
+        return struct.Struct(description[1])
+    if kind == "bytes":
+        return description[1]
+    if kind == "attr":
+        return getattr(resolve_ref(description[1]), description[2])
+    if kind == "name":
+        return _resolve_name(description[1], description[2])
+    raise ValueError(f"unknown reference {description!r}")
+
+
+def compile_entry(b: CodeBuilder, fingerprint: str) -> CacheEntry:
+    "compile the code in `b` into a cache entry"
+    refs = tuple((name, describe_ref(obj)) for name, obj in b.namespace.items())
+    source = b.source()
+    code = compile(source, f"<cbincode {b.name} {fingerprint[:12]}>", "exec")
+    return (b.name, source, code, refs)
+
+
+def function_from_entry(entry: CacheEntry) -> Callable:
+    "turn a cache entry back into a function"
+    name, source, code, refs = entry
+    namespace = {ref_name: resolve_ref(_) for ref_name, _ in refs}
+    return exec_function(name, source, code, namespace)
+
+
+def read_cache(path: str) -> Dict[Tuple[str, str], CacheEntry]:
+    "return the entries in the cache at `path`, or none if it's missing or stale"
+    try:
+        with open(path, "rb") as f:
+            cache = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != generator_version():
+        return {}
+    return cache["codecs"]
+
+
+def write_cache(path: str, entries: Dict[Tuple[str, str], CacheEntry]) -> None:
+    "replace the cache at `path` with `entries`, atomically"
+    cache = dict(version=generator_version(), codecs=entries)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def precompile_codecs(types: Iterable[Gtype], path: str) -> None:
+    "generate and compile the compiled codecs for each of `types` and save them"
+    entries = {}
+    for t in types:
+        fingerprint = schema_fingerprint(t)
+        for kind, (generate, _make) in CODE_GENERATORS.items():
+            entries[kind, fingerprint] = compile_entry(generate(t), fingerprint)
+    write_cache(path, entries)
+
+
+def load_codecs(types: Iterable[Gtype], path: str) -> int:
+    """
+    Register the compiled codecs for each of `types` from the cache at `path`,
+    returning how many were found there. Missing and stale codecs are built as
+    usual, and if there are any, they're added to the cache alongside the codecs
+    already there, so callers loading different types don't evict each other.
+    """
+    entries = read_cache(path)
+    used = {}
+    found = 0
+    for t in types:
+        fingerprint = schema_fingerprint(t)
+        for kind, (generate, make) in CODE_GENERATORS.items():
+            key = (kind, fingerprint)
+            entry = entries.get(key)
+            f = None
+            if entry is not None:
+                try:
+                    f = function_from_entry(entry)
+                    found += 1
+                except (ImportError, AttributeError, ValueError):
+                    pass
+            if f is None:
+                try:
+                    entry = compile_entry(generate(t), fingerprint)
+                except ValueError:
+                    # it refers to something that can't be found by name
+                    make(t)
+                    continue
+                f = function_from_entry(entry)
+            used[key] = entry
+            wrap = codec_wrapper(kind)
+            if wrap is not None:
+                f = wrap(t, f)
+            CODEC_REGISTRY.get(kind, t, lambda _, f=f: f)
+    if found < len(used):
+        entries.update(used)
+        write_cache(path, entries)
+    return found
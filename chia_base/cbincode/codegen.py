@@ -0,0 +1,141 @@
+"""
+Helpers for building specialized `cbincode` functions at runtime from generated
+Python source.
+
+The generated functions are straight-line code: nested types are inlined and runs
+of adjacent fixed-width fields are fused into a single `struct.Struct` call.
+"""
+
+import itertools
+import linecache
+import re
+import struct
+
+from contextlib import contextmanager
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from chia_base.atoms.sized_bytes import SizedBytes
+from chia_base.atoms.struct_stream import struct_stream
+
+_IDENTIFIER_RE = re.compile(r"[^0-9a-zA-Z_]")
+_FILENAME_COUNTER = itertools.count()
+
+
+def fused_struct_code(t: Any, method_name: str) -> Optional[str]:
+    """
+    Return the `struct` format code for `t` if it's a fixed-width atom whose
+    `method_name` method (`parse` or `_class_stream`) is the stock implementation,
+    so reading or writing it can be merged with its neighbours. Otherwise `None`.
+    """
+    if not isinstance(t, type):
+        return None
+    if issubclass(t, struct_stream):
+        base: Type = struct_stream
+        pack = t.PACK
+        if not pack.startswith("!"):
+            return None
+        code = pack[1:]
+    elif issubclass(t, SizedBytes):
+        base = SizedBytes
+        code = f"{t._size}s"
+    else:
+        return None
+    if getattr(t, method_name).__func__ is not getattr(base, method_name).__func__:
+        return None
+    return code
+
+
+class CodeBuilder:
+    """
+    Accumulate the source of one Python function, along with the namespace of
+    objects it refers to, then `exec` it.
+
+    Fixed-width values are not read or written immediately. Instead they are queued
+    with `pending` and emitted together, with one `struct.Struct`, when `flush` is
+    called.
+    """
+
+    def __init__(self, name: str, args: str):
+        self.name = name
+        self.lines: List[str] = [f"def {name}({args}):"]
+        self.namespace: Dict[str, Any] = {}
+        self._refs: Dict[int, str] = {}
+        self._indent = 1
+        self._counter = itertools.count()
+        self.pending_codes: List[str] = []
+        self.pending_items: List[str] = []
+
+    def var(self, hint: str = "v") -> str:
+        "return a new unique local variable name"
+        return f"_{hint}{next(self._counter)}"
+
+    def ref(self, obj: Any, hint: str = "") -> str:
+        "return a global name in the generated function's namespace bound to `obj`"
+        name = self._refs.get(id(obj))
+        if name is None:
+            hint = hint or getattr(obj, "__name__", "") or type(obj).__name__
+            name = "_%s_%d" % (_IDENTIFIER_RE.sub("_", hint), len(self._refs))
+            self._refs[id(obj)] = name
+            self.namespace[name] = obj
+        return name
+
+    def struct_ref(self, codes: List[str]) -> Tuple[str, int]:
+        "return a global name bound to a `struct.Struct` for `codes`, and its size"
+        s = struct.Struct("!" + "".join(codes))
+        return self.ref(s, "S"), s.size
+
+    def line(self, text: str) -> None:
+        self.lines.append("    " * self._indent + text)
+
+    @contextmanager
+    def block(self, header: str) -> Iterator[None]:
+        "emit `header` and indent the lines created inside the `with` body"
+        self.line(header)
+        self._indent += 1
+        yield
+        self._indent -= 1
+
+    def pending(self, code: str, item: str) -> None:
+        "queue a fixed-width value with `struct` format `code`"
+        self.pending_codes.append(code)
+        self.pending_items.append(item)
+
+    def take_pending(self) -> Tuple[List[str], List[str]]:
+        codes, items = self.pending_codes, self.pending_items
+        self.pending_codes, self.pending_items = [], []
+        return codes, items
+
+    def source(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    def build(self) -> Callable:
+        "compile the accumulated source and return the function"
+        source = self.source()
+        filename = f"<cbincode {self.name} {next(_FILENAME_COUNTER)}>"
+        code = compile(source, filename, "exec")
+        return exec_function(self.name, source, code, self.namespace)
+
+
+def exec_function(
+    name: str, source: str, code: CodeType, namespace: Dict[str, Any]
+) -> Callable:
+    "run `code`, compiled from `source`, in a copy of `namespace`, returning `name`"
+    filename = code.co_filename
+    # register the source so tracebacks through generated code are readable
+    linecache.cache[filename] = (
+        len(source),
+        None,
+        source.splitlines(True),
+        filename,
+    )
+    namespace = dict(namespace)
+    exec(code, namespace)
+    f = namespace[name]
+    f.__source__ = source
+    return f
+
+
+def function_name(prefix: str, t: Any) -> str:
+    "a readable identifier for the function generated for type `t`"
+    return "%s_%s" % (prefix, _IDENTIFIER_RE.sub("_", getattr(t, "__name__", str(t))))
@@ -0,0 +1,202 @@
+"""
+Columnar NumPy encoding and decoding for lists of fixed-size records.
+
+A type whose serialization is a fixed number of bytes (like `Coin`, or any
+`dataclass` or `tuple` made only of `bytes32`, int atoms and other `SizedBytes`)
+is laid out as a packed big-endian record, so a `List[T]` of them maps directly to
+a NumPy structured array. This lets a whole list be decoded with one
+`np.frombuffer`, and worked with as columns, without a Python object per item.
+
+    records, _ = parse_array(Coin, blob)
+    total = records["amount"].sum()
+    blob = array_to_bytes(records)
+
+Fixed-size byte strings map to `S<n>` fields. Note that NumPy strips trailing zero
+bytes when a single `S<n>` item is turned into `bytes`, so use
+`objects_from_array` or `.tobytes()` to get the exact values back.
+
+This needs `numpy`, which is an optional dependency.
+"""
+
+from dataclasses import fields, is_dataclass
+
+import io
+
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type, Union
+
+import numpy as np
+
+from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import struct_stream
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import GenericAlias, UnionType
+
+from .buffer_parser import as_byte_view, make_buffer_parser
+from .compiled_streamer import make_compiled_streamer
+from .registry import CODEC_REGISTRY
+
+# a NumPy dtype description, as accepted by `np.dtype`
+DtypeSpec = Union[str, List[Tuple[str, Any]]]
+
+_STRUCT_TO_NUMPY = {
+    "b": "i1",
+    "B": "u1",
+    "h": "i2",
+    "H": "u2",
+    "i": "i4",
+    "I": "u4",
+    "l": "i4",
+    "L": "u4",
+    "q": "i8",
+    "Q": "u8",
+    "?": "?",
+}
+
+
+def not_fixed(origin: Type, args_type: ArgsType, type_tree: Any) -> DtypeSpec:
+    raise ValueError(f"{origin} is not fixed-size, so has no record dtype")
+
+
+def dtype_spec_for_struct_stream(cls: Type[struct_stream]) -> DtypeSpec:
+    "map a one-value `struct_stream` like `uint64` to a big-endian NumPy type"
+    pack = cls.PACK
+    code = pack[1:] if pack[:1] in "!>" else None
+    if code not in _STRUCT_TO_NUMPY:
+        raise ValueError(f"can't map struct format {pack!r} of {cls} to a dtype")
+    return ">" + _STRUCT_TO_NUMPY[code]
+
+
+def dtype_spec_for_tuple(
+    origin_type: Type, args_type: ArgsType, type_tree: TypeTree[DtypeSpec]
+) -> DtypeSpec:
+    "a `Tuple[X, ...]` becomes a record with fields `f0`, `f1`, ..."
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    return [(f"f{idx}", type_tree(t)) for idx, t in enumerate(args_type)]
+
+
+def dtype_spec_for_dataclass(cls: Type, type_tree: TypeTree[DtypeSpec]) -> DtypeSpec:
+    "a `dataclass` becomes a record with the same field names"
+    specs = [(f.name, type_tree(f.type)) for f in fields(cls)]
+    if not specs:
+        raise ValueError(f"{cls} has no fields")
+    return specs
+
+
+def extra_dtype_specs(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[DtypeSpec]
+) -> Optional[DtypeSpec]:
+    """
+    deal with the int atoms, `SizedBytes` and `_size` types, and `dataclass` types.
+    Anything else that's parseable, like `Program`, is not fixed-size
+    """
+    if hasattr(origin, "parse"):
+        if isinstance(origin, type) and issubclass(origin, struct_stream):
+            return dtype_spec_for_struct_stream(origin)
+        size = getattr(origin, "_size", None)
+        if isinstance(size, int):
+            return f"S{size}"
+        return not_fixed(origin, args_type, type_tree)
+    if is_dataclass(origin):
+        return dtype_spec_for_dataclass(origin, type_tree)
+    return None
+
+
+def dtype_spec_type_tree() -> TypeTree[DtypeSpec]:
+    """
+    Return a `TypeTree[DtypeSpec]` that maps fixed-size types to NumPy structured
+    dtype descriptions, and raises `ValueError` for anything else.
+    """
+    simple_type_lookup: Dict[OriginArgsType, DtypeSpec] = {}
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[DtypeSpec]], DtypeSpec]
+    ] = {
+        list: not_fixed,
+        tuple: dtype_spec_for_tuple,
+        Union: not_fixed,
+        UnionType: not_fixed,
+    }
+    type_tree: TypeTree[DtypeSpec] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_dtype_specs
+    )
+    return type_tree
+
+
+def build_record_dtype(cls: Gtype) -> np.dtype:
+    return np.dtype(dtype_spec_type_tree()(cls))
+
+
+def record_dtype(cls: Gtype) -> np.dtype:
+    """
+    return the NumPy structured dtype matching the serialization of the fixed-size
+    type `cls`, or raise `ValueError`
+    """
+    return CODEC_REGISTRY.get("numpy_dtype", cls, build_record_dtype)
+
+
+def parse_array(cls: Gtype, buf, offset: int = 0) -> Tuple[np.ndarray, int]:
+    """
+    decode a serialized `List[cls]` at `offset` in `buf` into a structured array,
+    and return `(array, new_offset)`. The array is a read-only view of `buf`, so
+    no bytes are copied; use `.copy()` to get a writable array.
+    """
+    dtype = record_dtype(cls)
+    view = as_byte_view(buf)
+    (count,) = uint32._struct.unpack_from(view, offset)
+    start = offset + 4
+    end = start + count * dtype.itemsize
+    if end > len(view):
+        msg = f"unexpected EOS: need {end} bytes, have {len(view)}"
+        raise ValueError(msg)
+    records = np.frombuffer(view, dtype=dtype, count=count, offset=start)
+    return records, end
+
+
+def array_to_bytes(records: np.ndarray, cls: Optional[Gtype] = None) -> bytes:
+    """
+    encode a structured array as a serialized `List[cls]`. If `cls` is given,
+    the array is first converted to its record dtype.
+    """
+    if cls is not None:
+        records = np.asarray(records, dtype=record_dtype(cls))
+    if records.ndim != 1:
+        raise ValueError("records must be a one-dimensional array")
+    return uint32._struct.pack(len(records)) + records.tobytes()
+
+
+def array_from_columns(cls: Gtype, columns: Mapping[str, Any]) -> np.ndarray:
+    """
+    build a structured array of `cls` records out of one array-like per field
+    """
+    dtype = record_dtype(cls)
+    names = dtype.names or ()
+    if set(columns) != set(names):
+        raise ValueError(f"expected columns {list(names)}, got {list(columns)}")
+    lengths = {len(columns[name]) for name in names}
+    if len(lengths) != 1:
+        raise ValueError("columns have different lengths")
+    records = np.empty(lengths.pop(), dtype=dtype)
+    for name in names:
+        records[name] = columns[name]
+    return records
+
+
+def columns(records: np.ndarray) -> Dict[str, np.ndarray]:
+    "return a `dict` of field name to column for a structured array"
+    return {name: records[name] for name in records.dtype.names or ()}
+
+
+def array_from_objects(cls: Gtype, items: List[Any]) -> np.ndarray:
+    "build a structured array out of a list of `cls` objects"
+    list_type: Any = GenericAlias(list, (cls,))
+    f = io.BytesIO()
+    make_compiled_streamer(list_type)(items, f)
+    records, _ = parse_array(cls, f.getvalue())
+    return records.copy()
+
+
+def objects_from_array(cls: Gtype, records: np.ndarray) -> List[Any]:
+    "build a list of `cls` objects out of a structured array"
+    list_type: Any = GenericAlias(list, (cls,))
+    items, _ = make_buffer_parser(list_type)(array_to_bytes(records, cls))
+    return items
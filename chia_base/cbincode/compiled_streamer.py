@@ -0,0 +1,331 @@
+"""
+Create a specialized streamer function at runtime by generating Python source.
+
+This is an opt-in alternative to `make_streamer` that produces byte-for-byte
+identical output. One function is generated per type, with nested `dataclass`,
+`list`, `tuple` and `Optional` types inlined. Runs of adjacent fixed-width fields
+(including the `uint32` size prefixes of lists and blobs) are merged into a single
+`struct.Struct.pack`, and the pieces are collected and handed to `f.write` once.
+Only types that stream themselves with a `.stream` method (other than `Program`)
+force an extra `write`.
+"""
+
+from dataclasses import fields, is_dataclass
+
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms.struct_stream import bulk_atom
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .codegen import CodeBuilder, function_name, fused_struct_code
+from .registry import CODEC_REGISTRY
+from .retain import retains_source, source_bytes
+from .streamer import StreamFunction
+
+
+class StreamBuilder(CodeBuilder):
+    """
+    A `CodeBuilder` that also tracks the serialized pieces generated so far.
+
+    `parts` are expressions evaluating to `bytes` that haven't been added to the
+    run-time `_parts` list yet. Outside of loops and branches, they can be joined
+    directly in the final `f.write`.
+    """
+
+    def __init__(self, name: str, args: str):
+        super().__init__(name, args)
+        self.parts: List[str] = []
+        self.uses_parts_list = False
+
+
+# an `Emitter` adds the code to serialize the value of the expression passed in
+Emitter = Callable[[StreamBuilder, str], None]
+
+
+def raise_size(got: int, expected: int) -> None:
+    raise ValueError(f"got {got} bytes when we expected {expected}")
+
+
+def flush_pending(b: StreamBuilder) -> None:
+    "turn all pending fixed-width values into a single `pack` part"
+    codes, items = b.take_pending()
+    if codes:
+        s, _size = b.struct_ref(codes)
+        b.parts.append(f"{s}.pack({', '.join(items)})")
+
+
+def flush_parts(b: StreamBuilder) -> None:
+    "move the parts generated so far to the run-time `_parts` list"
+    flush_pending(b)
+    parts, b.parts = b.parts, []
+    if parts:
+        b.uses_parts_list = True
+        if len(parts) == 1:
+            b.line(f"_parts.append({parts[0]})")
+        else:
+            b.line(f"_parts += ({', '.join(parts)},)")
+
+
+def add_part(b: StreamBuilder, part: str) -> None:
+    flush_pending(b)
+    b.parts.append(part)
+
+
+def bind(b: StreamBuilder, expr: str) -> str:
+    "evaluate `expr` once into a local variable"
+    if expr.isidentifier():
+        return expr
+    v = b.var()
+    b.line(f"{v} = {expr}")
+    return v
+
+
+def emitter_for_fixed(cls: Type, code: str) -> Emitter:
+    "write a fixed-width atom as part of a fused `struct`"
+    size: Optional[int] = getattr(cls, "_size", None) if code.endswith("s") else None
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        if size is not None:
+            # `struct` silently pads or truncates `bytes`, so check the size
+            expr = bind(b, expr)
+            with b.block(f"if len({expr}) != {size}:"):
+                b.line(f"{b.ref(raise_size)}(len({expr}), {size})")
+        b.pending(code, expr)
+
+    return emit
+
+
+def emit_bytes(b: StreamBuilder, expr: str) -> None:
+    "an emitter for `bytes`"
+    v = bind(b, expr)
+    b.pending("L", f"len({v})")
+    add_part(b, v)
+
+
+def emit_str(b: StreamBuilder, expr: str) -> None:
+    "an emitter for `str`"
+    emit_bytes(b, f"{expr}.encode()")
+
+
+def emit_program(b: StreamBuilder, expr: str) -> None:
+    "an emitter for `Program`, using its cached serialization"
+    add_part(b, f"{b.ref(bytes)}({expr})")
+
+
+def write_parts(b: StreamBuilder) -> None:
+    "write and clear the run-time `_parts` list"
+    flush_parts(b)
+    b.uses_parts_list = True
+    with b.block("if _parts:"):
+        b.line(f"f.write({b.ref(b''.join, 'join')}(_parts))")
+        b.line("_parts.clear()")
+
+
+def emitter_for_class_stream(stream_f: StreamFunction, hint: str) -> Emitter:
+    "write what we have so far, then call an existing streamer function"
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        write_parts(b)
+        b.line(f"{b.ref(stream_f, hint)}({expr}, f)")
+
+    return emit
+
+
+def emit_self_stream(b: StreamBuilder, expr: str) -> None:
+    "write what we have so far, then call the object's `.stream` method"
+    write_parts(b)
+    b.line(f"{expr}.stream(f)")
+
+
+def emitter_for_bulk_list(item_type: Type) -> Emitter:
+    "write a `List[X]` of fixed-width integers with one call to `pack_many`"
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        items = bind(b, expr)
+        b.pending("L", f"len({items})")
+        pack_many = b.ref(item_type.pack_many, f"{item_type.__name__}_pack_many")
+        add_part(b, f"{pack_many}({items})")
+
+    return emit
+
+
+def emitter_for_list(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Emitter],
+) -> Emitter:
+    "create an emitter for `List[X]` types"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+    item_type = args_type[0]
+    if bulk_atom(item_type):
+        return emitter_for_bulk_list(item_type)
+
+    inner_emit = type_tree(item_type)
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        items = bind(b, expr)
+        b.pending("L", f"len({items})")
+        flush_parts(b)
+        item = b.var("i")
+        with b.block(f"for {item} in {items}:"):
+            inner_emit(b, item)
+            flush_parts(b)
+
+    return emit
+
+
+def emitter_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Emitter],
+) -> Emitter:
+    "create an emitter for `Tuple[X, ...]` types"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    inner_emits = [type_tree(_) for _ in args_type]
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        v = bind(b, expr)
+        with b.block(f"if len({v}) != {len(inner_emits)}:"):
+            b.line("raise ValueError('incorrect number of items in tuple')")
+        items = [b.var() for _ in inner_emits]
+        b.line(f"{', '.join(items)}, = {v}")
+        for inner_emit, item in zip(inner_emits, items):
+            inner_emit(b, item)
+
+    return emit
+
+
+def emitter_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Emitter],
+) -> Emitter:
+    "create an emitter for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    inner_emit = type_tree(item_type)
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        v = bind(b, expr)
+        flush_parts(b)
+        with b.block(f"if {v} is None:"):
+            b.pending("B", "0")
+            flush_parts(b)
+        with b.block("else:"):
+            b.pending("B", "1")
+            inner_emit(b, v)
+            flush_parts(b)
+
+    return emit
+
+
+def emitter_for_dataclass(cls: Type, type_tree: TypeTree[Emitter]) -> Emitter:
+    "create an emitter that inlines each field of the given `dataclass`"
+    field_emits = [(f.name, type_tree(f.type)) for f in fields(cls)]
+
+    def emit(b: StreamBuilder, expr: str) -> None:
+        v = bind(b, expr)
+        for name, inner_emit in field_emits:
+            inner_emit(b, f"{v}.{name}")
+
+    if not retains_source(cls):
+        return emit
+
+    def emit_retained(b: StreamBuilder, expr: str) -> None:
+        v = bind(b, expr)
+        flush_parts(b)
+        source = b.var("source")
+        b.line(f"{source} = {b.ref(source_bytes)}({v})")
+        with b.block(f"if {source} is None:"):
+            emit(b, v)
+            flush_parts(b)
+        with b.block("else:"):
+            add_part(b, source)
+            flush_parts(b)
+
+    return emit_retained
+
+
+def extra_emitters(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[Emitter]
+) -> Optional[Emitter]:
+    """
+    deal with `dataclass` objects and objects that have a `.stream` object method
+    or a `._class_stream` class method
+    """
+    if hasattr(origin, "_class_stream"):
+        code = fused_struct_code(origin, "_class_stream")
+        if code is not None:
+            return emitter_for_fixed(origin, code)
+        return emitter_for_class_stream(
+            origin._class_stream, f"{origin.__name__}_stream"
+        )
+    if hasattr(origin, "stream"):
+        return emit_self_stream
+    if is_dataclass(origin):
+        return emitter_for_dataclass(origin, type_tree)
+    return None
+
+
+def compiled_streamer_type_tree() -> TypeTree[Emitter]:
+    """
+    Return a `TypeTree[Emitter]` that generates inlined `cbincode` streaming code
+    for the same types as `streamer_type_tree`.
+    """
+    simple_type_lookup: Dict[OriginArgsType, Emitter] = {
+        (Program, None): emit_program,
+        (bytes, None): emit_bytes,
+        (str, None): emit_str,
+    }
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[Emitter]], Emitter]
+    ] = {
+        list: emitter_for_list,
+        tuple: emitter_for_tuple,
+        Union: emitter_for_union,
+        UnionType: emitter_for_union,
+    }
+    type_tree: TypeTree[Emitter] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_emitters
+    )
+    return type_tree
+
+
+def compiled_streamer_code(cls: Gtype) -> StreamBuilder:
+    "generate the source of a streamer for `cls`, without compiling it"
+    emit = compiled_streamer_type_tree()(cls)
+    b = StreamBuilder(function_name("stream", cls), "v, f")
+    emit(b, "v")
+    flush_pending(b)
+    if b.uses_parts_list:
+        write_parts(b)
+        b.lines.insert(1, "    _parts = []")
+    elif len(b.parts) == 1:
+        b.line(f"f.write({b.parts[0]})")
+    elif b.parts:
+        b.line(f"f.write({b.ref(b''.join, 'join')}(({', '.join(b.parts)},)))")
+    return b
+
+
+def build_compiled_streamer(cls: Gtype) -> StreamFunction:
+    "build a new code-generated streamer for `cls`"
+    stream_f = compiled_streamer_code(cls).build()
+    wrap = codec_wrapper("compiled_stream")
+    return stream_f if wrap is None else wrap(cls, stream_f)
+
+
+def make_compiled_streamer(cls: Gtype) -> StreamFunction:
+    "return a code-generated streamer for `cls`"
+    return CODEC_REGISTRY.get("compiled_stream", cls, build_compiled_streamer)
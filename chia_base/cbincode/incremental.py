@@ -0,0 +1,479 @@
+"""
+A sans-IO incremental decoder that can be fed partial chunks of data.
+
+    decoder = IncrementalDecoder(SpendBundle)
+    for chunk in chunks_from_a_socket():
+        for spend_bundle in decoder.feed(chunk):
+            ...
+
+The decoder is built out of "step parsers": generator functions that `yield` the
+number of bytes they need next, are sent exactly that many bytes, and finally
+return the parsed value. They compose with `yield from`, so a partially decoded
+object picks up exactly where it left off when more data arrives; nothing is
+parsed twice, and each byte is only buffered until the step that needs it runs.
+
+Types of constant size (like `Coin`) are read in one step and parsed with the
+buffer parser. A class whose `.parse` method reads an unknown number of bytes
+instead yields a `Peek` to see everything buffered so far. If that turns out to be
+too little, it's retried (just that one value), but not until there's as much data
+as the read that came up short asked for, so it isn't parsed again on every chunk.
+
+Pass a `ParseLimits` to bound untrusted input. Each size a step reads is checked
+before the decoder waits for that many bytes, so a peer can't make it buffer more
+than `max_bytes` for one value by claiming a huge list or blob.
+"""
+
+from dataclasses import fields, is_dataclass
+
+from typing import Any, Callable, Dict, Generator, List, Optional, Type, TypeVar, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import bulk_atom
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import GenericAlias, UnionType
+
+from .buffer_parser import make_buffer_parser, program_from_bytes
+from .limits import ParseLimits, check_limit, type_depth
+from .registry import CODEC_REGISTRY
+from .skipper import skipper_for_type
+
+_T = TypeVar("_T")
+
+# a step is either a number of bytes, or a `Peek`
+StepGenerator = Generator[Any, Any, _T]
+StepParser = Callable[[], StepGenerator]
+
+
+class Peek:
+    """
+    A step that's sent all the data buffered so far, once there are at least
+    `at_least` bytes of it, rather than a set number of bytes.
+    """
+
+    __slots__ = ("at_least",)
+
+    def __init__(self, at_least: int = 1):
+        self.at_least = at_least
+
+    def __repr__(self) -> str:
+        return f"Peek({self.at_least})"
+
+
+PEEK = Peek()
+
+
+class NeedMoreData(Exception):
+    "raised by `StrictReader` with how much data the short read needed"
+
+
+class StrictReader:
+    """
+    A `BinaryIO` stand-in over the data buffered so far, which raises
+    `NeedMoreData` on a short read rather than returning fewer bytes.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size: int) -> bytes:
+        end = self.offset + size
+        if end > len(self.data):
+            raise NeedMoreData(end)
+        r = self.data[self.offset : end]
+        self.offset = end
+        return r
+
+
+def step_parser_for_fixed(cls: Gtype, size: int) -> StepParser:
+    "read a value of constant size in one step, and parse it from the buffer"
+    parse = make_buffer_parser(cls)
+
+    def step() -> StepGenerator:
+        data = yield size
+        return parse(data)[0]
+
+    return step
+
+
+def step_parser_for_bytes(limits: ParseLimits) -> StepParser:
+    "create a step parser for `bytes`, checking the size prefix first"
+    max_blob_size = limits.max_blob_size
+
+    def step() -> StepGenerator:
+        (size,) = uint32._struct.unpack((yield 4))
+        check_limit("blob size", size, max_blob_size)
+        return (yield size)
+
+    return step
+
+
+def step_parser_for_str(limits: ParseLimits) -> StepParser:
+    "create a step parser for `str`, checking the size prefix first"
+    parse_bytes = step_parser_for_bytes(limits)
+
+    def step() -> StepGenerator:
+        blob = yield from parse_bytes()
+        return blob.decode()
+
+    return step
+
+
+def step_parser_for_program(limits: ParseLimits) -> StepParser:
+    """
+    create a step parser for `Program`, reading atoms in as few steps as possible
+    and checking its size and depth as it goes
+    """
+    max_blob_size = limits.max_blob_size
+    max_depth = limits.max_depth
+
+    def step() -> StepGenerator:
+        parts: List[bytes] = []
+        total = 0
+        # the number of values still to read at each level
+        pending = [1]
+        while pending:
+            prefix = yield 1
+            parts.append(prefix)
+            total += 1
+            b = prefix[0]
+            if b == 0xFF:
+                pending.append(2)
+                if max_depth is not None:
+                    check_limit("program depth", len(pending) - 1, max_depth)
+                continue
+            if b > 0x80:
+                bit_count = 0
+                bit_mask = 0x80
+                while b & bit_mask:
+                    bit_count += 1
+                    b &= 0xFF ^ bit_mask
+                    bit_mask >>= 1
+                size = b
+                if bit_count > 1:
+                    size_blob = yield bit_count - 1
+                    parts.append(size_blob)
+                    total += bit_count - 1
+                    for byte in size_blob:
+                        size = (size << 8) | byte
+                if size >= 0x400000000:
+                    raise ValueError("blob too large")
+                check_limit("program size", total + size, max_blob_size)
+                parts.append((yield size))
+                total += size
+            while pending:
+                pending[-1] -= 1
+                if pending[-1]:
+                    break
+                pending.pop()
+        return program_from_bytes(b"".join(parts))
+
+    return step
+
+
+def step_parser_for_stream_parser(parse: Callable[[Any], Any]) -> StepParser:
+    "the slow path for types of unknown size: retry `parse` until it has enough"
+
+    def step() -> StepGenerator:
+        request = PEEK
+        while True:
+            f = StrictReader((yield request))
+            try:
+                v = parse(f)
+            except NeedMoreData as ex:
+                # it reads the same way next time, so wait for this much
+                request = Peek(ex.args[0])
+                continue
+            yield f.offset
+            return v
+
+    return step
+
+
+def step_parser_for_list(
+    limits: ParseLimits,
+) -> Callable[[Type, ArgsType, TypeTree[StepParser]], StepParser]:
+    "create step parsers for `List[X]` that check the item count first"
+    max_list_length = limits.max_list_length
+
+    def parser_for_list(
+        origin_type: Type,
+        args_type: ArgsType,
+        type_tree: TypeTree[StepParser],
+    ) -> StepParser:
+        return list_step_parser(args_type, type_tree, max_list_length)
+
+    return parser_for_list
+
+
+def list_step_parser(
+    args_type: ArgsType,
+    type_tree: TypeTree[StepParser],
+    max_list_length: Optional[int],
+) -> StepParser:
+    "create a step parser for a `List[X]`"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+    item_type = args_type[0]
+    item_size = skipper_for_type(item_type).size
+
+    if item_size is not None:
+        parse_item = make_buffer_parser(item_type)
+        constant = item_size
+        bulk = bulk_atom(item_type)
+
+        def step_fixed() -> StepGenerator:
+            (length,) = uint32._struct.unpack((yield 4))
+            check_limit("list length", length, max_list_length)
+            data = memoryview((yield length * constant))
+            if bulk:
+                return item_type.unpack_many(data)
+            items = []
+            offset = 0
+            for _ in range(length):
+                item, offset = parse_item(data, offset)
+                items.append(item)
+            return items
+
+        return step_fixed
+
+    inner_step = type_tree(item_type)
+
+    def step() -> StepGenerator:
+        (length,) = uint32._struct.unpack((yield 4))
+        check_limit("list length", length, max_list_length)
+        items = []
+        for _ in range(length):
+            items.append((yield from inner_step()))
+        return items
+
+    return step
+
+
+def step_parser_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[StepParser],
+) -> StepParser:
+    "create a step parser for a `Tuple[X, ...]`"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    g: Any = GenericAlias(tuple, args_type)
+    size = skipper_for_type(g).size
+    if size is not None:
+        return step_parser_for_fixed(g, size)
+    steps = [type_tree(_) for _ in args_type]
+
+    def step() -> StepGenerator:
+        items = []
+        for inner_step in steps:
+            items.append((yield from inner_step()))
+        return tuple(items)
+
+    return step
+
+
+def step_parser_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[StepParser],
+) -> StepParser:
+    "create a step parser for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    inner_step = type_tree(item_type)
+
+    def step() -> StepGenerator:
+        flag = yield 1
+        if flag[0] == 0:
+            return None
+        return (yield from inner_step())
+
+    return step
+
+
+def step_parser_for_dataclass(cls: Type, type_tree: TypeTree[StepParser]) -> StepParser:
+    "create a step parser for the given `dataclass`"
+    size = skipper_for_type(cls).size
+    if size is not None:
+        return step_parser_for_fixed(cls, size)
+    steps = [type_tree(f.type) for f in fields(cls)]
+
+    def step() -> StepGenerator:
+        args = []
+        for inner_step in steps:
+            args.append((yield from inner_step()))
+        return cls(*args)
+
+    return step
+
+
+def extra_step_parsers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[StepParser]
+) -> Optional[StepParser]:
+    "deal with `dataclass` objects and objects that have a `.parse` class method"
+    if hasattr(origin, "parse"):
+        size = skipper_for_type(origin).size
+        if size is not None:
+            return step_parser_for_fixed(origin, size)
+        return step_parser_for_stream_parser(origin.parse)
+    if is_dataclass(origin):
+        return step_parser_for_dataclass(origin, type_tree)
+    return None
+
+
+def step_parser_type_tree(
+    limits: ParseLimits = ParseLimits(),
+) -> TypeTree[StepParser]:
+    """
+    Return a `TypeTree[StepParser]` that's able to create `cbincode` step parsers
+    for many different types, with the per-value checks of `limits`.
+    """
+    simple_type_lookup: Dict[OriginArgsType, StepParser] = {
+        (Program, None): step_parser_for_program(limits),
+        (bytes, None): step_parser_for_bytes(limits),
+        (str, None): step_parser_for_str(limits),
+    }
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[StepParser]], StepParser]
+    ] = {
+        list: step_parser_for_list(limits),
+        tuple: step_parser_for_tuple,
+        Union: step_parser_for_union,
+        UnionType: step_parser_for_union,
+    }
+    type_tree: TypeTree[StepParser] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_step_parsers
+    )
+    return type_tree
+
+
+def limited_step_parser(step: StepParser, max_bytes: int) -> StepParser:
+    """
+    wrap `step` so one value can't span more than `max_bytes`, failing as soon as
+    a step asks for more than what's left rather than after waiting for it
+    """
+
+    def step_limited() -> StepGenerator:
+        gen = step()
+        remaining = max_bytes
+        request = next(gen)
+        while True:
+            if isinstance(request, Peek):
+                check_limit("value size", request.at_least, remaining)
+                # a truncated view fails like one that's too short
+                data = (yield request)[:remaining]
+            else:
+                check_limit("value size", request, remaining)
+                data = yield request
+                remaining -= request
+            try:
+                request = gen.send(data)
+            except StopIteration as ex:
+                return ex.value
+
+    return step_limited
+
+
+def build_step_parser(cls: Gtype, limits: ParseLimits) -> StepParser:
+    "build a new step parser for `cls` that enforces `limits`"
+    if limits.max_depth is not None:
+        check_limit("type depth", type_depth(cls), limits.max_depth)
+    step = step_parser_type_tree(limits)(cls)
+    if limits.max_bytes is not None:
+        step = limited_step_parser(step, limits.max_bytes)
+    return step
+
+
+def make_step_parser(cls: Gtype, limits: Optional[ParseLimits] = None) -> StepParser:
+    "return a step parser for `cls`, enforcing `limits` if given"
+    if limits is None:
+        return CODEC_REGISTRY.get(
+            "step_parse", cls, lambda t: step_parser_type_tree()(t)
+        )
+    return CODEC_REGISTRY.get(
+        f"step_parse{limits!r}", cls, lambda t: build_step_parser(t, limits)
+    )
+
+
+class IncrementalDecoder:
+    """
+    Decode a sequence of serialized `cls` values from data that arrives in chunks
+    of any size. `feed` returns the values completed by each chunk. Pass `limits`
+    to bound each value, which `feed` enforces by raising `ValueError`.
+    """
+
+    def __init__(self, cls: Gtype, limits: Optional[ParseLimits] = None):
+        self._step = make_step_parser(cls, limits)
+        self._buf = bytearray()
+        self._gen: Optional[StepGenerator] = None
+        self._request: Any = None
+
+    @property
+    def buffered(self) -> int:
+        "the number of bytes fed but not yet consumed"
+        return len(self._buf)
+
+    @property
+    def in_progress(self) -> bool:
+        "`True` if a value has been started but not finished"
+        return self._gen is not None
+
+    def bytes_needed(self) -> int:
+        """
+        the minimum number of bytes to feed before another step can run. Reading
+        exactly this many never consumes data past the end of a value
+        """
+        request = self._request
+        if self._gen is None:
+            return 1
+        if isinstance(request, Peek):
+            request = request.at_least
+        return max(0, request - len(self._buf))
+
+    def feed(self, data: bytes) -> List[Any]:
+        "add `data` to the buffer and return a list of the values it completes"
+        self._buf += data
+        results: List[Any] = []
+        buf = self._buf
+        while True:
+            if self._gen is None:
+                if not buf:
+                    break
+                self._gen = self._step()
+                self._request = next(self._gen)
+            request = self._request
+            if isinstance(request, Peek):
+                if len(buf) < request.at_least:
+                    break
+                chunk = bytes(buf)
+            else:
+                if len(buf) < request:
+                    break
+                with memoryview(buf) as view:
+                    chunk = bytes(view[:request])
+                del buf[:request]
+            try:
+                self._request = self._gen.send(chunk)
+            except StopIteration as ex:
+                results.append(ex.value)
+                self._gen = None
+                self._request = None
+            except Exception:
+                self._gen = None
+                self._request = None
+                raise
+        return results
+
+    def close(self) -> None:
+        "call at the end of the data, to raise `ValueError` if a value is incomplete"
+        if self._gen is not None or self._buf:
+            raise ValueError(f"unexpected EOS: {len(self._buf)} bytes left over")
@@ -0,0 +1,180 @@
+"""
+Share identical values between parsed objects.
+
+Archives of spend bundles repeat the same puzzle hashes and the same puzzle reveals
+(standard puzzles, CATs) thousands of times, and parsing each one creates a new
+object. An `InternTable` maps each serialized `bytes32` (or other `SizedBytes`) and
+each serialized `Program` to one object, so parsing the same bytes again returns
+the object already in the table, and the duplicates are never built.
+
+    table = InternTable(max_size=100000)
+    bundles = [from_bytes(SpendBundle, blob, intern=table) for blob in blobs]
+
+The table holds at most `max_size` values, evicting the least recently used. Use
+one table per parsing session and thread: it isn't locked.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms.sized_bytes import SizedBytes
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .buffer_parser import (
+    BufferParseFunction,
+    as_byte_view,
+    buffer_parser_for_list,
+    buffer_parser_for_tuple,
+    buffer_parser_for_union,
+    extra_buffer_parsers,
+    parse_bytes,
+    parse_str,
+    program_from_bytes,
+    program_size,
+)
+
+
+class InternTable:
+    """
+    A table of shared values, keyed by `(type, serialized bytes)`, holding at most
+    `max_size` values and evicting the least recently used.
+    """
+
+    def __init__(self, max_size: int = 1 << 16):
+        self.max_size = max_size
+        self._values: "OrderedDict[Tuple[type, bytes], Any]" = OrderedDict()
+        self._parsers: Dict[Gtype, BufferParseFunction] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cls: type, blob: bytes, make: Callable[[bytes], Any]) -> Any:
+        "return the value for `blob` of type `cls`, calling `make(blob)` if needed"
+        key = (cls, blob)
+        values = self._values
+        value = values.get(key)
+        if value is not None:
+            values.move_to_end(key)
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = make(blob)
+        values[key] = value
+        if len(values) > self.max_size:
+            values.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def clear(self) -> None:
+        "drop every value and reset the counters"
+        self._values.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def interning_program_parser(table: InternTable) -> BufferParseFunction:
+    "parse a `Program`, sharing identical ones through `table`"
+    get = table.get
+
+    def parse_f(buf, offset: int) -> Tuple[Program, int]:
+        end = offset + program_size(buf, offset)
+        return get(Program, bytes(buf[offset:end]), program_from_bytes), end
+
+    return parse_f
+
+
+def interning_sized_bytes_parser(cls: Type, table: InternTable) -> BufferParseFunction:
+    "parse a `SizedBytes` subclass, sharing identical values through `table`"
+    size = cls._size
+    get = table.get
+
+    def make(blob: bytes) -> Any:
+        return bytes.__new__(cls, blob)
+
+    def parse_f(buf, offset: int) -> Tuple[Any, int]:
+        end = offset + size
+        if end > len(buf):
+            got = max(len(buf) - offset, 0)
+            raise ValueError(f"unexpected EOS: {got} bytes available, {size} expected")
+        return get(cls, bytes(buf[offset:end]), make), end
+
+    return parse_f
+
+
+def interning_buffer_parsers(
+    table: InternTable,
+) -> Callable[
+    [Type, ArgsType, TypeTree[BufferParseFunction]], Optional[BufferParseFunction]
+]:
+    "like `extra_buffer_parsers`, but sharing `SizedBytes` values through `table`"
+
+    def handler(
+        origin: Type, args_type: ArgsType, type_tree: TypeTree[BufferParseFunction]
+    ) -> Optional[BufferParseFunction]:
+        if (
+            isinstance(origin, type)
+            and issubclass(origin, SizedBytes)
+            and origin.parse_from_buffer.__func__  # type: ignore[attr-defined]
+            is SizedBytes.parse_from_buffer.__func__  # type: ignore[attr-defined]
+        ):
+            return interning_sized_bytes_parser(origin, table)
+        return extra_buffer_parsers(origin, args_type, type_tree)
+
+    return handler
+
+
+def interning_buffer_parser_type_tree(
+    table: InternTable,
+) -> TypeTree[BufferParseFunction]:
+    """
+    Return a `TypeTree[BufferParseFunction]` like `buffer_parser_type_tree`, where
+    `Program` and `SizedBytes` values are shared through `table`
+    """
+    simple_type_lookup: Dict[OriginArgsType, BufferParseFunction] = {
+        (Program, None): interning_program_parser(table),
+        (bytes, None): parse_bytes,
+        (str, None): parse_str,
+    }
+    compound_type_lookup: Dict[
+        Any,
+        Callable[[Type, ArgsType, TypeTree[BufferParseFunction]], BufferParseFunction],
+    ] = {
+        list: buffer_parser_for_list,
+        tuple: buffer_parser_for_tuple,
+        Union: buffer_parser_for_union,
+        UnionType: buffer_parser_for_union,
+    }
+    type_tree: TypeTree[BufferParseFunction] = TypeTree(
+        simple_type_lookup,
+        compound_type_lookup,
+        interning_buffer_parsers(table),
+        codec_wrapper("buffer_parse"),
+    )
+    return type_tree
+
+
+def build_interning_parser(cls: Gtype, table: InternTable) -> BufferParseFunction:
+    "build a new buffer parser for `cls` that shares values through `table`"
+    inner_parse = interning_buffer_parser_type_tree(table)(cls)
+
+    def parse_f(buf, offset: int = 0) -> Tuple[Any, int]:
+        return inner_parse(as_byte_view(buf), offset)
+
+    return parse_f
+
+
+def make_interning_parser(cls: Gtype, table: InternTable) -> BufferParseFunction:
+    """
+    return a buffer parser for `cls` that shares `Program` and `SizedBytes` values
+    through `table`. It's called like the parsers from `make_buffer_parser`, and
+    kept in `table` for reuse
+    """
+    parse = table._parsers.get(cls)
+    if parse is None:
+        parse = table._parsers.setdefault(cls, build_interning_parser(cls, table))
+    return parse
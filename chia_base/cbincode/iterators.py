@@ -0,0 +1,75 @@
+"""
+Parse and stream `List[T]` one item at a time, so peak memory grows with the
+size of one item rather than with the whole list.
+"""
+
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, get_args, get_origin
+
+from chia_base.atoms import uint32
+from chia_base.meta.type_tree import Gtype
+
+from .parser import make_parser
+from .streamer import make_streamer
+
+
+def list_item_type(cls: Gtype) -> Any:
+    "return `T` for `List[T]`"
+    args = get_args(cls)
+    if get_origin(cls) is not list or len(args) != 1:
+        raise ValueError(f"expected a completely specified list type, not {cls}")
+    return args[0]
+
+
+def iter_parse(cls: Gtype, f: BinaryIO) -> Iterator[Any]:
+    """
+    Read the `uint32` count of a `List[T]` from `f`, then return an iterator that
+    parses and yields one item at a time.
+    """
+    parse = make_parser(list_item_type(cls))
+    length = uint32.parse(f)
+
+    def items() -> Iterator[Any]:
+        for _ in range(length):
+            yield parse(f)
+
+    return items()
+
+
+def stream_iter(
+    cls: Gtype, items: Iterable[Any], f: BinaryIO, length: Optional[int] = None
+) -> int:
+    """
+    Stream `items` to `f` as a `List[T]`, pulling one item at a time.
+
+    The count prefix comes from `length` if given, or `len(items)` if it exists.
+    Otherwise, `f` must be seekable, and the count is patched in at the end.
+    Returns the number of items written.
+    """
+    stream = make_streamer(list_item_type(cls))
+    if length is None and hasattr(items, "__len__"):
+        length = len(items)  # type: ignore[arg-type]
+    if length is None:
+        seekable = getattr(f, "seekable", None)
+        if seekable is None or not seekable():
+            raise ValueError("need a length or a seekable stream")
+        start = f.tell()
+        uint32._class_stream(uint32(0), f)
+        count = 0
+        for item in items:
+            stream(item, f)
+            count += 1
+        end = f.tell()
+        f.seek(start)
+        uint32._class_stream(uint32(count), f)
+        f.seek(end)
+        return count
+    uint32._class_stream(uint32(length), f)
+    count = 0
+    for item in items:
+        if count >= length:
+            raise ValueError(f"more than the declared {length} items")
+        stream(item, f)
+        count += 1
+    if count != length:
+        raise ValueError(f"got {count} items but declared {length}")
+    return count
@@ -0,0 +1,125 @@
+"""
+Lazy views of serialized `dataclass` objects.
+
+`make_lazy_view(cls)` generates a class with the same field names as `cls`. An
+instance wraps a buffer and an offset, and decodes a field only the first time it's
+accessed. Fields that come after a run of fixed-size fields are at a constant
+offset, known when the view class is built. Later fields are found by skipping
+over the ones before them, which doesn't build any objects.
+
+    view = make_lazy_view(CoinSpend)(blob)
+    view.coin.puzzle_hash  # `puzzle_reveal` and `solution` are never built
+    coin_spend = view.materialize()
+"""
+
+from dataclasses import fields, is_dataclass
+
+from typing import Any, Dict, List, Tuple, Type
+
+from .buffer_parser import BufferParseFunction, as_byte_view, buffer_parser_type_tree
+from .registry import CODEC_REGISTRY
+from .skipper import SkipFunction, skipper_type_tree
+
+_MISSING = object()
+
+
+class LazyView:
+    """
+    The base class of views created by `make_lazy_view`. Don't use it directly.
+    """
+
+    __slots__ = ("_buf", "_offset", "_offsets", "_values")
+
+    _cls: Type
+    _field_names: Tuple[str, ...]
+    _parsers: Tuple[BufferParseFunction, ...]
+    _skippers: Tuple[SkipFunction, ...]
+    # offsets of fields, relative to the start of the object, that are constant
+    _constant_offsets: Tuple[int, ...]
+
+    def __init__(self, buf, offset: int = 0):
+        self._buf = as_byte_view(buf)
+        self._offset = offset
+        self._offsets: List[int] = list(self._constant_offsets)
+        self._values: List[Any] = [_MISSING] * len(self._field_names)
+
+    def _field_offset(self, index: int) -> int:
+        "return the absolute offset of field `index` (or the end, for `len(fields)`)"
+        offsets = self._offsets
+        while len(offsets) <= index:
+            prior = len(offsets) - 1
+            end = self._skippers[prior](self._buf, self._offset + offsets[prior])
+            offsets.append(end - self._offset)
+        return self._offset + offsets[index]
+
+    def _field(self, index: int) -> Any:
+        v = self._values[index]
+        if v is _MISSING:
+            v, _ = self._parsers[index](self._buf, self._field_offset(index))
+            self._values[index] = v
+        return v
+
+    @property
+    def offset(self) -> int:
+        "the offset of the serialized object in the buffer"
+        return self._offset
+
+    @property
+    def end_offset(self) -> int:
+        "the offset just past the serialized object in the buffer"
+        return self._field_offset(len(self._field_names))
+
+    def materialize(self) -> Any:
+        "decode every remaining field and build the real `dataclass` instance"
+        return self._cls(*(self._field(_) for _ in range(len(self._field_names))))
+
+    def __repr__(self) -> str:
+        return "<%s at %d>" % (self.__class__.__name__, self._offset)
+
+
+def field_property(index: int, name: str) -> property:
+    def get(self: LazyView) -> Any:
+        return self._field(index)
+
+    return property(get, doc=f"the lazily decoded `{name}` field")
+
+
+def build_lazy_view(cls: Type) -> Type[LazyView]:
+    "build a new lazy view class for the `dataclass` `cls`"
+    if not is_dataclass(cls):
+        raise ValueError(f"{cls} is not a dataclass")
+    parser_tree = buffer_parser_type_tree()
+    skipper_tree = skipper_type_tree()
+    field_types = [f.type for f in fields(cls)]
+    field_names = tuple(f.name for f in fields(cls))
+    skippers = [skipper_tree(_) for _ in field_types]
+
+    constant_offsets = [0]
+    for skipper in skippers:
+        if skipper.size is None:
+            break
+        constant_offsets.append(constant_offsets[-1] + skipper.size)
+
+    namespace: Dict[str, Any] = dict(
+        __slots__=(),
+        __module__=cls.__module__,
+        __qualname__=f"{cls.__qualname__}View",
+        _cls=cls,
+        _field_names=field_names,
+        _parsers=tuple(parser_tree(_) for _ in field_types),
+        _skippers=tuple(_.skip for _ in skippers),
+        _constant_offsets=tuple(constant_offsets),
+    )
+    for index, name in enumerate(field_names):
+        namespace[name] = field_property(index, name)
+    return type(f"{cls.__name__}View", (LazyView,), namespace)
+
+
+def make_lazy_view(cls: Type) -> Type[LazyView]:
+    "return the lazy view class for the `dataclass` `cls`"
+    return CODEC_REGISTRY.get("lazy_view", cls, build_lazy_view)
+
+
+def view_of(cls: Type, buf, offset: int = 0) -> Any:
+    "return a lazy view of the serialized `cls` at `offset` in `buf`"
+    return make_lazy_view(cls)(buf, offset)
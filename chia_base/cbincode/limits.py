@@ -0,0 +1,243 @@
+"""
+Parse untrusted input within fixed bounds.
+
+A serialized value declares its own sizes: each list and blob starts with a
+`uint32` count. Every buffer parser already rejects a count the rest of the buffer
+can't possibly hold (using the smallest size an item can serialize to) before
+allocating anything, and stream parsers read large blobs and lists of integers in
+pieces, so memory use follows the data that actually arrives rather than what it
+claims. That still
+allows a peer to send a message that's legitimately huge.
+
+`make_limited_parser(cls, limits)` returns a buffer parser that also enforces a
+`ParseLimits` everywhere in the type tree, failing with `ValueError` as soon as a
+limit is crossed, before anything is built for the offending part:
+
+- `max_bytes`: the most bytes one value may span. The parser never looks past this,
+  so a value that's too big fails like one that's truncated
+- `max_list_length`: the most items in any one list
+- `max_blob_size`: the most bytes in any one `bytes`, `str` or `Program`
+- `max_depth`: the deepest nesting of lists, tuples, `Optional` and `dataclass`
+  types in `cls`, checked when the parser is made, and separately, the deepest
+  nesting of pairs in any `Program`
+
+For stream parsers, `LimitedReader` caps the bytes read from a stream.
+"""
+
+from dataclasses import dataclass, fields, is_dataclass
+
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint32
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .buffer_parser import (
+    BufferParseFunction,
+    as_byte_view,
+    buffer_parser_for_list,
+    buffer_parser_for_tuple,
+    buffer_parser_for_union,
+    extra_buffer_parsers,
+    parse_bytes,
+    parse_str,
+    program_from_bytes,
+    program_size,
+)
+from .registry import CODEC_REGISTRY
+
+
+@dataclass(frozen=True)
+class ParseLimits:
+    "bounds on untrusted input. `None` means unlimited"
+
+    max_bytes: Optional[int] = None
+    max_list_length: Optional[int] = None
+    max_blob_size: Optional[int] = None
+    max_depth: Optional[int] = None
+
+
+def type_depth(t: Gtype) -> int:
+    "return how deeply lists, tuples, `Optional` and `dataclass` types nest in `t`"
+    args = get_args(t)
+    if get_origin(t) is not None:
+        return 1 + max((type_depth(_) for _ in args), default=0)
+    if isinstance(t, type) and is_dataclass(t) and not hasattr(t, "parse"):
+        return 1 + max((type_depth(f.type) for f in fields(t)), default=0)
+    return 0
+
+
+def program_depth(buf, offset: int = 0) -> int:
+    "return how deeply pairs nest in the serialized `Program` at `offset`"
+    # the number of values still to read at each level
+    pending = [1]
+    depth = 0
+    cursor = offset
+    while pending:
+        if cursor >= len(buf):
+            raise ValueError("bad encoding")
+        if buf[cursor] == 0xFF:
+            cursor += 1
+            pending.append(2)
+            depth = max(depth, len(pending) - 1)
+            continue
+        cursor += program_size(buf, cursor)
+        while pending:
+            pending[-1] -= 1
+            if pending[-1]:
+                break
+            pending.pop()
+    return depth
+
+
+def check_limit(what: str, size: int, limit: Optional[int]) -> None:
+    if limit is not None and size > limit:
+        raise ValueError(f"{what} of {size} exceeds limit of {limit}")
+
+
+def limited_blob_parser(
+    parse_f: BufferParseFunction, limits: ParseLimits
+) -> BufferParseFunction:
+    "check the size prefix of a `bytes` or `str` before parsing it"
+    max_blob_size = limits.max_blob_size
+
+    def parse_limited(buf, offset: int) -> Tuple[Any, int]:
+        (size,) = uint32._struct.unpack_from(buf, offset)
+        check_limit("blob size", size, max_blob_size)
+        return parse_f(buf, offset)
+
+    return parse_limited
+
+
+def limited_program_parser(limits: ParseLimits) -> BufferParseFunction:
+    "parse a `Program`, checking its size and depth first"
+    max_blob_size = limits.max_blob_size
+    max_depth = limits.max_depth
+
+    def parse_f(buf, offset: int) -> Tuple[Program, int]:
+        end = offset + program_size(buf, offset)
+        check_limit("program size", end - offset, max_blob_size)
+        if max_depth is not None:
+            check_limit("program depth", program_depth(buf, offset), max_depth)
+        return program_from_bytes(buf[offset:end]), end
+
+    return parse_f
+
+
+def limited_list_parser(
+    limits: ParseLimits,
+) -> Callable[[Type, ArgsType, TypeTree[BufferParseFunction]], BufferParseFunction]:
+    "create buffer parsers for `List[X]` that check the item count first"
+    max_list_length = limits.max_list_length
+
+    def parser_for_list(
+        origin_type: Type,
+        args_type: ArgsType,
+        type_tree: TypeTree[BufferParseFunction],
+    ) -> BufferParseFunction:
+        parse_list = buffer_parser_for_list(origin_type, args_type, type_tree)
+        if max_list_length is None:
+            return parse_list
+
+        def parse_f(buf, offset: int) -> Tuple[Any, int]:
+            (length,) = uint32._struct.unpack_from(buf, offset)
+            check_limit("list length", length, max_list_length)
+            return parse_list(buf, offset)
+
+        return parse_f
+
+    return parser_for_list
+
+
+def limited_buffer_parser_type_tree(
+    limits: ParseLimits,
+) -> TypeTree[BufferParseFunction]:
+    """
+    Return a `TypeTree[BufferParseFunction]` like `buffer_parser_type_tree`, with
+    the per-value checks of `limits`
+    """
+    simple_type_lookup: Dict[OriginArgsType, BufferParseFunction] = {
+        (Program, None): limited_program_parser(limits),
+        (bytes, None): limited_blob_parser(parse_bytes, limits),
+        (str, None): limited_blob_parser(parse_str, limits),
+    }
+    compound_type_lookup: Dict[
+        Any,
+        Callable[[Type, ArgsType, TypeTree[BufferParseFunction]], BufferParseFunction],
+    ] = {
+        list: limited_list_parser(limits),
+        tuple: buffer_parser_for_tuple,
+        Union: buffer_parser_for_union,
+        UnionType: buffer_parser_for_union,
+    }
+    type_tree: TypeTree[BufferParseFunction] = TypeTree(
+        simple_type_lookup,
+        compound_type_lookup,
+        extra_buffer_parsers,
+        codec_wrapper("buffer_parse"),
+    )
+    return type_tree
+
+
+def build_limited_parser(cls: Gtype, limits: ParseLimits) -> BufferParseFunction:
+    "build a new buffer parser for `cls` that enforces `limits`"
+    if limits.max_depth is not None:
+        check_limit("type depth", type_depth(cls), limits.max_depth)
+    inner_parse = limited_buffer_parser_type_tree(limits)(cls)
+    max_bytes = limits.max_bytes
+
+    def parse_f(buf, offset: int = 0) -> Tuple[Any, int]:
+        view = as_byte_view(buf)
+        if max_bytes is not None:
+            # so every bounds check also enforces `max_bytes`
+            view = view[: offset + max_bytes]
+        return inner_parse(view, offset)
+
+    return parse_f
+
+
+def make_limited_parser(cls: Gtype, limits: ParseLimits) -> BufferParseFunction:
+    """
+    return a buffer parser for `cls` that enforces `limits`. It's called like the
+    parsers from `make_buffer_parser`
+    """
+    return CODEC_REGISTRY.get(
+        f"limited_parse{limits!r}",
+        cls,
+        lambda t: build_limited_parser(t, limits),
+    )
+
+
+class LimitedReader:
+    """
+    Wrap a `BinaryIO` so no more than `max_bytes` can be read from it in total.
+    A read that asks for more than what's left of the budget fails with
+    `ValueError` before anything is read.
+    """
+
+    def __init__(self, f: BinaryIO, max_bytes: int):
+        self.f = f
+        self.remaining = max_bytes
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            raise ValueError("unbounded read from a `LimitedReader`")
+        if size > self.remaining:
+            raise ValueError(f"read of {size} bytes exceeds the {self.remaining} left")
+        blob = self.f.read(size)
+        self.remaining -= len(blob)
+        return blob
@@ -0,0 +1,93 @@
+"""
+Read `cbincode` records straight out of a memory-mapped file.
+
+A file here is just a concatenation of serialized records of one type, as written
+by repeated calls to a streamer. Records are parsed directly from the mapping with
+a buffer parser, so the file is never read into memory as a whole. Since the
+mapping is backed by the page cache, several processes mapping the same file share
+one copy of the data.
+"""
+
+import mmap
+import os
+
+from typing import Any, Iterator, List, Tuple, Union
+
+from chia_base.meta.type_tree import Gtype
+
+from .buffer_parser import make_buffer_parser
+from .skipper import make_skipper
+
+
+class MappedFile:
+    """
+    Random access to the records of type `cls` in the file at `path`, by byte offset.
+
+    Use as a context manager, or call `close` when done.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], cls: Gtype):
+        self.cls = cls
+        self._parse = make_buffer_parser(cls)
+        self._file = open(path, "rb")
+        self._mmap = None
+        try:
+            if os.fstat(self._file.fileno()).st_size > 0:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap if self._mmap is not None else b"")
+
+    @property
+    def buffer(self) -> memoryview:
+        "a read-only `memoryview` of the whole file"
+        return self._view
+
+    def __len__(self) -> int:
+        "the size of the file in bytes"
+        return len(self._view)
+
+    def parse_at(self, offset: int) -> Tuple[Any, int]:
+        "parse the record at byte `offset`, returning it and the offset of the next"
+        if not 0 <= offset < len(self._view):
+            raise IndexError(f"offset {offset} out of range")
+        return self._parse(self._view, offset)
+
+    def iter_records(self, offset: int = 0) -> Iterator[Tuple[int, Any]]:
+        "yield `(offset, record)` for each record from `offset` to the end of the file"
+        end = len(self._view)
+        while offset < end:
+            record, next_offset = self._parse(self._view, offset)
+            yield offset, record
+            offset = next_offset
+
+    def __iter__(self) -> Iterator[Any]:
+        for _offset, record in self.iter_records():
+            yield record
+
+    def record_offsets(self) -> List[int]:
+        """
+        return the byte offset of every record, suitable for `parse_at`. Records
+        are skipped over rather than parsed, which is much cheaper
+        """
+        skip = make_skipper(self.cls)
+        offsets = []
+        offset = 0
+        end = len(self._view)
+        while offset < end:
+            offsets.append(offset)
+            offset = skip(self._view, offset)
+        return offsets
+
+    def close(self) -> None:
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "MappedFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,189 @@
+"""
+Parse large sets of concatenated records on several cores.
+
+A file of records written one after another has no index, so first a cheap
+single-threaded pass with a skipper finds where each record starts. The records
+are then split into shards of about the same number of bytes, and each shard is
+parsed by a worker. Results come back in order.
+
+By default the workers are processes. The data isn't pickled to them: a file is
+memory-mapped by each worker, and a buffer is copied once into a
+`multiprocessing.shared_memory` block that every worker attaches to. On a
+free-threaded build of Python, threads are used instead, and work on the buffer
+directly.
+
+Results coming back from a process pool are pickled, so whole object graphs are
+never sent back. Pass a function `f` that reduces each record to something compact
+(like `CoinSpend -> coin name`), and it's applied in the workers. `f` must be
+picklable, ie. defined at the top level of a module. Without `f`, there's nothing
+a process could send back that's cheaper than parsing the records in place, so
+they're parsed in the calling process and no pool is used.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import os
+import sys
+
+from contextlib import ExitStack
+
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from chia_base.meta.type_tree import Gtype
+
+from .buffer_parser import as_byte_view, make_buffer_parser
+from .mapped_file import MappedFile
+from .skipper import make_skipper
+
+Source = Union[bytes, bytearray, memoryview, str, os.PathLike]
+MapFunction = Optional[Callable[[Any], Any]]
+
+
+def free_threaded() -> bool:
+    "return `True` if threads can run Python code on several cores at once"
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def record_offsets(cls: Gtype, buf, offset: int = 0) -> List[int]:
+    """
+    return the offset of each `cls` record serialized back to back in `buf` from
+    `offset`, followed by the offset of the end
+    """
+    skip = make_skipper(cls)
+    view = as_byte_view(buf)
+    end = len(view)
+    offsets = [offset]
+    while offset < end:
+        offset = skip(view, offset)
+        offsets.append(offset)
+    return offsets
+
+
+def shard_ranges(offsets: List[int], shard_count: int) -> List[Tuple[int, int]]:
+    """
+    split the records delimited by `offsets` into at most `shard_count` runs of
+    about the same number of bytes, returning a `(start, end)` offset pair for each
+    """
+    if len(offsets) < 2:
+        return []
+    total = offsets[-1] - offsets[0]
+    shards = []
+    start_index = 0
+    for shard in range(1, shard_count + 1):
+        target = offsets[0] + total * shard // shard_count
+        end_index = start_index
+        while end_index < len(offsets) - 1 and offsets[end_index] < target:
+            end_index += 1
+        if end_index > start_index:
+            shards.append((offsets[start_index], offsets[end_index]))
+            start_index = end_index
+    return shards
+
+
+def parse_range(cls: Gtype, buf, start: int, end: int, f: MapFunction) -> List[Any]:
+    "parse the records in `buf` from `start` to `end`, applying `f` to each"
+    parse = make_buffer_parser(cls)
+    view = as_byte_view(buf)
+    results = []
+    offset = start
+    while offset < end:
+        record, offset = parse(view, offset)
+        results.append(record if f is None else f(record))
+    return results
+
+
+def _parse_file_shard(
+    path: Union[str, os.PathLike], cls: Gtype, start: int, end: int, f: MapFunction
+) -> List[Any]:
+    with MappedFile(path, cls) as mapped_file:
+        return parse_range(cls, mapped_file.buffer, start, end, f)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # pool workers share the parent's resource tracker, so registering the block
+    # again here is harmless: it's unlinked once, by the parent
+    return shared_memory.SharedMemory(name=name)
+
+
+def _parse_shared_shard(
+    name: str, cls: Gtype, start: int, end: int, f: MapFunction
+) -> List[Any]:
+    shm = _attach_shared_memory(name)
+    try:
+        return parse_range(cls, shm.buf, start, end, f)
+    finally:
+        shm.close()
+
+
+def parallel_map(
+    cls: Gtype,
+    source: Source,
+    f: MapFunction = None,
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    shards_per_worker: int = 4,
+) -> List[Any]:
+    """
+    Parse every `cls` record in `source`, which is a `bytes`-like buffer or the
+    path of a file, and return `f(record)` for each (or the record itself if `f`
+    is `None`), in order. Without `f`, records aren't sent back from a process
+    pool, since pickling them is slower than parsing them: they're parsed here.
+
+    Uses a new process pool (or thread pool, on free-threaded builds) of up to
+    `max_workers` workers, unless an `executor` is passed in.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    is_path = isinstance(source, (str, os.PathLike))
+    use_threads = (
+        isinstance(executor, ThreadPoolExecutor)
+        if executor is not None
+        else free_threaded()
+    )
+
+    with ExitStack() as stack:
+        if is_path:
+            mapped_file = MappedFile(source, cls)  # type: ignore[arg-type]
+            view = stack.enter_context(mapped_file).buffer
+        else:
+            view = as_byte_view(source)
+        if f is None and not use_threads:
+            return parse_range(cls, view, 0, len(view), None)
+        offsets = record_offsets(cls, view)
+        ranges = shard_ranges(offsets, max_workers * shards_per_worker)
+        if not ranges:
+            return []
+
+        shm: Optional[shared_memory.SharedMemory] = None
+        if not (is_path or use_threads):
+            shm = shared_memory.SharedMemory(create=True, size=max(len(view), 1))
+            stack.callback(shm.unlink)
+            stack.callback(shm.close)
+            shm.buf[: len(view)] = view
+        if executor is None:
+            executor = (ThreadPoolExecutor if use_threads else ProcessPoolExecutor)(
+                max_workers
+            )
+            stack.callback(executor.shutdown)
+        if is_path:
+            futures = [
+                executor.submit(_parse_file_shard, source, cls, start, end, f)
+                for start, end in ranges
+            ]
+        elif shm is None:
+            futures = [
+                executor.submit(parse_range, cls, source, start, end, f)
+                for start, end in ranges
+            ]
+        else:
+            futures = [
+                executor.submit(_parse_shared_shard, shm.name, cls, start, end, f)
+                for start, end in ranges
+            ]
+        results: List[Any] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
@@ -28,9 +28,13 @@ from typing import (
 from clvm_rs import Program  # type: ignore
 
 from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import READ_CHUNK_SIZE, bulk_atom
 from chia_base.meta.optional import optional_from_union
 from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
 from chia_base.meta.typing import GenericAlias, UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .registry import CODEC_REGISTRY
 
 
 _T = TypeVar("_T")
@@ -38,10 +42,28 @@ _T = TypeVar("_T")
 ParseFunction = Callable[[BinaryIO], _T]
 
 
+def read_exactly(f: BinaryIO, size: int) -> bytes:
+    "read `size` bytes from `f`, raising `ValueError` if there aren't enough"
+    if size <= READ_CHUNK_SIZE:
+        blob = f.read(size)
+    else:
+        chunks = []
+        remaining = size
+        while remaining:
+            chunk = f.read(min(remaining, READ_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        blob = b"".join(chunks)
+    if len(blob) != size:
+        raise ValueError(f"unexpected EOS: {len(blob)} bytes read, {size} expected")
+    return blob
+
+
 def parse_bytes(f: BinaryIO) -> bytes:
     "a parser for `bytes`"
-    size = uint32.parse(f)
-    return f.read(size)
+    return read_exactly(f, uint32.parse(f))
 
 
 def parse_str(f: BinaryIO) -> str:
@@ -61,6 +83,14 @@ def parser_for_list(
         raise ValueError("list type has too many specifiers")
 
     subtype = args_type[0]
+    if bulk_atom(subtype):
+        parse_many = subtype.parse_many
+
+        def parse_many_f(f: BinaryIO) -> List[_T]:
+            return parse_many(f, uint32.parse(f))
+
+        return parse_many_f
+
     inner_parse: ParseFunction = type_tree(subtype)
 
     def parse_f(f: BinaryIO) -> List[_T]:
@@ -153,11 +183,14 @@ def parser_type_tree() -> TypeTree[ParseFunction]:
         UnionType: parser_for_union,
     }
     type_tree: TypeTree[ParseFunction] = TypeTree(
-        simple_type_lookup, compound_type_lookup, extra_parsers
+        simple_type_lookup,
+        compound_type_lookup,
+        extra_parsers,
+        codec_wrapper("parse"),
     )
     return type_tree
 
 
 def make_parser(cls: Gtype) -> ParseFunction:
     "return a parser for `cls`"
-    return parser_type_tree()(cls)
+    return CODEC_REGISTRY.get("parse", cls, lambda t: parser_type_tree()(t))
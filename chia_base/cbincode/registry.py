@@ -0,0 +1,213 @@
+"""
+A process-wide, thread-safe cache of codec functions, so the parser or streamer for
+a type is only built once.
+
+Codecs are keyed by `(kind, type)`, where `kind` names the sort of function
+(`"parse"`, `"stream"`, ...) and `type` is anything `TypeTree` accepts, including
+`GenericAlias` types like `List[Coin]`.
+
+A codec for a `dataclass` refers to that class, so the registry can't simply hold
+codecs in a global `dict` without keeping dynamically created classes alive
+forever. Instead, each codec is stored in the `__dict__` of a class that appears in
+its key (the "owner"), and disappears along with that class. Since the codec keeps
+every other class in its key alive as long as the owner lives, the owner is the
+class most likely to be short-lived: the last one in the key that can't be found by
+name in its module, like a class defined in a function, or else the last one. Codecs
+for types built only out of `builtins` and extension types are held directly.
+
+Finding the owner of a composite type like `List[Coin]` means walking it, so the
+owner is also cached by the `id` of the type object, with weak references to both
+that are dropped when the type object goes away.
+"""
+
+import itertools
+import sys
+import threading
+import weakref
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+    TypeVar,
+    get_args,
+    get_origin,
+)
+
+from chia_base.meta.type_tree import Gtype
+
+_T = TypeVar("_T")
+
+_OWNER_ATTR = "_cbincode_codecs"
+_OWNER_LOCK = threading.Lock()
+_REGISTRY_IDS = itertools.count()
+
+
+class _OwnerRef(weakref.ref):
+    "a weak reference to a composite type, carrying a weak reference to its owner"
+
+    __slots__ = ("key", "owner")
+
+    def __new__(cls, t: Gtype, owner: Optional[type]) -> "_OwnerRef":
+        return super().__new__(cls, t, _forget_owner)
+
+    def __init__(self, t: Gtype, owner: Optional[type]):
+        super().__init__(t, _forget_owner)
+        self.key = id(t)
+        self.owner = None if owner is None else weakref.ref(owner)
+
+
+# the owners of composite types, by `id`
+_OWNER_CACHE: Dict[int, _OwnerRef] = {}
+
+
+def _forget_owner(ref: _OwnerRef) -> None:
+    # the `id` may already belong to a newer object
+    if _OWNER_CACHE.get(ref.key) is ref:
+        del _OWNER_CACHE[ref.key]
+
+
+def _classes_in_type(t: Gtype) -> Iterator[type]:
+    "yield each class mentioned in `t`, outermost first"
+    origin = get_origin(t)
+    if origin is None:
+        if isinstance(t, type):
+            yield t
+        return
+    if isinstance(origin, type):
+        yield origin
+    for arg in get_args(t):
+        yield from _classes_in_type(arg)
+
+
+def _is_dynamic(cls: type) -> bool:
+    "return `True` if `cls` can't be found by name in its module"
+    obj: Any = sys.modules.get(cls.__module__)
+    for part in cls.__qualname__.split("."):
+        obj = getattr(obj, part, None)
+    return obj is not cls
+
+
+def _owner_for_type(t: Gtype) -> Optional[type]:
+    """
+    return the class in `t` that should carry its codecs in its `__dict__`: the
+    last dynamic one if there is one, or else the last one
+    """
+    candidates = [_ for _ in _classes_in_type(t) if _.__module__ != "builtins"]
+    if len(candidates) > 1:
+        # a stable sort, so dynamic classes come last and the order is kept
+        candidates.sort(key=_is_dynamic)
+    for cls in reversed(candidates):
+        with _OWNER_LOCK:
+            if _OWNER_ATTR not in cls.__dict__:
+                try:
+                    setattr(cls, _OWNER_ATTR, {})
+                except TypeError:
+                    # extension types are immutable
+                    continue
+        return cls
+    return None
+
+
+def _cached_owner_for_type(t: Gtype) -> Optional[type]:
+    "return `_owner_for_type(t)`, walking the type object `t` only the first time"
+    ref = _OWNER_CACHE.get(id(t))
+    if ref is not None and ref() is t:
+        if ref.owner is None:
+            return None
+        owner = ref.owner()
+        if owner is not None:
+            return owner
+    owner = _owner_for_type(t)
+    try:
+        _OWNER_CACHE[id(t)] = _OwnerRef(t, owner)
+    except TypeError:
+        # `t` can't be weakly referenced, like `Coin | None`
+        pass
+    return owner
+
+
+class CodecRegistry:
+    """
+    Cache codec functions by `(kind, type)`.
+
+    `get` is lock-free on a hit: a class finds its codecs in its own `__dict__`,
+    and a composite type finds its owner in a cache, then its codecs in the owner's
+    `__dict__`. On a miss, the codec is built outside the lock and the first one
+    stored wins, so concurrent callers always get the same function.
+    The `hits` and `misses` counters aren't synchronized, so are approximate when
+    there is contention.
+    """
+
+    def __init__(self) -> None:
+        self._id = next(_REGISTRY_IDS)
+        self._lock = threading.Lock()
+        self._static: Dict[Tuple[int, str, Gtype], Any] = {}
+        self._owners: "weakref.WeakSet[type]" = weakref.WeakSet()
+        self.hits = 0
+        self.misses = 0
+
+    def _table_for(self, t: Gtype) -> Dict[Tuple[int, str, Gtype], Any]:
+        owner = _cached_owner_for_type(t)
+        if owner is None:
+            return self._static
+        return owner.__dict__[_OWNER_ATTR]
+
+    def get(self, kind: str, t: Gtype, factory: Callable[[Gtype], _T]) -> _T:
+        """
+        return the cached codec of `kind` for `t`, building it with `factory` if
+        needed
+        """
+        key = (self._id, kind, t)
+        try:
+            # fast path: a class that already owns a table owns its own codecs
+            table = t.__dict__.get(_OWNER_ATTR) if isinstance(t, type) else None
+            if table is None:
+                table = self._table_for(t)
+            r = table.get(key)
+        except TypeError:
+            # unhashable type annotation: build it, but don't cache it
+            return factory(t)
+        if r is not None:
+            self.hits += 1
+            return r
+        self.misses += 1
+        new_r = factory(t)
+        owner = _cached_owner_for_type(t)
+        if owner is None:
+            table = self._static
+        else:
+            # make sure the owner is tracked by this registry
+            self._owners.add(owner)
+            table = owner.__dict__[_OWNER_ATTR]
+        with self._lock:
+            return table.setdefault(key, new_r)
+
+    def _tables(self) -> Iterator[Dict[Tuple[int, str, Gtype], Any]]:
+        yield self._static
+        for owner in list(self._owners):
+            yield owner.__dict__[_OWNER_ATTR]
+
+    def size(self) -> int:
+        "return the number of cached codecs"
+        with self._lock:
+            return sum(1 for table in self._tables() for k in table if k[0] == self._id)
+
+    def stats(self) -> Dict[str, int]:
+        "return a `dict` with `hits`, `misses` and `size`"
+        return dict(hits=self.hits, misses=self.misses, size=self.size())
+
+    def clear(self) -> None:
+        "drop every cached codec and reset the counters"
+        with self._lock:
+            for table in self._tables():
+                for k in [k for k in table if k[0] == self._id]:
+                    del table[k]
+            self.hits = 0
+            self.misses = 0
+
+
+CODEC_REGISTRY = CodecRegistry()
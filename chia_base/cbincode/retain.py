@@ -0,0 +1,208 @@
+"""
+Keep the exact bytes a `dataclass` object was parsed from, so serializing it again
+is a copy instead of a walk over every field.
+
+Buffer parsers made with `retain=True` record the source bytes of each object they
+build with a function from `source_setter`. They're kept in a table here rather
+than on the object, keyed by `id` and dropped through a weak reference when the
+object goes away, so a class needs nothing more than to support weak references (a
+`__slots__` class lists `__weakref__`). Streamers, buffer streamers and `to_bytes`
+write the bytes from `source_bytes` out as they are, and so
+`std_hash(to_bytes(obj))` hashes them without re-serializing anything.
+
+Only frozen `dataclass` types that are streamed field by field and aren't a fixed
+size retain their source, like `CoinSpend` and `SpendBundle`: a fixed-size record
+like `Coin` is already cheap to stream. Only the outermost of these keep their
+bytes, so the `CoinSpend` objects of a retained `SpendBundle` don't hold a second
+copy of them.
+
+The fields of a frozen object can't be reassigned, and `dataclasses.replace` builds
+a new object without a source, but a list field can still be changed in place, like
+appending to `SpendBundle.coin_spends`. So the items of every list in a retained
+object are noted when it's parsed, and `source_bytes` only returns the bytes while
+each list still holds the same items. Types holding a `dataclass` that isn't frozen
+can change in ways that can't be checked, so they don't retain their source.
+"""
+
+import operator
+import weakref
+
+from dataclasses import fields, is_dataclass
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import Gtype
+from chia_base.meta.typing import UnionType
+
+from .sizer import sizer_for_type
+
+_CUSTOM_CODEC_METHODS = ("parse", "parse_from_buffer", "stream", "_class_stream")
+
+# each list in an object, with the items it held when the object was parsed
+ListSnapshot = Tuple[Tuple[list, Tuple[Any, ...]], ...]
+
+# adds `(list, items)` to `out` for each list in a value
+ListFinder = Callable[[Any, List[Tuple[list, Tuple[Any, ...]]]], None]
+
+
+class _SourceRef(weakref.ref):
+    "a weak reference to a parsed object, carrying its source bytes"
+
+    __slots__ = ("key", "source", "lists")
+
+    def __new__(cls, obj: Any, source: bytes, lists: ListSnapshot) -> "_SourceRef":
+        return super().__new__(cls, obj, _forget)
+
+    def __init__(self, obj: Any, source: bytes, lists: ListSnapshot):
+        super().__init__(obj, _forget)
+        self.key = id(obj)
+        self.source = source
+        self.lists = lists
+
+
+# the retained objects, by `id`
+_SOURCES: Dict[int, _SourceRef] = {}
+
+
+def _forget(ref: _SourceRef) -> None:
+    # the `id` may already belong to a newer object
+    if _SOURCES.get(ref.key) is ref:
+        del _SOURCES[ref.key]
+
+
+def _has_custom_codec(t: Gtype) -> bool:
+    return any(hasattr(t, _) for _ in _CUSTOM_CODEC_METHODS)
+
+
+def _field_types(t: Gtype) -> Optional[List[Gtype]]:
+    """
+    return the types of the values directly inside a `t` that are serialized field
+    by field, or `None` if there aren't any
+    """
+    origin = get_origin(t)
+    if origin in (Union, UnionType):
+        item_type = optional_from_union(get_args(t))
+        return None if item_type is None else [item_type]
+    if origin in (list, tuple):
+        return list(get_args(t))
+    if isinstance(t, type) and is_dataclass(t) and not _has_custom_codec(t):
+        return [f.type for f in fields(t)]
+    return None
+
+
+def is_checkably_immutable(t: Gtype) -> bool:
+    """
+    return `True` if the only part of a `t` that can change after it's built is the
+    contents of its lists
+    """
+    if isinstance(t, type) and is_dataclass(t) and not _has_custom_codec(t):
+        if not t.__dataclass_params__.frozen:  # type: ignore
+            return False
+    return all(is_checkably_immutable(_) for _ in _field_types(t) or [])
+
+
+def list_finder(t: Gtype) -> Optional[ListFinder]:
+    "return a `ListFinder` for `t`, or `None` if a `t` holds no lists"
+    origin = get_origin(t)
+    if origin is list:
+        inner = list_finder(get_args(t)[0])
+
+        def find_in_list(v, out) -> None:
+            out.append((v, tuple(v)))
+            if inner is not None:
+                for item in v:
+                    inner(item, out)
+
+        return find_in_list
+
+    item_types = _field_types(t)
+    if item_types is None:
+        return None
+    finders = [list_finder(_) for _ in item_types]
+    if not any(finders):
+        return None
+    if origin in (Union, UnionType):
+        inner_f = finders[0]
+
+        def find_in_optional(v, out) -> None:
+            if v is not None:
+                inner_f(v, out)  # type: ignore[misc]
+
+        return find_in_optional
+    if origin is tuple:
+        indexed = [(i, f) for i, f in enumerate(finders) if f is not None]
+
+        def find_in_tuple(v, out) -> None:
+            for i, f in indexed:
+                f(v[i], out)
+
+        return find_in_tuple
+    names = [(f.name, g) for f, g in zip(fields(t), finders) if g is not None]
+
+    def find_in_fields(v, out) -> None:
+        for name, f in names:
+            f(getattr(v, name), out)
+
+    return find_in_fields
+
+
+def retains_source(cls: Gtype) -> bool:
+    "return `True` if parsed `cls` objects can keep their source bytes"
+    if not (isinstance(cls, type) and is_dataclass(cls)):
+        return False
+    if cls.__weakrefoffset__ == 0 or _has_custom_codec(cls):
+        return False
+    if not is_checkably_immutable(cls):
+        return False
+    try:
+        return sizer_for_type(cls).size is None
+    except ValueError:
+        return False
+
+
+def set_source(obj: Any, source: bytes, lists: ListSnapshot = ()) -> None:
+    """
+    record `source` as the bytes `obj` was parsed from, valid while each list in
+    `lists` holds the items noted with it
+    """
+    _SOURCES[id(obj)] = _SourceRef(obj, source, lists)
+
+
+def source_setter(cls: Gtype) -> Callable[[Any, bytes], None]:
+    "return a function that calls `set_source` for a `cls`, noting its lists"
+    finder = list_finder(cls)
+    if finder is None:
+        return set_source
+
+    def set_f(obj: Any, source: bytes) -> None:
+        lists: List[Tuple[list, Tuple[Any, ...]]] = []
+        finder(obj, lists)  # type: ignore[misc]
+        set_source(obj, source, tuple(lists))
+
+    return set_f
+
+
+def source_bytes(obj: Any) -> Optional[bytes]:
+    """
+    return the bytes `obj` was parsed from, if they were retained and its lists
+    haven't changed since
+    """
+    ref = _SOURCES.get(id(obj))
+    if ref is None or ref() is not obj:
+        return None
+    for items, expected in ref.lists:
+        if len(items) != len(expected) or any(map(operator.is_not, items, expected)):
+            _forget(ref)
+            return None
+    return ref.source
@@ -0,0 +1,178 @@
+"""
+Objects to stream into, in place of a `BinaryIO`.
+
+Streamers only ever call `write` on the stream they're given, so anything with a
+`write` method will do. These sinks do something more useful with the data than
+collect it in a `BytesIO`.
+
+`HashSink` hashes everything written to it, optionally passing it on to another
+file or socket, so the hash of the serialized form of an object is computed in
+the same pass that writes it, and the serialized form is never collected in full.
+
+`SegmentSink` collects what's written as a list of segments without copying large
+`bytes` objects (like blobs and `Program` serializations), coalescing small writes,
+and hands them to `os.writev` or `socket.sendmsg` in one system call, or joins them
+once.
+
+`BufferSink` appends to a `bytearray` that keeps its memory between messages when
+it's `clear`ed, so streaming many messages in a row doesn't allocate a new buffer
+for each one.
+"""
+
+import hashlib
+import os
+
+from typing import Any, Callable, List, Optional
+
+# segments sent per `writev` or `sendmsg` call
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, OSError, ValueError):
+    IOV_MAX = 1024
+
+
+class HashSink:
+    """
+    A write-only stream that feeds everything written to it into `hasher`, a
+    `hashlib` object (a new `sha256` by default). If `tee` is given, data is also
+    written to it, using `write`, or `sendall` for a socket.
+    """
+
+    def __init__(self, hasher: Optional[Any] = None, tee: Optional[Any] = None):
+        self.hasher = hashlib.sha256() if hasher is None else hasher
+        self.tee = tee
+        self._tee_write = None
+        if tee is not None:
+            self._tee_write = getattr(tee, "write", None) or tee.sendall
+        self._size = 0
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        if self._tee_write is not None:
+            self._tee_write(data)
+        self._size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        "the number of bytes written so far"
+        return self._size
+
+    def digest(self) -> bytes:
+        return self.hasher.digest()
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+class SegmentSink:
+    """
+    A write-only stream that keeps the data written to it as a list of segments.
+
+    `bytes` objects of at least `min_segment_size` are kept by reference. Anything
+    else is copied into a `bytearray` shared with the neighbouring small writes, so
+    a streamer's many small writes don't turn into many tiny segments.
+    """
+
+    def __init__(self, min_segment_size: int = 1024):
+        self.min_segment_size = min_segment_size
+        self._segments: List[Any] = []
+        self._tail = bytearray()
+        self._size = 0
+
+    def write(self, data) -> int:
+        size = len(data)
+        if size >= self.min_segment_size and type(data) is bytes:
+            if self._tail:
+                self._segments.append(self._tail)
+                self._tail = bytearray()
+            self._segments.append(data)
+        else:
+            self._tail += data
+        self._size += size
+        return size
+
+    def tell(self) -> int:
+        "the number of bytes written so far"
+        return self._size
+
+    def segments(self) -> List[Any]:
+        "return the list of segments written so far, in order"
+        if self._tail:
+            self._segments.append(self._tail)
+            self._tail = bytearray()
+        return self._segments
+
+    def getvalue(self) -> bytes:
+        "join the segments into one `bytes`"
+        return b"".join(self.segments())
+
+    def clear(self) -> None:
+        self._segments = []
+        self._tail = bytearray()
+        self._size = 0
+
+    def _send(self, send: Callable[[List[Any]], int]) -> int:
+        segments = [memoryview(_) for _ in self.segments() if len(_)]
+        total = self._size
+        index = 0
+        while index < len(segments):
+            sent = send(segments[index : index + IOV_MAX])
+            # drop the segments sent in full, and the sent part of the next one
+            while sent and sent >= len(segments[index]):
+                sent -= len(segments[index])
+                index += 1
+            if sent:
+                segments[index] = segments[index][sent:]
+        self.clear()
+        return total
+
+    def writev(self, fd: int) -> int:
+        """
+        write all the segments to the file descriptor `fd` with `os.writev`,
+        then `clear`. Return the number of bytes written
+        """
+        return self._send(lambda buffers: os.writev(fd, buffers))
+
+    def sendmsg(self, sock) -> int:
+        """
+        send all the segments on the blocking socket `sock` with `sendmsg`, then
+        `clear`. Return the number of bytes sent
+        """
+        return self._send(sock.sendmsg)
+
+
+class BufferSink:
+    """
+    A write-only stream that appends to a reusable `bytearray`.
+
+    `clear` forgets what was written but keeps the memory, so the next message is
+    written into the same buffer. Views from `getbuffer` must be released before
+    writing again.
+    """
+
+    def __init__(self, size_hint: int = 0):
+        self._buffer = bytearray(size_hint)
+        self._size = 0
+
+    def write(self, data) -> int:
+        size = len(data)
+        end = self._size + size
+        # overwrite in place within the memory we have, growing it only if needed
+        self._buffer[self._size : end] = data
+        self._size = end
+        return size
+
+    def tell(self) -> int:
+        "the number of bytes written since the last `clear`"
+        return self._size
+
+    def getbuffer(self) -> memoryview:
+        "return a view of what was written, without copying it"
+        return memoryview(self._buffer)[: self._size]
+
+    def getvalue(self) -> bytes:
+        "return a copy of what was written"
+        return bytes(self.getbuffer())
+
+    def clear(self) -> None:
+        self._size = 0
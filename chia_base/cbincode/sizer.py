@@ -0,0 +1,290 @@
+"""
+Create a size function at runtime based on the type passed in. A size function
+returns the number of bytes an object will serialize to, without serializing it.
+Supports the same types as `streamer`.
+
+Each type maps to a `Sizer`, which carries the size function along with the
+serialized size of the type if it's a constant. Constant sizes are detected when
+the sizer is built for the `(u)?int(8|16|32|64)` types, `SizedBytes` subclasses
+like `bytes32`, classes that declare `_size` (like the `bls12_381` types), and
+`tuple` and `dataclass` types made up only of these (like `Coin`).
+
+`min_serialized_size` returns the fewest bytes any value of a type can take, which
+lets parsers reject a list prefix claiming more items than the data could hold.
+"""
+
+from dataclasses import fields, is_dataclass
+
+import struct
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms.struct_stream import struct_stream
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import UnionType
+
+from .registry import CODEC_REGISTRY
+
+SizeFunction = Callable[[Any], int]
+
+
+class Sizer(NamedTuple):
+    size_f: SizeFunction
+    size: Optional[int]
+
+
+class SizeCounter:
+    "a `BinaryIO` stand-in that only counts the bytes written to it"
+
+    def __init__(self) -> None:
+        self.size = 0
+
+    def write(self, blob: bytes) -> int:
+        self.size += len(blob)
+        return len(blob)
+
+
+def sizer_for_size(size: int) -> Sizer:
+    "a `Sizer` for a type that always serializes to `size` bytes"
+
+    def size_f(obj: Any) -> int:
+        return size
+
+    return Sizer(size_f, size)
+
+
+def size_bytes(blob: bytes) -> int:
+    "a size function for `bytes`"
+    return 4 + len(blob)
+
+
+def size_str(s: str) -> int:
+    "a size function for `str`"
+    return 4 + (len(s) if s.isascii() else len(s.encode()))
+
+
+def size_program(p: Program) -> int:
+    "a size function for `Program`, using its cached serialization"
+    return len(bytes(p))
+
+
+def size_class_stream(stream_f: Callable[[Any, Any], None]) -> Sizer:
+    "the slow path for types of unknown size: stream into a counter"
+
+    def size_f(obj: Any) -> int:
+        f = SizeCounter()
+        stream_f(obj, f)
+        return f.size
+
+    return Sizer(size_f, None)
+
+
+def size_self_stream(obj: Any) -> int:
+    "the slow path for types with a `.stream` method: stream into a counter"
+    f = SizeCounter()
+    obj.stream(f)
+    return f.size
+
+
+def sizer_for_list(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Sizer],
+) -> Sizer:
+    "create a sizer for `List[X]` types"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+    item_size_f, item_size = type_tree(args_type[0])
+
+    if item_size is not None:
+        constant = item_size
+
+        def size_fixed(items: list) -> int:
+            return 4 + len(items) * constant
+
+        return Sizer(size_fixed, None)
+
+    def size_f(items: list) -> int:
+        return 4 + sum(item_size_f(item) for item in items)
+
+    return Sizer(size_f, None)
+
+
+def sizer_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Sizer],
+) -> Sizer:
+    "create a sizer for `Tuple[X, ...]` types"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    sizers: List[Sizer] = [type_tree(_) for _ in args_type]
+    sizes = [_.size for _ in sizers]
+    if all(size is not None for size in sizes):
+        return sizer_for_size(sum(sizes))  # type: ignore[arg-type]
+    size_fs = [_.size_f for _ in sizers]
+
+    def size_f(item: tuple) -> int:
+        if len(item) != len(size_fs):
+            raise ValueError("incorrect number of items in tuple")
+        return sum(f(v) for f, v in zip(size_fs, item))
+
+    return Sizer(size_f, None)
+
+
+def sizer_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Sizer],
+) -> Sizer:
+    "create a sizer for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    inner_size_f = type_tree(item_type).size_f
+
+    def size_f(item: Any) -> int:
+        if item is None:
+            return 1
+        return 1 + inner_size_f(item)
+
+    return Sizer(size_f, None)
+
+
+def sizer_for_dataclass(cls: type, type_tree: TypeTree[Sizer]) -> Sizer:
+    "create a sizer for the given `dataclass`"
+    field_sizers = [(f.name, type_tree(f.type)) for f in fields(cls)]
+    sizes = [sizer.size for _name, sizer in field_sizers]
+    if all(size is not None for size in sizes):
+        return sizer_for_size(sum(sizes))  # type: ignore[arg-type]
+    # fixed-size fields add a constant, so only call the others
+    constant = sum(size for size in sizes if size is not None)
+    variable = [(name, s.size_f) for name, s in field_sizers if s.size is None]
+
+    def size_f(v: Any) -> int:
+        return constant + sum(f(getattr(v, name)) for name, f in variable)
+
+    return Sizer(size_f, None)
+
+
+def extra_sizers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[Sizer]
+) -> Optional[Sizer]:
+    """
+    deal with `dataclass` objects and objects that have a `.stream` object method
+    or a `._class_stream` class method
+    """
+    if hasattr(origin, "_class_stream") or hasattr(origin, "stream"):
+        if isinstance(origin, type) and issubclass(origin, struct_stream):
+            return sizer_for_size(struct.calcsize(origin.PACK))
+        size = getattr(origin, "_size", None)
+        if isinstance(size, int):
+            return sizer_for_size(size)
+        if hasattr(origin, "_class_stream"):
+            return size_class_stream(origin._class_stream)
+        return Sizer(size_self_stream, None)
+    if is_dataclass(origin):
+        return sizer_for_dataclass(origin, type_tree)
+    return None
+
+
+def sizer_type_tree() -> TypeTree[Sizer]:
+    """
+    Return a `TypeTree[Sizer]` that's able to create `cbincode` sizers
+    for many different types.
+    """
+    simple_type_lookup: Dict[OriginArgsType, Sizer] = {
+        (Program, None): Sizer(size_program, None),
+        (bytes, None): Sizer(size_bytes, None),
+        (str, None): Sizer(size_str, None),
+    }
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[Sizer]], Sizer]
+    ] = {
+        list: sizer_for_list,
+        tuple: sizer_for_tuple,
+        Union: sizer_for_union,
+        UnionType: sizer_for_union,
+    }
+    type_tree: TypeTree[Sizer] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_sizers
+    )
+    return type_tree
+
+
+def sizer_for_type(cls: Gtype) -> Sizer:
+    "return the cached `Sizer` for `cls`"
+    return CODEC_REGISTRY.get("sizer", cls, lambda t: sizer_type_tree()(t))
+
+
+def make_sizer(cls: Gtype) -> SizeFunction:
+    "return a size function for `cls`"
+    return sizer_for_type(cls).size_f
+
+
+def serialized_size(obj: Any) -> int:
+    "return the number of bytes `obj` serializes to, without serializing it"
+    return make_sizer(type(obj))(obj)
+
+
+class MinSize(NamedTuple):
+    # wrapped, since `TypeTree` can't cache a zero
+    size: int
+
+
+def min_size_for_tuple(
+    origin_type: Type, args_type: ArgsType, type_tree: TypeTree[MinSize]
+) -> MinSize:
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    return MinSize(sum(type_tree(_).size for _ in args_type))
+
+
+def extra_min_sizes(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[MinSize]
+) -> Optional[MinSize]:
+    "deal with `dataclass` objects and objects that parse themselves"
+    if isinstance(origin, type) and issubclass(origin, struct_stream):
+        return MinSize(struct.calcsize(origin.PACK))
+    size = getattr(origin, "_size", None)
+    if isinstance(size, int):
+        return MinSize(size)
+    if hasattr(origin, "parse") or hasattr(origin, "parse_from_buffer"):
+        return MinSize(0)
+    if is_dataclass(origin):
+        return MinSize(sum(type_tree(f.type).size for f in fields(origin)))
+    return None
+
+
+def min_size_type_tree() -> TypeTree[MinSize]:
+    """
+    Return a `TypeTree[MinSize]` giving the fewest bytes a value of each type
+    can serialize to. Types that parse themselves count as zero unless they
+    declare their size.
+    """
+    simple_type_lookup: Dict[OriginArgsType, MinSize] = {
+        (Program, None): MinSize(1),
+        (bytes, None): MinSize(4),
+        (str, None): MinSize(4),
+    }
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[MinSize]], MinSize]
+    ] = {
+        list: lambda origin, args, type_tree: MinSize(4),
+        tuple: min_size_for_tuple,
+        Union: lambda origin, args, type_tree: MinSize(1),
+        UnionType: lambda origin, args, type_tree: MinSize(1),
+    }
+    return TypeTree(simple_type_lookup, compound_type_lookup, extra_min_sizes)
+
+
+def min_serialized_size(cls: Gtype) -> int:
+    "return the fewest bytes a serialized `cls` can take"
+    return CODEC_REGISTRY.get("min_size", cls, lambda t: min_size_type_tree()(t)).size
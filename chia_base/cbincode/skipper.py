@@ -0,0 +1,235 @@
+"""
+Create a skipper function at runtime based on the type passed in. A skipper finds
+where a serialized value ends in a buffer without building it, which is much
+cheaper than parsing. Supports the same types as `parser`.
+
+Each type maps to a `Skipper`, which carries the skip function along with the
+serialized size of the type if it's a constant. Constant sizes are known for the
+`(u)?int(8|16|32|64)` types, `SizedBytes` subclasses like `bytes32`, classes that
+declare `_size` (the number of bytes their `.parse` always reads), and `tuple`
+and `dataclass` types made up only of these.
+"""
+
+from dataclasses import fields, is_dataclass
+
+import struct
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type, Union
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import struct_stream
+from chia_base.meta.optional import optional_from_union
+from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
+from chia_base.meta.typing import GenericAlias, UnionType
+
+from .buffer_parser import (
+    BufferReader,
+    as_byte_view,
+    bytes_span,
+    program_size,
+    raise_too_long,
+)
+from .registry import CODEC_REGISTRY
+from .sizer import min_serialized_size
+
+SkipFunction = Callable[[Any, int], int]
+
+
+class Skipper(NamedTuple):
+    skip: SkipFunction
+    size: Optional[int]
+
+
+def check_end(buf, end: int) -> int:
+    if end > len(buf):
+        raise ValueError(f"unexpected EOS: need {end} bytes, have {len(buf)}")
+    return end
+
+
+def skipper_for_size(size: int) -> Skipper:
+    "a `Skipper` for a type that always serializes to `size` bytes"
+
+    def skip_f(buf, offset: int) -> int:
+        return check_end(buf, offset + size)
+
+    return Skipper(skip_f, size)
+
+
+def skip_bytes(buf, offset: int) -> int:
+    "a skip function for `bytes` and `str`"
+    return bytes_span(buf, offset)[1]
+
+
+def skip_program(buf, offset: int) -> int:
+    "a skip function for `Program`"
+    return offset + program_size(buf, offset)
+
+
+def skipper_for_stream_parser(parse: Callable[[Any], Any]) -> Skipper:
+    "the slow path for types of unknown size: parse the value and discard it"
+
+    def skip_f(buf, offset: int) -> int:
+        f = BufferReader(buf, offset)
+        parse(f)
+        return f.offset
+
+    return Skipper(skip_f, None)
+
+
+def skipper_for_list(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Skipper],
+) -> Skipper:
+    "create a skipper for a `List[X]`"
+    if args_type is None:
+        raise ValueError("list type not completely specified")
+    if len(args_type) != 1:
+        raise ValueError("list type has too many specifiers")
+    inner_skip, inner_size = type_tree(args_type[0])
+
+    if inner_size is not None:
+        item_size = inner_size
+
+        def skip_fixed(buf, offset: int) -> int:
+            (length,) = uint32._struct.unpack_from(buf, offset)
+            return check_end(buf, offset + 4 + length * item_size)
+
+        return Skipper(skip_fixed, None)
+
+    item_min_size = min_serialized_size(args_type[0])
+
+    def skip_f(buf, offset: int) -> int:
+        (length,) = uint32._struct.unpack_from(buf, offset)
+        offset += 4
+        if length * item_min_size > len(buf) - offset:
+            raise_too_long(length, item_min_size, len(buf) - offset)
+        for _ in range(length):
+            offset = inner_skip(buf, offset)
+        return offset
+
+    return Skipper(skip_f, None)
+
+
+def skipper_for_sequence(skippers: List[Skipper]) -> Skipper:
+    "create a skipper for values serialized one after another"
+    sizes = [_.size for _ in skippers]
+    if all(size is not None for size in sizes):
+        return skipper_for_size(sum(sizes))  # type: ignore[arg-type]
+    skip_fs = [_.skip for _ in skippers]
+
+    def skip_f(buf, offset: int) -> int:
+        for inner_skip in skip_fs:
+            offset = inner_skip(buf, offset)
+        return offset
+
+    return Skipper(skip_f, None)
+
+
+def skipper_for_tuple(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Skipper],
+) -> Skipper:
+    "create a skipper for a `Tuple[X, ...]`"
+    if args_type is None:
+        raise ValueError("tuple type not completely specified")
+    return skipper_for_sequence([type_tree(_) for _ in args_type])
+
+
+def skipper_for_union(
+    origin_type: Type,
+    args_type: ArgsType,
+    type_tree: TypeTree[Skipper],
+) -> Skipper:
+    "create a skipper for an `Optional[X]`"
+    item_type = optional_from_union(args_type)
+    if item_type is None:
+        raise ValueError(
+            f"only `Optional`-style `Union` types supported, not {args_type}"
+        )
+    inner_skip = type_tree(item_type).skip
+
+    def skip_f(buf, offset: int) -> int:
+        if buf[offset] == 0:
+            return offset + 1
+        return inner_skip(buf, offset + 1)
+
+    return Skipper(skip_f, None)
+
+
+def skipper_for_dataclass(cls: Type, type_tree: TypeTree[Skipper]) -> Skipper:
+    "create a skipper for the given `dataclass`"
+    new_types = tuple(f.type for f in fields(cls))
+    g: Any = GenericAlias(tuple, new_types)
+    return type_tree(g)
+
+
+def extra_skippers(
+    origin: Type, args_type: ArgsType, type_tree: TypeTree[Skipper]
+) -> Optional[Skipper]:
+    "deal with `dataclass` objects and objects that have a `.parse` class method"
+    if hasattr(origin, "parse"):
+        if isinstance(origin, type) and issubclass(origin, struct_stream):
+            return skipper_for_size(struct.calcsize(origin.PACK))
+        size = getattr(origin, "_size", None)
+        if isinstance(size, int):
+            return skipper_for_size(size)
+        return skipper_for_stream_parser(origin.parse)
+    if is_dataclass(origin):
+        return skipper_for_dataclass(origin, type_tree)
+    return None
+
+
+def skipper_type_tree() -> TypeTree[Skipper]:
+    """
+    Return a `TypeTree[Skipper]` that's able to create `cbincode` skippers
+    for many different types.
+    """
+    simple_type_lookup: Dict[OriginArgsType, Skipper] = {
+        (Program, None): Skipper(skip_program, None),
+        (bytes, None): Skipper(skip_bytes, None),
+        (str, None): Skipper(skip_bytes, None),
+    }
+    compound_type_lookup: Dict[
+        Any, Callable[[Type, ArgsType, TypeTree[Skipper]], Skipper]
+    ] = {
+        list: skipper_for_list,
+        tuple: skipper_for_tuple,
+        Union: skipper_for_union,
+        UnionType: skipper_for_union,
+    }
+    type_tree: TypeTree[Skipper] = TypeTree(
+        simple_type_lookup, compound_type_lookup, extra_skippers
+    )
+    return type_tree
+
+
+def skipper_for_type(cls: Gtype) -> Skipper:
+    "return the cached `Skipper` for `cls`"
+    return CODEC_REGISTRY.get("skipper", cls, lambda t: skipper_type_tree()(t))
+
+
+def fixed_size(cls: Gtype) -> Optional[int]:
+    "return the serialized size of `cls` if it's a constant, or `None`"
+    return skipper_for_type(cls).size
+
+
+def build_skip(cls: Gtype) -> SkipFunction:
+    "build a new skip function for `cls`"
+    skip_f = skipper_for_type(cls).skip
+
+    def skip(buf, offset: int = 0) -> int:
+        return skip_f(as_byte_view(buf), offset)
+
+    return skip
+
+
+def make_skipper(cls: Gtype) -> SkipFunction:
+    """
+    return a skip function for `cls`. It takes a `bytes`-like buffer and the offset
+    of a serialized value, and returns the offset just past it
+    """
+    return CODEC_REGISTRY.get("skip", cls, build_skip)
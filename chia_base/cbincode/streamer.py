@@ -25,10 +25,15 @@ from typing import (
 
 
 from chia_base.atoms import uint32
+from chia_base.atoms.struct_stream import bulk_atom
 
 from chia_base.meta.optional import optional_from_union
 from chia_base.meta.type_tree import TypeTree, OriginArgsType, ArgsType, Gtype
 from chia_base.meta.typing import UnionType
+from chia_base.util.instrumentation import codec_wrapper
+
+from .registry import CODEC_REGISTRY
+from .retain import retains_source, source_bytes
 
 
 _T = TypeVar("_T")
@@ -63,6 +68,15 @@ def streamer_for_list(
     if len(args_type) != 1:
         raise ValueError("list type has too many specifiers")
     item_type = args_type[0]
+    if bulk_atom(item_type):
+        stream_many = item_type.stream_many
+
+        def stream_many_f(items: list, f):
+            uint32._class_stream(uint32(len(items)), f)
+            stream_many(items, f)
+
+        return stream_many_f
+
     item_stream = type_tree(item_type)
 
     def func(items: list, f):
@@ -143,7 +157,17 @@ def streamer_for_dataclass(
         for stream_f in streamers:
             stream_f(v, f)
 
-    return streamer
+    if not retains_source(cls):
+        return streamer
+
+    def retained_streamer(v: Any, f: BinaryIO, *args) -> None:
+        source = source_bytes(v)
+        if source is None:
+            streamer(v, f)
+        else:
+            f.write(source)
+
+    return retained_streamer
 
 
 def extra_streamers(
@@ -180,11 +204,14 @@ def streamer_type_tree() -> TypeTree[StreamFunction]:
         UnionType: streamer_for_union,
     }
     type_tree: TypeTree[StreamFunction] = TypeTree(
-        simple_type_lookup, compound_type_lookup, extra_streamers
+        simple_type_lookup,
+        compound_type_lookup,
+        extra_streamers,
+        codec_wrapper("stream"),
     )
     return type_tree
 
 
 def make_streamer(cls: Gtype) -> StreamFunction:
     "return a parser for `cls`"
-    return streamer_type_tree()(cls)
+    return CODEC_REGISTRY.get("stream", cls, lambda t: streamer_type_tree()(t))
@@ -1,27 +1,72 @@
-from typing import Any
+from typing import Any, Optional
 
 import io
 
-from .parser import make_parser
+from chia_base.atoms import bytes32
+from chia_base.meta.type_tree import Gtype
+from chia_base.util.std_hash import std_hash
+
+from .buffer_parser import make_buffer_parser
+from .compiled_streamer import make_compiled_streamer
+from .intern import InternTable, make_interning_parser
+from .retain import source_bytes
+from .sinks import HashSink
 from .streamer import make_streamer
 
 
 def to_bytes(obj: Any):
-    "create a streamer for the object and invoke it to produce `bytes`"
+    """
+    create a streamer for the object and invoke it to produce `bytes`. The
+    compiled streamer collects the pieces and writes them to a `BytesIO` together,
+    with an extra write for each value that streams itself with a `.stream` method,
+    like the BLS types. Objects parsed with `retain=True` return their source bytes
+    """
+    source = source_bytes(obj)
+    if source is not None:
+        return source
     f = io.BytesIO()
-    make_streamer(type(obj))(obj, f)
+    make_compiled_streamer(type(obj))(obj, f)
     return f.getvalue()
 
 
+def cbincode_hash(obj: Any, cls: Optional[Gtype] = None) -> bytes32:
+    """
+    return `std_hash(to_bytes(obj))`, streaming `obj` (as a `cls`, which defaults to
+    its type) into a `HashSink` rather than collecting its serialization first.
+    It uses `make_streamer`, which writes each field as it goes, so the largest
+    write is the largest single value, like a `Program`, not the whole object
+    """
+    source = source_bytes(obj)
+    if source is not None:
+        return std_hash(source)
+    sink = HashSink()
+    make_streamer(type(obj) if cls is None else cls)(obj, sink)
+    return bytes32(sink.digest())
+
+
 def to_hex(obj: Any):
     "create a streamer for the object and invoke it to produce hex"
     return to_bytes(obj).hex()
 
 
-def from_bytes(cls: type, blob: bytes) -> Any:
-    "create and use a parser for the class to produce an instance from `bytes`"
-    f = io.BytesIO(blob)
-    return make_parser(cls)(f)
+def from_bytes(
+    cls: type,
+    blob: bytes,
+    trusted: bool = False,
+    retain: bool = False,
+    intern: Optional[InternTable] = None,
+) -> Any:
+    """
+    create and use a parser for the class to produce an instance from `bytes`.
+    Pass `trusted=True` to skip validation of data known to be good,
+    `retain=True` to keep the source bytes for re-streaming, and an `InternTable`
+    as `intern` to share repeated `bytes32` and `Program` values
+    """
+    if intern is not None:
+        if trusted or retain:
+            raise ValueError("`intern` can't be combined with `trusted` or `retain`")
+        return make_interning_parser(cls, intern)(blob)[0]
+    return make_buffer_parser(cls, trusted=trusted, retain=retain)(blob)[0]
 
 
 def from_hex(cls: type, s: str) -> Any:
@@ -1,6 +1,24 @@
-from .coin import Coin
-from .coin_spend import CoinSpend
-from .spend_bundle import SpendBundle
+from typing import TYPE_CHECKING
 
+from chia_base.util.lazy import lazy_exports
 
-__all__ = ["Coin", "CoinSpend", "SpendBundle"]
+if TYPE_CHECKING:
+    from .coin import Coin
+    from .coin_set import CoinSet
+    from .coin_spend import CoinSpend
+    from .spend_bundle import SpendBundle
+
+
+__all__ = ["Coin", "CoinSet", "CoinSpend", "SpendBundle"]
+
+# `CoinSpend` needs `clvm_rs` and `SpendBundle` needs `chia_rs`, so import them
+# only when used
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "Coin": ".coin",
+        "CoinSet": ".coin_set",
+        "CoinSpend": ".coin_spend",
+        "SpendBundle": ".spend_bundle",
+    },
+)
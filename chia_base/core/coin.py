@@ -1,24 +1,32 @@
 from dataclasses import dataclass
 
-from clvm_rs import Program  # type: ignore
-
 from chia_base.atoms.ints import uint64
 from chia_base.atoms.sized_bytes import bytes32
+from chia_base.meta.slots import FrozenSlots
 
 from chia_base.util.std_hash import std_hash
 
 
+def int_to_bytes(v: int) -> bytes:
+    "the shortest signed big-endian encoding of `v`, like `Program.int_to_bytes`"
+    if v == 0:
+        return b""
+    return v.to_bytes(((v if v >= 0 else ~v).bit_length() + 8) >> 3, "big", signed=True)
+
+
 @dataclass(frozen=True)
-class Coin:
+class Coin(FrozenSlots):
     """
     This structure is used in the body for the reward and fees genesis coins.
     """
 
+    __slots__ = ("parent_coin_info", "puzzle_hash", "amount")
+
     parent_coin_info: bytes32
     puzzle_hash: bytes32
     amount: uint64
 
     def name(self) -> bytes32:
         return std_hash(
-            self.parent_coin_info, self.puzzle_hash, Program.int_to_bytes(self.amount)
+            self.parent_coin_info, self.puzzle_hash, int_to_bytes(self.amount)
         )
@@ -0,0 +1,353 @@
+"""
+A set of coins kept in a few flat arrays rather than as `Coin` objects.
+
+`CoinSet` stores the coin id, parent coin id and puzzle hash of each coin in
+`bytearray` columns of 32 bytes per coin, and the amounts in an `array`, so a coin
+costs about 165 bytes instead of a `Coin`, its three field objects and a `dict`
+entry. Coins are looked up by id through an open-addressing hash table of row
+numbers, and by puzzle hash through a second table pointing at a linked list of
+the rows with that puzzle hash, threaded through two more arrays.
+
+Removing a coin moves the last row into its place, so the columns stay dense and
+`total_amount` is a single `sum` over the amounts.
+
+`to_bytes` and `from_bytes` convert to and from the `cbincode` serialization of a
+`List[Coin]`, copying whole columns with strided slices instead of building a
+`Coin` per record.
+
+Each lookup runs a few lines of Python, so it's slower than a `dict` lookup: this
+trades speed for memory.
+"""
+
+import array
+import hashlib
+import sys
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from chia_base.atoms.ints import uint32, uint64
+from chia_base.atoms.sized_bytes import bytes32
+
+from .coin import Coin, int_to_bytes
+
+_EMPTY = -1
+_DELETED = -2
+
+# the bytes in a serialized `Coin`: parent coin id, puzzle hash, amount
+_RECORD_SIZE = 72
+
+
+class _Index:
+    """
+    An open-addressing hash table with linear probing, mapping each 32-byte key to
+    a row number. Keys aren't stored in the table: the key for row `r` is
+    `keys[32 * r : 32 * r + 32]`.
+    """
+
+    def __init__(self, keys: bytearray):
+        self.keys = keys
+        self.slots = array.array("q", [_EMPTY]) * 8
+        self.used = 0
+        self.live = 0
+
+    def _slot(self, key: bytes) -> Tuple[bool, int]:
+        "return `(True, slot)` for the slot holding `key`, or `(False, free slot)`"
+        slots = self.slots
+        keys = self.keys
+        mask = len(slots) - 1
+        index = int.from_bytes(key[:8], "little") & mask
+        free = -1
+        while True:
+            row = slots[index]
+            if row == _EMPTY:
+                return False, index if free < 0 else free
+            if row == _DELETED:
+                if free < 0:
+                    free = index
+            elif keys[row * 32 : row * 32 + 32] == key:
+                return True, index
+            index = (index + 1) & mask
+
+    def find(self, key: bytes) -> int:
+        "return the row for `key`, or -1"
+        found, slot = self._slot(key)
+        return self.slots[slot] if found else -1
+
+    def add(self, key: bytes, row: int) -> None:
+        "add `key`, which must not be in the table yet"
+        if (self.used + 1) * 3 > len(self.slots) * 2:
+            self._resize()
+        _found, slot = self._slot(key)
+        if self.slots[slot] == _EMPTY:
+            self.used += 1
+        self.slots[slot] = row
+        self.live += 1
+
+    def move(self, key: bytes, row: int) -> None:
+        "point `key`, which must be in the table, at `row`"
+        _found, slot = self._slot(key)
+        self.slots[slot] = row
+
+    def discard(self, key: bytes) -> None:
+        "remove `key`, which must be in the table"
+        _found, slot = self._slot(key)
+        self.slots[slot] = _DELETED
+        self.live -= 1
+
+    def reserve(self, count: int) -> None:
+        "make room for `count` more keys, so adding them doesn't rebuild the table"
+        if (self.used + count) * 3 > len(self.slots) * 2:
+            self._resize(count)
+
+    def _resize(self, extra: int = 0) -> None:
+        """
+        rebuild, dropping deleted slots, at a size where it's at most a third full,
+        or at most two thirds full after adding `extra` more keys
+        """
+        size = 8
+        while size < self.live * 3 or size * 2 < (self.live + extra) * 3:
+            size *= 2
+        rows = [_ for _ in self.slots if _ >= 0]
+        self.slots = array.array("q", [_EMPTY]) * size
+        self.used = 0
+        self.live = 0
+        keys = self.keys
+        for row in rows:
+            self.add(bytes(keys[row * 32 : row * 32 + 32]), row)
+
+
+class CoinSet:
+    """
+    A set of `Coin` values, indexed by coin id and by puzzle hash, stored in
+    arrays. `Coin` objects are only built when asked for.
+    """
+
+    def __init__(self, coins: Iterable[Coin] = ()):
+        self._coin_ids = bytearray()
+        self._parent_ids = bytearray()
+        self._puzzle_hashes = bytearray()
+        self._amounts = array.array(uint64._typecode)  # type: ignore[arg-type]
+        # the rows with the same puzzle hash form a doubly linked list
+        self._next_same_puzzle_hash = array.array("q")
+        self._previous_same_puzzle_hash = array.array("q")
+        self._id_index = _Index(self._coin_ids)
+        # maps each puzzle hash to the first row in its list
+        self._puzzle_hash_index = _Index(self._puzzle_hashes)
+        self.add(coins)
+
+    def __len__(self) -> int:
+        return len(self._amounts)
+
+    def __contains__(self, coin_id: bytes) -> bool:
+        return self._id_index.find(coin_id) >= 0
+
+    def __iter__(self) -> Iterator[Coin]:
+        for row in range(len(self)):
+            yield self._coin(row)
+
+    def _coin(self, row: int) -> Coin:
+        start, end = row * 32, row * 32 + 32
+        return Coin(
+            bytes32(self._parent_ids[start:end]),
+            bytes32(self._puzzle_hashes[start:end]),
+            uint64(self._amounts[row]),
+        )
+
+    def get(self, coin_id: bytes) -> Optional[Coin]:
+        "return the coin with id `coin_id`, or `None`"
+        row = self._id_index.find(coin_id)
+        return None if row < 0 else self._coin(row)
+
+    def _rows_for_puzzle_hash(self, puzzle_hash: bytes) -> Iterator[int]:
+        row = self._puzzle_hash_index.find(puzzle_hash)
+        next_row = self._next_same_puzzle_hash
+        while row >= 0:
+            yield row
+            row = next_row[row]
+
+    def coins_for_puzzle_hash(self, puzzle_hash: bytes) -> List[Coin]:
+        "return the coins with puzzle hash `puzzle_hash`"
+        return [self._coin(_) for _ in self._rows_for_puzzle_hash(puzzle_hash)]
+
+    def total_amount(self) -> int:
+        "return the sum of the amounts of all the coins"
+        return sum(self._amounts)
+
+    def amount_for_puzzle_hash(self, puzzle_hash: bytes) -> int:
+        "return the sum of the amounts of the coins with puzzle hash `puzzle_hash`"
+        amounts = self._amounts
+        return sum(amounts[_] for _ in self._rows_for_puzzle_hash(puzzle_hash))
+
+    def _index_row(self, row: int, coin_id: bytes) -> None:
+        "index `row`, the last row in the columns with links, with id `coin_id`"
+        puzzle_hash = self._puzzle_hashes[row * 32 : row * 32 + 32]
+        head = self._puzzle_hash_index.find(puzzle_hash)
+        if head < 0:
+            self._puzzle_hash_index.add(puzzle_hash, row)
+            self._next_same_puzzle_hash.append(-1)
+        else:
+            # insert after the head, so the head doesn't change
+            after = self._next_same_puzzle_hash[head]
+            self._next_same_puzzle_hash.append(after)
+            self._next_same_puzzle_hash[head] = row
+            if after >= 0:
+                self._previous_same_puzzle_hash[after] = row
+        self._previous_same_puzzle_hash.append(head)
+        self._id_index.add(coin_id, row)
+
+    def add(self, coins: Iterable[Coin]) -> None:
+        """
+        add each of `coins`. If any is already in the set, or repeated, raise
+        `ValueError` without adding anything
+        """
+        coins = list(coins)
+        coin_ids = [_.name() for _ in coins]
+        self._check_new(coin_ids)
+        self._id_index.reserve(len(coin_ids))
+        for coin, coin_id in zip(coins, coin_ids):
+            self._coin_ids += coin_id
+            self._parent_ids += coin.parent_coin_info
+            self._puzzle_hashes += coin.puzzle_hash
+            self._amounts.append(coin.amount)
+            self._index_row(len(self._amounts) - 1, coin_id)
+
+    def _check_new(self, coin_ids: List[bytes]) -> None:
+        if len(set(coin_ids)) != len(coin_ids):
+            raise ValueError("repeated coin")
+        for coin_id in coin_ids:
+            if coin_id in self:
+                raise ValueError(f"coin {coin_id.hex()} already in set")
+
+    def remove(self, coin_ids: Iterable[bytes]) -> None:
+        """
+        remove the coins with each of `coin_ids`. If any isn't in the set, raise
+        `KeyError` without removing anything
+        """
+        coin_ids = list(coin_ids)
+        if len(set(coin_ids)) != len(coin_ids):
+            raise KeyError("repeated coin id")
+        for coin_id in coin_ids:
+            if coin_id not in self:
+                raise KeyError(bytes(coin_id).hex())
+        for coin_id in coin_ids:
+            self._remove_row(self._id_index.find(coin_id))
+
+    def _unlink(self, row: int) -> None:
+        "take `row` out of its puzzle hash list"
+        next_row = self._next_same_puzzle_hash
+        previous_row = self._previous_same_puzzle_hash
+        after, before = next_row[row], previous_row[row]
+        if after >= 0:
+            previous_row[after] = before
+        if before >= 0:
+            next_row[before] = after
+            return
+        puzzle_hash = self._puzzle_hashes[row * 32 : row * 32 + 32]
+        if after >= 0:
+            self._puzzle_hash_index.move(puzzle_hash, after)
+        else:
+            self._puzzle_hash_index.discard(puzzle_hash)
+
+    def _remove_row(self, row: int) -> None:
+        "remove `row`, moving the last row into its place"
+        start = row * 32
+        self._id_index.discard(self._coin_ids[start : start + 32])
+        self._unlink(row)
+        last = len(self._amounts) - 1
+        if row != last:
+            self._move_row(last, row)
+        for column in (self._coin_ids, self._parent_ids, self._puzzle_hashes):
+            del column[last * 32 :]
+        for ints in (
+            self._amounts,
+            self._next_same_puzzle_hash,
+            self._previous_same_puzzle_hash,
+        ):
+            ints.pop()
+
+    def _move_row(self, source: int, target: int) -> None:
+        "copy row `source` over row `target`, and point everything at the new place"
+        s, t = source * 32, target * 32
+        for column in (self._coin_ids, self._parent_ids, self._puzzle_hashes):
+            column[t : t + 32] = column[s : s + 32]
+        self._amounts[target] = self._amounts[source]
+        next_row = self._next_same_puzzle_hash
+        previous_row = self._previous_same_puzzle_hash
+        after, before = next_row[source], previous_row[source]
+        next_row[target], previous_row[target] = after, before
+        if after >= 0:
+            previous_row[after] = target
+        if before >= 0:
+            next_row[before] = target
+        else:
+            self._puzzle_hash_index.move(self._puzzle_hashes[t : t + 32], target)
+        self._id_index.move(self._coin_ids[t : t + 32], target)
+
+    def to_bytes(self) -> bytes:
+        "serialize as a `List[Coin]`, without building `Coin` objects"
+        count = len(self)
+        out = bytearray(4 + _RECORD_SIZE * count)
+        uint32._struct.pack_into(out, 0, count)
+        amounts = array.array(self._amounts.typecode, self._amounts)
+        if sys.byteorder == "little":
+            amounts.byteswap()
+        columns = [
+            (0, 32, self._parent_ids),
+            (32, 32, self._puzzle_hashes),
+            (64, 8, amounts.tobytes()),
+        ]
+        # fill in byte `k` of a field in every record at once, with a strided slice
+        for field_offset, size, column in columns:
+            for k in range(size):
+                out[4 + field_offset + k :: _RECORD_SIZE] = column[k::size]
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "CoinSet":
+        "parse a serialized `List[Coin]`, without building `Coin` objects"
+        coin_set = cls()
+        coin_set.add_serialized(blob)
+        return coin_set
+
+    def add_serialized(self, blob: bytes) -> None:
+        """
+        add each coin in a serialized `List[Coin]`, as `add` does, without building
+        `Coin` objects
+        """
+        if len(blob) < 4:
+            raise ValueError("unexpected EOS")
+        (count,) = uint32._struct.unpack_from(blob, 0)
+        if len(blob) != 4 + _RECORD_SIZE * count:
+            raise ValueError(
+                f"{len(blob)} bytes can't hold exactly {count} serialized coins"
+            )
+        columns = []
+        for field_offset, size in ((0, 32), (32, 32), (64, 8)):
+            column = bytearray(size * count)
+            for k in range(size):
+                column[k::size] = blob[4 + field_offset + k :: _RECORD_SIZE]
+            columns.append(column)
+        parent_ids, puzzle_hashes, amount_bytes = columns
+        amounts = array.array(self._amounts.typecode)
+        amounts.frombytes(amount_bytes)
+        if sys.byteorder == "little":
+            amounts.byteswap()
+
+        sha256 = hashlib.sha256
+        coin_ids = []
+        for row, amount in enumerate(amounts):
+            start = row * 32
+            h = sha256(parent_ids[start : start + 32])
+            h.update(puzzle_hashes[start : start + 32])
+            h.update(int_to_bytes(amount))
+            coin_ids.append(h.digest())
+        self._check_new(coin_ids)
+
+        self._id_index.reserve(count)
+        first = len(self)
+        self._coin_ids += b"".join(coin_ids)
+        self._parent_ids += parent_ids
+        self._puzzle_hashes += puzzle_hashes
+        self._amounts += amounts
+        for row, coin_id in enumerate(coin_ids, first):
+            self._index_row(row, coin_id)
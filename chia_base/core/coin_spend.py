@@ -2,16 +2,19 @@ from dataclasses import dataclass
 
 from clvm_rs import Program  # type: ignore
 
+from chia_base.meta.slots import FrozenSlots
 
 from .coin import Coin
 
 
 @dataclass(frozen=True)
-class CoinSpend:
+class CoinSpend(FrozenSlots):
     """
     This represents a coin spend on the chia blockchain.
     """
 
+    __slots__ = ("coin", "puzzle_reveal", "solution", "__weakref__")
+
     coin: Coin
     puzzle_reveal: Program
     solution: Program
@@ -2,12 +2,13 @@ from dataclasses import dataclass
 from typing import List
 
 from chia_base.bls12_381.bls_signature import BLSSignature
+from chia_base.meta.slots import FrozenSlots
 
 from .coin_spend import CoinSpend
 
 
 @dataclass(frozen=True)
-class SpendBundle:
+class SpendBundle(FrozenSlots):
     """
     This is a list of coins being spent along with their solution programs, and a single
     aggregated signature. This is the object that most closely corresponds to a bitcoin
@@ -15,6 +16,8 @@ class SpendBundle:
     boundaries between transactions are more flexible than in bitcoin).
     """
 
+    __slots__ = ("coin_spends", "aggregated_signature", "__weakref__")
+
     coin_spends: List[CoinSpend]
     aggregated_signature: BLSSignature
 
@@ -0,0 +1,40 @@
+"""
+`FrozenSlots` is a base class for frozen `dataclass` types that list their fields
+in `__slots__`, so instances have no `__dict__`.
+
+`dataclass(slots=True)` does this from python 3.10, but older versions need
+`__slots__` written out. Pickling (and `copy`) restores the slots of an object
+with `setattr`, which a frozen `dataclass` refuses, so `FrozenSlots` adds
+`__getstate__` and `__setstate__` that go around it. `__setstate__` also accepts
+the `__dict__` of an object pickled before its class had `__slots__`.
+
+    @dataclass(frozen=True)
+    class Point(FrozenSlots):
+        __slots__ = ("x", "y")
+
+        x: int
+        y: int
+"""
+
+from dataclasses import fields
+from typing import Any, Dict, Tuple, Union
+
+
+class FrozenSlots:
+    __slots__ = ()
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, f.name) for f in fields(self))  # type: ignore
+
+    def __setstate__(self, state: Union[Tuple[Any, ...], Dict[str, Any]]) -> None:
+        names = [f.name for f in fields(self)]  # type: ignore
+        if isinstance(state, dict):
+            if sorted(state) != sorted(names):
+                raise ValueError(f"can't restore {type(self).__name__} from {state!r}")
+            items = state.items()
+        else:
+            if len(state) != len(names):
+                raise ValueError(f"can't restore {type(self).__name__} from {state!r}")
+            items = zip(names, state)  # type: ignore
+        for name, value in items:
+            object.__setattr__(self, name, value)
@@ -31,11 +31,22 @@ class TypeTree(Generic[T]):
     `simple_type_lookup`: a type to callable look-up. Must return a `T` value.
     `compound_type_lookup`: recursively handle compound types like `list` and `tuple`.
     `other_f`: a function to take a type and return a `T` value
+    `wrap`: an optional function applied to each `T` value before it's used, for
+    example to instrument it
     """
 
     simple_type_lookup: SimpleTypeLookup[T]
     compound_lookup: CompoundLookup[T]
     other_handler: OtherHandler[T]
+    wrap: Optional[Callable[[Gtype, T], T]] = None
+
+    def __post_init__(self) -> None:
+        if self.wrap is not None:
+            wrap = self.wrap
+            self.simple_type_lookup = {
+                type_pair: wrap(type_pair[0], f)
+                for type_pair, f in self.simple_type_lookup.items()
+            }
 
     def __call__(self, t: Gtype) -> T:
         """
@@ -61,10 +72,14 @@ class TypeTree(Generic[T]):
         g = self.compound_lookup.get(origin)
         if g:
             new_f = g(origin, args, self)
+            if self.wrap is not None:
+                new_f = self.wrap(t, new_f)
             self.simple_type_lookup[type_pair] = new_f
             return new_f
         r = self.other_handler(origin, args, self)
         if r:
+            if self.wrap is not None:
+                r = self.wrap(t, r)
             self.simple_type_lookup[type_pair] = r
             return r
         raise ValueError(f"unable to handle type {t}")
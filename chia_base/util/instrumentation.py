@@ -0,0 +1,256 @@
+"""
+Opt-in counters of calls, bytes and time spent per type and operation, for
+finding out where codec and crypto time goes in production.
+
+    from chia_base.util import instrumentation
+
+    instrumentation.enable()
+    ...
+    print(instrumentation.prometheus_text())
+
+While disabled (the default), nothing is wrapped, so there's no overhead at all.
+`enable` wraps:
+
+- the `cbincode` parser, streamer and buffer parser functions built by `TypeTree`
+  for each type, including nested ones like `Program` inside `CoinSpend`
+- the functions from `make_compiled_parser` and `make_compiled_streamer`
+- the `bls12_381` methods listed in `BLS_METHODS`
+
+It clears `CODEC_REGISTRY` so codecs are rebuilt with wrappers, but codec functions
+already held elsewhere aren't affected. Times are cumulative: the time for a
+`CoinSpend` includes the time for its `Program` fields. The counters aren't
+synchronized, so are approximate when several threads update them at once.
+"""
+
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args, get_origin
+
+# class name, method name, and whether the first argument is the serialized blob
+BLS_METHODS: List[Tuple[str, str, bool]] = [
+    ("BLSPublicKey", "from_bytes", True),
+    ("BLSPublicKey", "from_bytes_unchecked", True),
+    ("BLSPublicKey", "child", False),
+    ("BLSSignature", "from_bytes", True),
+    ("BLSSignature", "from_bytes_unchecked", True),
+    ("BLSSignature", "verify", False),
+    ("BLSSecretExponent", "from_bytes", True),
+    ("BLSSecretExponent", "from_bytes_unchecked", True),
+    ("BLSSecretExponent", "sign", False),
+    ("BLSSecretExponent", "child", False),
+]
+
+# (op, type label) => [calls, bytes, seconds]
+_counters: Dict[Tuple[str, str], List[Any]] = {}
+_enabled = False
+_originals: List[Tuple[type, str, Any]] = []
+
+
+def type_label(t: Any) -> str:
+    "a short readable name for a type, like `List[Coin]`"
+    origin = get_origin(t)
+    if origin is None:
+        return getattr(t, "__name__", None) or str(t)
+    args = ", ".join(type_label(_) for _ in get_args(t))
+    name = getattr(origin, "__name__", None) or str(origin)
+    return f"{name}[{args}]" if args else name
+
+
+def _counter(op: str, label: str) -> List[Any]:
+    counter = _counters.get((op, label))
+    if counter is None:
+        counter = _counters.setdefault((op, label), [0, 0, 0.0])
+    return counter
+
+
+def _tell(f: Any) -> Optional[int]:
+    try:
+        return f.tell()
+    except Exception:
+        return None
+
+
+def _timed_stream_parse(counter: List[Any], parse: Callable) -> Callable:
+    def parse_f(f, *args):
+        start_offset = _tell(f)
+        start = time.perf_counter()
+        try:
+            return parse(f, *args)
+        finally:
+            counter[2] += time.perf_counter() - start
+            counter[0] += 1
+            end_offset = _tell(f)
+            if start_offset is not None and end_offset is not None:
+                counter[1] += end_offset - start_offset
+
+    return parse_f
+
+
+def _timed_stream(counter: List[Any], stream: Callable) -> Callable:
+    def stream_f(obj, f, *args):
+        start_offset = _tell(f)
+        start = time.perf_counter()
+        try:
+            return stream(obj, f, *args)
+        finally:
+            counter[2] += time.perf_counter() - start
+            counter[0] += 1
+            end_offset = _tell(f)
+            if start_offset is not None and end_offset is not None:
+                counter[1] += end_offset - start_offset
+
+    return stream_f
+
+
+def _timed_buffer_parse(counter: List[Any], parse: Callable) -> Callable:
+    def parse_f(buf, offset: int = 0):
+        start = time.perf_counter()
+        try:
+            r = parse(buf, offset)
+        finally:
+            counter[2] += time.perf_counter() - start
+            counter[0] += 1
+        counter[1] += r[1] - offset
+        return r
+
+    return parse_f
+
+
+_WRAPPERS: Dict[str, Callable[[List[Any], Callable], Callable]] = {
+    "parse": _timed_stream_parse,
+    "stream": _timed_stream,
+    "buffer_parse": _timed_buffer_parse,
+    "compiled_parse": _timed_stream_parse,
+    "compiled_stream": _timed_stream,
+}
+
+
+def codec_wrapper(op: str) -> Optional[Callable[[Any, Callable], Callable]]:
+    """
+    return a function to pass as `TypeTree(..., wrap=)` that instruments the `op`
+    codec built for each type, or `None` when instrumentation is off
+    """
+    if not _enabled:
+        return None
+    timed = _WRAPPERS[op]
+
+    def wrap(t: Any, f: Callable) -> Callable:
+        return timed(_counter(op, type_label(t)), f)
+
+    return wrap
+
+
+def _timed_method(op: str, label: str, f: Callable, blob_arg: bool) -> Callable:
+    counter = _counter(op, label)
+
+    def method(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            counter[2] += time.perf_counter() - start
+            counter[0] += 1
+            if blob_arg:
+                counter[1] += len(args[1])
+
+    method.__name__ = f.__name__
+    method.__doc__ = f.__doc__
+    return method
+
+
+def _patch_bls() -> None:
+    from chia_base import bls12_381
+
+    for class_name, method_name, blob_arg in BLS_METHODS:
+        cls = getattr(bls12_381, class_name)
+        original = cls.__dict__[method_name]
+        _originals.append((cls, method_name, original))
+        if isinstance(original, classmethod):
+            timed = _timed_method(method_name, class_name, original.__func__, blob_arg)
+            setattr(cls, method_name, classmethod(timed))
+        else:
+            setattr(
+                cls,
+                method_name,
+                _timed_method(method_name, class_name, original, False),
+            )
+
+
+def _unpatch_bls() -> None:
+    while _originals:
+        cls, method_name, original = _originals.pop()
+        setattr(cls, method_name, original)
+
+
+def _clear_codecs() -> None:
+    from chia_base.cbincode import CODEC_REGISTRY
+
+    CODEC_REGISTRY.clear()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    "start counting. Codecs in `CODEC_REGISTRY` are rebuilt with wrappers"
+    global _enabled
+    if _enabled:
+        return
+    _enabled = True
+    _patch_bls()
+    _clear_codecs()
+
+
+def disable() -> None:
+    "stop counting and remove all wrappers. The counts so far are kept"
+    global _enabled
+    if not _enabled:
+        return
+    _enabled = False
+    _unpatch_bls()
+    _clear_codecs()
+
+
+def reset() -> None:
+    "zero all the counts"
+    for counter in _counters.values():
+        counter[:] = [0, 0, 0.0]
+
+
+def snapshot() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    return the counts as `{op: {type: {"calls": ..., "bytes": ..., "seconds": ...}}}`,
+    leaving out the ones never called
+    """
+    r: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for (op, label), (calls, byte_count, seconds) in sorted(_counters.items()):
+        if calls:
+            r.setdefault(op, {})[label] = dict(
+                calls=calls, bytes=byte_count, seconds=seconds
+            )
+    return r
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(prefix: str = "chia_base") -> str:
+    "return the counts in the Prometheus text exposition format"
+    metrics = [
+        ("calls_total", "calls", "number of calls"),
+        ("bytes_total", "bytes", "number of bytes parsed or streamed"),
+        ("seconds_total", "seconds", "cumulative seconds spent"),
+    ]
+    data = snapshot()
+    lines = []
+    for suffix, key, help_text in metrics:
+        name = f"{prefix}_{suffix}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for op, by_type in data.items():
+            for label, counts in by_type.items():
+                labels = f'op="{_escape_label(op)}",type="{_escape_label(label)}"'
+                lines.append(f"{name}{{{labels}}} {counts[key]}")
+    return "\n".join(lines) + "\n"
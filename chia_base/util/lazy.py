@@ -0,0 +1,38 @@
+"""
+Defer importing the modules a package re-exports until one of their names is used,
+with a module `__getattr__` (PEP 562).
+
+In a package `__init__.py`:
+
+    __getattr__, __dir__ = lazy_exports(__name__, {"Coin": ".coin"})
+
+Each name is imported from its module on first access, then stored in the package
+so later lookups don't go through `__getattr__` again.
+"""
+
+import importlib
+import sys
+
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str, names: Dict[str, str]
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    return `__getattr__` and `__dir__` functions for `package` that import each key
+    of `names` from the (relative) module it maps to
+    """
+
+    def __getattr__(name: str) -> object:
+        module_name = names.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(names))
+
+    return __getattr__, __dir__
@@ -0,0 +1,32 @@
+from typing import Optional, Sequence
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint64
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+def sample_bundle(
+    count: int = 3,
+    seed: int = 0,
+    puzzles: Sequence[Program] = (),
+    solution: Optional[Program] = None,
+) -> SpendBundle:
+    """
+    return a `SpendBundle` of `count` spends of different coins, named after `seed`.
+    The puzzles cycle through `puzzles`, and by default differ for each spend, as
+    does the solution unless it's given
+    """
+    coin_spends = []
+    for i in range(count):
+        if puzzles:
+            puzzle = puzzles[i % len(puzzles)]
+        else:
+            puzzle = Program.to([1, i, (2, 3)])
+        coin = Coin(std_hash(b"%d %d" % (seed, i)), puzzle.tree_hash(), uint64(i))
+        coin_solution = Program.to([seed, i]) if solution is None else solution
+        coin_spends.append(CoinSpend(coin, puzzle, coin_solution))
+    sig = BLSSecretExponent.from_int(1).sign(b"foo")
+    return SpendBundle(coin_spends, sig)
@@ -0,0 +1,90 @@
+from typing import BinaryIO
+
+import asyncio
+import socket
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.cbincode import to_bytes
+from chia_base.cbincode.aio import FrameCodec, aparse, astream
+from chia_base.core import SpendBundle
+
+from samples import sample_bundle
+
+LARGE_PUZZLE = Program.to([1, b"x" * 1000])
+
+
+class Varint(int):
+    @classmethod
+    def parse(cls, f: BinaryIO) -> "Varint":
+        v = 0
+        while True:
+            b = f.read(1)[0]
+            v = (v << 7) | (b & 0x7F)
+            if b < 0x80:
+                return cls(v)
+
+
+def reader_for(blob):
+    reader = asyncio.StreamReader()
+    reader.feed_data(blob)
+    reader.feed_eof()
+    return reader
+
+
+def test_aparse():
+    async def run():
+        bundle = sample_bundle(20, puzzles=[LARGE_PUZZLE])
+        reader = reader_for(to_bytes(bundle) * 2 + bytes([0x81, 0x01]) + b"z")
+        assert await aparse(SpendBundle, reader) == bundle
+        assert await aparse(SpendBundle, reader) == bundle
+        assert await aparse(Varint, reader) == 129
+        assert await reader.read() == b"z"
+        with pytest.raises(asyncio.IncompleteReadError):
+            await aparse(SpendBundle, reader_for(to_bytes(bundle)[:-1]))
+
+    asyncio.run(run())
+
+
+def test_socket_round_trip():
+    async def run():
+        bundle = sample_bundle(20, puzzles=[LARGE_PUZZLE])
+        codec = FrameCodec(SpendBundle)
+        a, b = socket.socketpair()
+        reader_a, writer_a = await asyncio.open_connection(sock=a)
+        reader_b, writer_b = await asyncio.open_connection(sock=b)
+
+        async def send():
+            # `drain` blocks until the peer catches up, so read concurrently
+            for _ in range(50):
+                await astream(SpendBundle, bundle, writer_a)
+                await codec.write(writer_a, bundle)
+
+        async def receive():
+            for _ in range(50):
+                assert await aparse(SpendBundle, reader_b) == bundle
+                assert await codec.read(reader_b) == bundle
+
+        await asyncio.gather(send(), receive())
+        writer_a.close()
+        writer_b.close()
+
+    asyncio.run(run())
+
+
+def test_frame_codec_limits():
+    async def run():
+        bundle = sample_bundle(20, puzzles=[LARGE_PUZZLE])
+        frame = FrameCodec(SpendBundle).encode(bundle)
+        assert frame[4:] == to_bytes(bundle)
+        small = FrameCodec(SpendBundle, max_frame_size=100)
+        with pytest.raises(ValueError):
+            small.encode(bundle)
+        with pytest.raises(ValueError):
+            await small.read(reader_for(frame))
+        with pytest.raises(ValueError):
+            FrameCodec(SpendBundle).decode(frame[4:] + b"extra")
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import copy
+import io
+import pickle
+import struct
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import bytes32, int16, uint32
+from chia_base.bls12_381 import BLSSignature
+from chia_base.cbincode import (
+    InternTable,
+    from_bytes,
+    make_buffer_parser,
+    make_parser,
+    to_bytes,
+)
+from chia_base.cbincode.buffer_parser import program_size
+from chia_base.core import Coin, CoinSpend
+from chia_base.util.std_hash import std_hash
+
+from samples import sample_bundle
+
+PUZZLE = Program.to([1, b"x" * 100, [2, 3]])
+LARGE_SOLUTION = Program.to(b"y" * 70000)
+
+
+@dataclass
+class Mixed:
+    a: int16
+    b: Optional[str]
+    c: Tuple[bytes, uint32]
+    d: List[bytes32]
+
+
+def test_buffer_parser():
+    sb = sample_bundle(2, puzzles=[PUZZLE], solution=LARGE_SOLUTION)
+    mixed = Mixed(-3, "foo", (b"bar", 7), [std_hash(b"a")])
+    for obj in [
+        sb,
+        sb.coin_spends[0],
+        sb.coin_spends[0].coin,
+        mixed,
+        Mixed(0, None, (b"", 0), []),
+    ]:
+        t = type(obj)
+        blob = to_bytes(obj)
+        padded = b"junk" + blob + b"more"
+        parse = make_buffer_parser(t)
+        for buf in [padded, bytearray(padded), memoryview(padded)]:
+            v, offset = parse(buf, 4)
+            assert v == obj == make_parser(t)(io.BytesIO(blob))
+            assert offset == 4 + len(blob)
+
+    view_parse = make_buffer_parser(Mixed, zero_copy=True)
+    blob = to_bytes(mixed)
+    v, offset = view_parse(blob)
+    assert isinstance(v.c[0], memoryview)
+    assert v.c[0] == b"bar"
+    assert offset == len(blob)
+
+    sig, offset = make_buffer_parser(BLSSignature)(bytes(sb.aggregated_signature))
+    assert sig == sb.aggregated_signature
+    assert offset == 96
+
+
+def test_parsed_program_pickles():
+    # a `Program` backed by a `memoryview` can't be pickled or deep-copied
+    coin_spend = sample_bundle(
+        2, puzzles=[PUZZLE], solution=LARGE_SOLUTION
+    ).coin_spends[0]
+    blob = to_bytes(coin_spend)
+    for parsed in [
+        from_bytes(CoinSpend, blob),
+        from_bytes(CoinSpend, blob, intern=InternTable()),
+    ]:
+        assert pickle.loads(pickle.dumps(parsed)) == coin_spend
+        assert copy.deepcopy(parsed) == coin_spend
+
+
+def test_program_size():
+    for p in [
+        Program.to(0),
+        Program.to(1),
+        Program.to([1, 2, 3]),
+        Program.to(b"z" * 70000),
+    ]:
+        blob = bytes(p)
+        assert program_size(blob + b"\0" * 5) == len(blob)
+        with pytest.raises(ValueError):
+            program_size(blob[:-1])
+
+
+def test_buffer_parser_failure():
+    with pytest.raises(ValueError):
+        bytes32.parse_from_buffer(b"\0" * 40, 10)
+    with pytest.raises(ValueError):
+        make_buffer_parser(bytes)(bytes.fromhex("00000005abcd"))
+    with pytest.raises(struct.error):
+        make_buffer_parser(Coin)(b"\0" * 71)
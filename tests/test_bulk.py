@@ -0,0 +1,167 @@
+import io
+import struct
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pytest
+
+from chia_base.atoms import int8, uint8, int16, uint16, int32, uint32, int64, uint64
+from chia_base.atoms.struct_stream import (
+    READ_CHUNK_SIZE,
+    array_typecode,
+    bulk_atom,
+    struct_stream,
+)
+from chia_base.cbincode import (
+    IncrementalDecoder,
+    from_bytes,
+    make_buffer_parser,
+    make_buffer_streamer,
+    make_compiled_parser,
+    make_compiled_streamer,
+    make_parser,
+    make_streamer,
+    serialized_size,
+    to_bytes,
+)
+
+INT_TYPES = [int8, uint8, int16, uint16, int32, uint32, int64, uint64]
+
+
+class uint64_plus_one(uint64):
+    "streams like a `uint64`, but parses one more"
+
+    @classmethod
+    def parse(cls, f):
+        return cls(uint64.parse(f) + 1)
+
+
+@dataclass(frozen=True)
+class Heights:
+    amounts: List[uint64]
+    heights: Optional[List[uint32]]
+    deltas: List[int16]
+
+
+def sample_values(t):
+    size = t._struct.size * 8
+    if t.PACK[1].isupper():
+        return [t(0), t(1), t((1 << size) - 1), t(1 << (size - 1))]
+    return [t(0), t(-1), t((1 << (size - 1)) - 1), t(-(1 << (size - 1)))]
+
+
+def test_typecodes():
+    for t in INT_TYPES:
+        assert t._struct.format == t.PACK
+        assert bulk_atom(t)
+    assert array_typecode("!QQ") is None
+    assert array_typecode("<Q") is None
+    assert array_typecode("!L") in ("I", "L")
+    assert not bulk_atom(uint64_plus_one)
+    assert not bulk_atom(int)
+
+
+@pytest.mark.parametrize("t", INT_TYPES)
+def test_parse_stream_many(t):
+    values = sample_values(t)
+    expected = b"".join(struct.pack(t.PACK, _) for _ in values)
+
+    f = io.BytesIO()
+    t.stream_many(values, f)
+    assert f.getvalue() == expected
+    assert bytes(t.pack_many(values)) == expected
+
+    items = t.parse_many(io.BytesIO(expected), len(values))
+    assert items == values
+    assert all(type(_) is t for _ in items)
+    assert t.parse_many_from_buffer(b"xx" + expected, 2, len(values)) == (
+        values,
+        2 + len(expected),
+    )
+
+    buf = bytearray(len(expected) + 1)
+    assert t.stream_many_to_buffer(values, buf, 1) == len(buf)
+    assert buf[1:] == expected
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        uint64.parse_many(io.BytesIO(bytes(15)), 2)
+    with pytest.raises(ValueError):
+        uint64.parse_many_from_buffer(bytes(15), 0, 2)
+    with pytest.raises(ValueError):
+        uint64.stream_many_to_buffer([1, 2], bytearray(15), 0)
+    with pytest.raises(OverflowError):
+        uint8.pack_many([256])
+    with pytest.raises(OverflowError):
+        uint32.pack_many([-1])
+
+
+class RecordingReader(io.BytesIO):
+    "a `BytesIO` that remembers the largest read asked of it"
+
+    largest_read = 0
+
+    def read(self, size=-1):
+        self.largest_read = max(self.largest_read, size)
+        return super().read(size)
+
+
+def test_hostile_count():
+    # a count of four billion uint64 values, followed by only 100 bytes
+    blob = struct.pack("!L", 0xFFFFFFFF) + bytes(100)
+    for parse in (make_parser(List[uint64]), make_compiled_parser(List[uint64])):
+        f = RecordingReader(blob)
+        with pytest.raises(ValueError, match="unexpected EOS: 100 bytes read"):
+            parse(f)
+        assert f.largest_read <= READ_CHUNK_SIZE
+
+    # lists larger than one chunk still parse
+    values = list(range(READ_CHUNK_SIZE // 3))
+    f = io.BytesIO()
+    make_streamer(List[uint64])(values, f)
+    for parse in (make_parser(List[uint64]), make_compiled_parser(List[uint64])):
+        assert parse(io.BytesIO(f.getvalue())) == values
+
+
+def test_list_codecs():
+    heights = Heights(
+        [uint64(_ * 1000003) for _ in range(50)],
+        [uint32(_) for _ in range(7)],
+        [int16(-_) for _ in range(3)],
+    )
+    f = io.BytesIO()
+    f.write(struct.pack("!L", 50))
+    f.write(b"".join(struct.pack("!Q", _) for _ in heights.amounts))
+    f.write(b"\1" + struct.pack("!L", 7))
+    f.write(b"".join(struct.pack("!L", _) for _ in heights.heights or []))
+    f.write(struct.pack("!Lhhh", 3, 0, -1, -2))
+    blob = f.getvalue()
+
+    for stream in (make_streamer(Heights), make_compiled_streamer(Heights)):
+        f = io.BytesIO()
+        stream(heights, f)
+        assert f.getvalue() == blob
+    buf = bytearray(serialized_size(heights))
+    assert make_buffer_streamer(Heights)(heights, buf, 0) == len(blob)
+    assert buf == blob
+    assert to_bytes(heights) == blob
+
+    for parse in (make_parser(Heights), make_compiled_parser(Heights)):
+        assert parse(io.BytesIO(blob)) == heights
+    assert make_buffer_parser(Heights)(blob) == (heights, len(blob))
+    assert from_bytes(Heights, blob).amounts[3] == heights.amounts[3]
+    assert type(from_bytes(Heights, blob).amounts[3]) is uint64
+    decoder = IncrementalDecoder(Heights)
+    assert list(decoder.feed(blob)) == [heights]
+
+    with pytest.raises(ValueError):
+        make_buffer_parser(Heights)(blob[:-1])
+
+
+def test_overridden_parse_not_bulk():
+    blob = struct.pack("!LQQ", 2, 5, 6)
+    assert make_parser(List[uint64_plus_one])(io.BytesIO(blob)) == [6, 7]
+    assert make_compiled_parser(List[uint64_plus_one])(io.BytesIO(blob)) == [6, 7]
+    assert issubclass(uint64_plus_one, struct_stream)
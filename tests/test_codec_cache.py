@@ -0,0 +1,153 @@
+import importlib
+import io
+import os
+import struct
+import sys
+
+from typing import List, Optional
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint64
+from chia_base.bls12_381 import BLSSecretExponent
+from chia_base.cbincode import (
+    CodecRegistry,
+    make_compiled_parser,
+    make_compiled_streamer,
+    to_bytes,
+)
+from chia_base.cbincode.codec_cache import (
+    describe_ref,
+    load_codecs,
+    precompile_codecs,
+    read_cache,
+    resolve_ref,
+    schema_fingerprint,
+)
+from chia_base.cbincode.compiled_parser import raise_eos
+from chia_base.cbincode.registry import CODEC_REGISTRY
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+MODULE_SOURCE = """
+from dataclasses import dataclass
+from chia_base.atoms import uint32
+
+@dataclass(frozen=True)
+class Point:
+    x: uint32
+    %s
+"""
+
+
+def test_describe_ref():
+    for obj in [
+        Coin,
+        raise_eos,
+        uint64.parse_many,
+        bytes.__new__,
+        b"".join,
+        bytes,
+        struct.Struct("!QL"),
+    ]:
+        r = resolve_ref(describe_ref(obj))
+        if isinstance(obj, struct.Struct):
+            assert r.format == obj.format
+        else:
+            assert r == obj
+
+    def local_f():
+        pass
+
+    with pytest.raises(ValueError):
+        describe_ref(local_f)
+    with pytest.raises(ValueError):
+        describe_ref(object())
+
+
+def test_schema_fingerprint():
+    assert schema_fingerprint(Coin) == schema_fingerprint(Coin)
+    assert schema_fingerprint(Coin) != schema_fingerprint(CoinSpend)
+    assert schema_fingerprint(List[Coin]) != schema_fingerprint(Optional[Coin])
+
+
+def test_load_codecs(tmp_path, monkeypatch):
+    path = str(tmp_path / "codecs")
+    types = [SpendBundle, List[Coin]]
+    precompile_codecs(types, path)
+    assert len(read_cache(path)) == 4
+
+    registry = CodecRegistry()
+    monkeypatch.setattr("chia_base.cbincode.codec_cache.CODEC_REGISTRY", registry)
+    assert load_codecs(types, path) == 4
+    assert registry.size() == 4
+
+    parse = registry.get("compiled_parse", SpendBundle, lambda t: None)
+    stream = registry.get("compiled_stream", List[Coin], lambda t: None)
+    assert parse.__source__ == make_compiled_parser(SpendBundle).__source__
+
+    coins = [Coin(std_hash(b"%d" % i), std_hash(b"ph"), uint64(i)) for i in range(3)]
+    f = io.BytesIO()
+    stream(coins, f)
+    assert f.getvalue() == struct.pack("!L", 3) + b"".join(to_bytes(_) for _ in coins)
+    sig = BLSSecretExponent.from_int(1).sign(b"foo")
+    bundle = SpendBundle([CoinSpend(coins[0], Program.to(1), Program.to([]))], sig)
+    assert parse(io.BytesIO(to_bytes(bundle))) == bundle
+
+
+def test_load_codecs_merges(tmp_path, monkeypatch):
+    # callers loading different types add to the cache, rather than evict each other
+    path = str(tmp_path / "codecs")
+    for _ in range(2):
+        monkeypatch.setattr(
+            "chia_base.cbincode.codec_cache.CODEC_REGISTRY", CodecRegistry()
+        )
+        load_codecs([Coin], path)
+        monkeypatch.setattr(
+            "chia_base.cbincode.codec_cache.CODEC_REGISTRY", CodecRegistry()
+        )
+        load_codecs([SpendBundle], path)
+    assert len(read_cache(path)) == 4
+    mtime = os.stat(path).st_mtime_ns
+    assert load_codecs([Coin, SpendBundle], path) == 4
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_load_codecs_invalidation(tmp_path, monkeypatch):
+    path = str(tmp_path / "codecs")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module_path = tmp_path / "cached_point.py"
+    module_path.write_text(MODULE_SOURCE % "y: uint32")
+    module = importlib.import_module("cached_point")
+    try:
+        # a missing cache is created
+        assert load_codecs([module.Point], path) == 0
+        assert load_codecs([module.Point], path) == 2
+        old = make_compiled_parser(module.Point)
+
+        module_path.write_text(MODULE_SOURCE % "y: bytes")
+        module = importlib.reload(module)
+        assert load_codecs([module.Point], path) == 0
+        assert load_codecs([module.Point], path) == 2
+        point = module.Point(1, b"foo")
+        parse = make_compiled_parser(module.Point)
+        assert parse is not old
+        f = io.BytesIO()
+        make_compiled_streamer(module.Point)(point, f)
+        assert f.getvalue() == b"\0\0\0\1\0\0\0\3foo"
+        assert parse(io.BytesIO(f.getvalue())) == point
+    finally:
+        sys.modules.pop("cached_point", None)
+
+
+def test_corrupt_cache(tmp_path):
+    path = tmp_path / "codecs"
+    path.write_bytes(b"garbage")
+    assert read_cache(str(path)) == {}
+    assert load_codecs([Coin], str(path)) == 0
+    assert len(read_cache(str(path))) == 2
+    assert make_compiled_parser(Coin) is CODEC_REGISTRY.get(
+        "compiled_parse", Coin, lambda t: None
+    )
@@ -0,0 +1,113 @@
+import io
+import random
+
+from typing import List
+
+import pytest
+
+from chia_base.atoms import uint64
+from chia_base.cbincode import make_streamer
+from chia_base.core import Coin, CoinSet
+from chia_base.util.std_hash import std_hash
+
+
+def make_coins(count: int, puzzle_hash_count: int = 5, seed: int = 0) -> List[Coin]:
+    rng = random.Random(seed)
+    puzzle_hashes = [std_hash(b"ph %d" % _) for _ in range(puzzle_hash_count)]
+    return [
+        Coin(
+            std_hash(b"%d %d" % (seed, i)),
+            rng.choice(puzzle_hashes),
+            uint64(rng.choice([0, 1, 1000, (1 << 64) - 1, rng.getrandbits(40)])),
+        )
+        for i in range(count)
+    ]
+
+
+def serialize(coins: List[Coin]) -> bytes:
+    f = io.BytesIO()
+    make_streamer(List[Coin])(coins, f)
+    return f.getvalue()
+
+
+def check(coin_set: CoinSet, coins: List[Coin]) -> None:
+    "check `coin_set` holds exactly `coins`"
+    assert len(coin_set) == len(coins)
+    assert sorted(coin_set, key=Coin.name) == sorted(coins, key=Coin.name)
+    for coin in coins:
+        assert coin.name() in coin_set
+        assert coin_set.get(coin.name()) == coin
+    assert coin_set.total_amount() == sum(_.amount for _ in coins)
+    for puzzle_hash in {_.puzzle_hash for _ in coins}:
+        expected = [_ for _ in coins if _.puzzle_hash == puzzle_hash]
+        found = coin_set.coins_for_puzzle_hash(puzzle_hash)
+        assert sorted(found, key=Coin.name) == sorted(expected, key=Coin.name)
+        assert coin_set.amount_for_puzzle_hash(puzzle_hash) == sum(
+            _.amount for _ in expected
+        )
+
+
+def test_add_and_lookup():
+    coins = make_coins(300)
+    coin_set = CoinSet(coins[:100])
+    coin_set.add(coins[100:])
+    check(coin_set, coins)
+    assert coin_set.get(std_hash(b"missing")) is None
+    assert std_hash(b"missing") not in coin_set
+    assert coin_set.coins_for_puzzle_hash(std_hash(b"missing")) == []
+    assert coin_set.amount_for_puzzle_hash(std_hash(b"missing")) == 0
+    assert type(coin_set.get(coins[0].name()).amount) is uint64
+
+
+def test_remove():
+    coins = make_coins(500)
+    coin_set = CoinSet(coins)
+    rng = random.Random(1)
+    remaining = list(coins)
+    while remaining:
+        removed = rng.sample(remaining, min(len(remaining), rng.randint(1, 60)))
+        coin_set.remove(_.name() for _ in removed)
+        remaining = [_ for _ in remaining if _ not in removed]
+        check(coin_set, remaining)
+        # re-adding some coins reuses deleted index slots
+        readded = removed[: len(removed) // 3]
+        coin_set.add(readded)
+        remaining += readded
+        check(coin_set, remaining)
+        if len(remaining) < 30:
+            coin_set.remove(_.name() for _ in remaining)
+            remaining = []
+    check(coin_set, [])
+
+
+def test_errors():
+    coins = make_coins(10)
+    coin_set = CoinSet(coins[:5])
+    with pytest.raises(ValueError):
+        coin_set.add(coins[4:])
+    with pytest.raises(ValueError):
+        coin_set.add([coins[6], coins[6]])
+    with pytest.raises(KeyError):
+        coin_set.remove([coins[0].name(), coins[7].name()])
+    with pytest.raises(KeyError):
+        coin_set.remove([coins[0].name(), coins[0].name()])
+    # nothing changed
+    check(coin_set, coins[:5])
+
+
+def test_serialization():
+    coins = make_coins(200)
+    blob = serialize(coins)
+    coin_set = CoinSet.from_bytes(blob)
+    check(coin_set, coins)
+    assert coin_set.to_bytes() == blob
+    assert CoinSet().to_bytes() == serialize([])
+
+    coin_set.remove([coins[3].name()])
+    assert CoinSet.from_bytes(coin_set.to_bytes()).to_bytes() == coin_set.to_bytes()
+    with pytest.raises(ValueError):
+        coin_set.add_serialized(serialize(coins[:5]))
+    with pytest.raises(ValueError):
+        CoinSet.from_bytes(blob[:-1])
+    with pytest.raises(ValueError):
+        CoinSet.from_bytes(b"\0\0")
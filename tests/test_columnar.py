@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import io
+
+import pytest
+
+from chia_base.atoms import bytes32, int16, uint8, uint64
+from chia_base.cbincode import from_bytes, make_streamer, to_bytes
+from chia_base.core import Coin, CoinSpend
+from chia_base.util.std_hash import std_hash
+
+np = pytest.importorskip("numpy")
+
+from chia_base.cbincode.columnar import (  # noqa: E402
+    array_from_columns,
+    array_from_objects,
+    array_to_bytes,
+    columns,
+    objects_from_array,
+    parse_array,
+    record_dtype,
+)
+
+
+@dataclass
+class Tagged:
+    tag: Tuple[uint8, int16]
+    coin: Coin
+
+
+def sample_coins(count):
+    return [
+        Coin(std_hash(b"p%d" % i), std_hash(b"h%d" % (i % 3)), uint64(i * 1000))
+        for i in range(count)
+    ]
+
+
+def list_bytes(cls, items):
+    f = io.BytesIO()
+    make_streamer(List[cls])(items, f)
+    return f.getvalue()
+
+
+def test_record_dtype():
+    dtype = record_dtype(Coin)
+    assert dtype.names == ("parent_coin_info", "puzzle_hash", "amount")
+    assert dtype.itemsize == 72
+    assert record_dtype(Tagged).itemsize == 3 + 72
+    for cls in (CoinSpend, bytes, List[Coin]):
+        with pytest.raises(ValueError):
+            record_dtype(cls)
+
+
+def test_parse_array():
+    coins = sample_coins(10)
+    blob = b"xx" + list_bytes(Coin, coins) + b"yy"
+    records, end = parse_array(Coin, blob, 2)
+    assert end == len(blob) - 2
+    assert len(records) == 10
+    assert records["amount"].sum() == sum(c.amount for c in coins)
+    assert records["parent_coin_info"][3].tobytes() == coins[3].parent_coin_info
+    assert objects_from_array(Coin, records) == coins
+    assert array_to_bytes(records) == blob[2:-2]
+    with pytest.raises(ValueError):
+        parse_array(Coin, blob[:-10], 2)
+
+
+def test_columns_round_trip():
+    coins = sample_coins(7)
+    cols = columns(array_from_objects(Coin, coins))
+    assert (cols["amount"] == [c.amount for c in coins]).all()
+    records = array_from_columns(Coin, cols)
+    assert objects_from_array(Coin, records) == coins
+    with pytest.raises(ValueError):
+        array_from_columns(Coin, dict(amount=cols["amount"]))
+
+
+def test_nested():
+    items = [Tagged((uint8(i), int16(-i)), c) for i, c in enumerate(sample_coins(4))]
+    records = array_from_objects(Tagged, items)
+    assert list(records["tag"]["f1"]) == [0, -1, -2, -3]
+    assert list(records["coin"]["amount"]) == [0, 1000, 2000, 3000]
+    assert from_bytes(List[Tagged], array_to_bytes(records)) == items
+    assert to_bytes(items[0]) == records[:1].tobytes()
+    zero = Coin(bytes32(b"\0" * 32), bytes32(b"\1" * 32), uint64(5))
+    assert objects_from_array(Coin, array_from_objects(Coin, [zero])) == [zero]
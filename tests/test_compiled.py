@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import io
+
+import pytest
+
+
+from chia_base.atoms import bytes32, int8, int16, uint8, uint32, uint64
+from chia_base.bls12_381 import BLSSignature
+from chia_base.cbincode import (
+    make_compiled_parser,
+    make_compiled_streamer,
+    make_parser,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.core import Coin
+from chia_base.util.std_hash import std_hash
+
+from samples import sample_bundle
+
+
+@dataclass
+class Inner:
+    a: int8
+    b: Optional[uint32]
+
+
+@dataclass
+class Outer:
+    v1: int16
+    v2: Inner
+    v3: List[Inner]
+    v4: Tuple[uint8, str, bytes]
+    v5: Optional[List[bytes32]]
+
+
+def test_compiled_parser_matches():
+    sb = sample_bundle()
+    outer = Outer(
+        -5,
+        Inner(3, None),
+        [Inner(1, 2), Inner(-1, None)],
+        (7, "hello", b"there"),
+        [std_hash(b"a"), std_hash(b"b")],
+    )
+    for obj in [sb, sb.coin_spends[0], sb.coin_spends[0].coin, outer]:
+        t = type(obj)
+        blob = to_bytes(obj)
+        compiled = make_compiled_parser(t)
+        assert compiled(io.BytesIO(blob)) == make_parser(t)(io.BytesIO(blob)) == obj
+
+    t = Tuple[Optional[Outer], List[Coin]]
+    obj = (None, [sb.coin_spends[0].coin] * 3)
+    f = io.BytesIO()
+    make_streamer(t)(obj, f)
+    blob = f.getvalue()
+    assert make_compiled_parser(t)(io.BytesIO(blob)) == obj
+
+
+def test_compiled_parser_failure():
+    parse = make_compiled_parser(Coin)
+    with pytest.raises(ValueError):
+        parse(io.BytesIO(b"\0" * 71))
+    with pytest.raises(ValueError):
+        make_compiled_parser(List)
+
+
+def test_compiled_streamer_matches():
+    sb = sample_bundle()
+    outer = Outer(
+        -5,
+        Inner(3, None),
+        [Inner(1, 2), Inner(-1, None)],
+        (7, "hello", b"there"),
+        None,
+    )
+    cases = [
+        (type(obj), obj)
+        for obj in [sb, sb.coin_spends[0], sb.coin_spends[0].coin, outer]
+    ]
+    cases.append(
+        (List[Tuple[BLSSignature, Optional[str]]], [(sb.aggregated_signature, "a")] * 2)
+    )
+    for t, obj in cases:
+        f1 = io.BytesIO()
+        make_streamer(t)(obj, f1)
+        f2 = io.BytesIO()
+        make_compiled_streamer(t)(obj, f2)
+        assert f1.getvalue() == f2.getvalue()
+
+
+def test_compiled_streamer_failure():
+    stream = make_compiled_streamer(Coin)
+    with pytest.raises(ValueError):
+        stream(Coin(b"short", std_hash(b"1"), uint64(1)), io.BytesIO())
+    with pytest.raises(ValueError):
+        make_compiled_streamer(Tuple[uint8, str])((1,), io.BytesIO())
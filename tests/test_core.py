@@ -1,12 +1,14 @@
 from typing import Any
 
+import copy
 import io
+import pickle
 
 import pytest
 
 from clvm_rs import Program  # type: ignore
 
-from chia_base.atoms import bytes32, hexbytes
+from chia_base.atoms import bytes32, hexbytes, uint64
 from chia_base.bls12_381.bls_signature import BLSSignature
 from chia_base.core import Coin, CoinSpend, SpendBundle
 from chia_base.core import conlang
@@ -76,6 +78,46 @@ def test_simple():
     assert sb2 == sb_doubled
 
 
+def test_slots():
+    puzzle = Program.to([1, 2])
+    coin = Coin(std_hash(b"1"), puzzle.tree_hash(), uint64(1000))
+    coin_spend = CoinSpend(coin, puzzle, Program.to([3]))
+    spend_bundle = SpendBundle([coin_spend], BLSSignature.generator())
+    for obj in [coin, coin_spend, spend_bundle, coin.puzzle_hash, coin.amount]:
+        assert not hasattr(obj, "__dict__")
+    with pytest.raises(AttributeError):
+        coin.amount = uint64(1)  # type: ignore
+
+    assert pickle.loads(pickle.dumps(coin)) == coin
+    assert copy.deepcopy(coin) == coin
+    assert hash(copy.copy(coin)) == hash(coin)
+    sb2 = copy.copy(spend_bundle)
+    assert sb2 == spend_bundle and sb2.coin_spends is spend_bundle.coin_spends
+    assert type(pickle.loads(pickle.dumps(coin.amount))) is uint64
+
+
+# a `Coin` pickled when it still had a `__dict__`, before it had `__slots__`
+DICT_STATE_COIN_PICKLE = bytes.fromhex(
+    "800263636869615f626173652e636f72652e636f696e0a436f696e0a7100298171017d710228"
+    "5810000000706172656e745f636f696e5f696e666f710363636869615f626173652e61746f6d"
+    "732e73697a65645f62797465730a627974657333320a7104635f636f646563730a656e636f64"
+    "650a710558200000000101010101010101010101010101010101010101010101010101010101"
+    "010101710658060000006c6174696e31710786710852710985710a81710b580b00000070757a"
+    "7a6c655f68617368710c68046805582000000002020202020202020202020202020202020202"
+    "02020202020202020202020202710d680786710e52710f8571108171115806000000616d6f75"
+    "6e74711263636869615f626173652e61746f6d732e696e74730a75696e7436340a71134de803"
+    "85711481711575622e"
+)
+
+
+def test_unpickle_dict_state():
+    coin = pickle.loads(DICT_STATE_COIN_PICKLE)
+    assert coin == Coin(bytes32([1] * 32), bytes32([2] * 32), uint64(1000))
+    assert type(coin.amount) is uint64
+    with pytest.raises(ValueError):
+        Coin.__new__(Coin).__setstate__({"parent_coin_info": bytes32([1] * 32)})
+
+
 def test_bytes32():
     with pytest.raises(ValueError):
         bytes32(bytes([0] * 33))
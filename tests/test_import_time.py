@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+from pathlib import Path
+
+import chia_base
+
+ROOT = Path(chia_base.__file__).parent.parent
+
+# generous, so a busy machine doesn't fail it. Typically it's about 15ms, almost
+# all of it `typing`
+IMPORT_TIME_BUDGET_MS = 150
+
+HEAVY_MODULES = ["chia_rs", "clvm_rs", "numpy"]
+
+
+def run(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=ROOT,
+    ).stdout
+
+
+def loaded_heavy_modules(statement: str) -> list:
+    code = f"import sys\n{statement}\nprint(sorted(sys.modules))"
+    return [_ for _ in HEAVY_MODULES if _ in run(code).split("'")]
+
+
+def test_import_time_budget():
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import chia_base.atoms\n"
+        "print(time.perf_counter() - start)"
+    )
+    # the best of a few runs, to ignore noise
+    elapsed_ms = min(float(run(code)) for _ in range(3)) * 1000
+    assert elapsed_ms < IMPORT_TIME_BUDGET_MS
+
+
+def test_no_heavy_imports():
+    assert loaded_heavy_modules("import chia_base.atoms") == []
+    assert loaded_heavy_modules("from chia_base.util.bech32 import bech32_encode") == []
+    assert loaded_heavy_modules("from chia_base.core import Coin") == []
+    assert loaded_heavy_modules("import chia_base.bls12_381") == []
+    assert loaded_heavy_modules("from chia_base.core import CoinSpend") == ["clvm_rs"]
+    assert loaded_heavy_modules("from chia_base.bls12_381 import BLSSignature") == [
+        "chia_rs"
+    ]
+
+
+def test_lazy_zero():
+    code = (
+        "from chia_base.bls12_381 import bls_secret_exponent as m\n"
+        "print(m._ZERO is None, m.ZERO is m.BLSSecretExponent.zero(), int(m.ZERO))"
+    )
+    assert run(code).split() == ["True", "True", "0"]
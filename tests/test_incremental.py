@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional, Tuple
+
+import io
+import random
+import struct
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint8, uint64
+from chia_base.cbincode import (
+    IncrementalDecoder,
+    ParseLimits,
+    make_compiled_parser,
+    make_parser,
+    to_bytes,
+)
+from chia_base.core import Coin, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+from samples import sample_bundle
+
+
+class Varint(int):
+    "a class of unknown size, to test the slow path"
+
+    @classmethod
+    def parse(cls, f: BinaryIO) -> "Varint":
+        v = 0
+        while True:
+            b = f.read(1)[0]
+            v = (v << 7) | (b & 0x7F)
+            if b < 0x80:
+                return cls(v)
+
+    def stream(self, f: BinaryIO) -> None:
+        groups = [self & 0x7F]
+        v = self >> 7
+        while v:
+            groups.append(0x80 | (v & 0x7F))
+            v >>= 7
+        f.write(bytes(reversed(groups)))
+
+
+class SizedBlob(bytes):
+    "a class of unknown size that reads its size first"
+
+    parse_count = 0
+
+    @classmethod
+    def parse(cls, f: BinaryIO) -> "SizedBlob":
+        cls.parse_count += 1
+        (size,) = struct.unpack("!L", f.read(4))
+        return cls(f.read(size))
+
+    def stream(self, f: BinaryIO) -> None:
+        f.write(struct.pack("!L", len(self)))
+        f.write(self)
+
+
+@dataclass
+class Message:
+    kind: uint8
+    note: Optional[str]
+    counters: List[Varint]
+    pair: Tuple[bytes, Program]
+    coins: List[Coin]
+
+
+def sample_messages():
+    coins = [Coin(std_hash(b"%d" % i), std_hash(b"ph"), uint64(i)) for i in range(3)]
+    program = Program.to([1, b"x" * 100, [2, 3], b"y" * 70000])
+    return [
+        Message(
+            1, "hello", [Varint(5), Varint(300), Varint(1 << 40)], (b"", program), coins
+        ),
+        Message(2, None, [], (b"blob" * 100, Program.to(0)), []),
+    ]
+
+
+def feed_in_chunks(cls, blob, sizes):
+    decoder = IncrementalDecoder(cls)
+    results = []
+    offset = 0
+    for size in sizes:
+        results.extend(decoder.feed(blob[offset : offset + size]))
+        offset += size
+    results.extend(decoder.feed(blob[offset:]))
+    decoder.close()
+    return results
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 100, 100000])
+def test_chunked(chunk_size):
+    messages = sample_messages()
+    blob = b"".join(to_bytes(m) for m in messages)
+    sizes = [chunk_size] * (len(blob) // chunk_size)
+    assert feed_in_chunks(Message, blob, sizes) == messages
+    bundle = sample_bundle()
+    blob = to_bytes(bundle) * 3
+    sizes = [chunk_size] * (len(blob) // chunk_size)
+    assert feed_in_chunks(SpendBundle, blob, sizes) == [bundle] * 3
+
+
+def test_random_chunks():
+    messages = sample_messages() * 3
+    blob = b"".join(to_bytes(m) for m in messages)
+    rng = random.Random(1)
+    for _ in range(10):
+        sizes = [rng.randint(0, 300) for _ in range(len(blob) // 100)]
+        assert feed_in_chunks(Message, blob, sizes) == messages
+
+
+def test_results_as_soon_as_complete():
+    bundle = sample_bundle()
+    blob = to_bytes(bundle)
+    decoder = IncrementalDecoder(SpendBundle)
+    assert decoder.feed(blob[:-1]) == []
+    assert decoder.in_progress
+    assert decoder.bytes_needed() == 1
+    assert decoder.feed(blob[-1:] + blob[:10]) == [bundle]
+    assert decoder.buffered + decoder.in_progress > 0
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_bytes_needed_never_overshoots():
+    messages = sample_messages()
+    blob = b"".join(to_bytes(m) for m in messages)
+    decoder = IncrementalDecoder(Message)
+    results = []
+    offset = 0
+    while offset < len(blob):
+        needed = decoder.bytes_needed()
+        assert needed > 0
+        results.extend(decoder.feed(blob[offset : offset + needed]))
+        offset += needed
+    assert results == messages
+    assert decoder.buffered == 0
+
+
+def test_short_reads_raise():
+    blob = to_bytes(b"abcdef")
+    for make in (make_parser, make_compiled_parser):
+        with pytest.raises(ValueError):
+            make(bytes)(io.BytesIO(blob[:-1]))
+
+
+def test_limits():
+    # a count that claims 4 GB of coins fails as soon as it's read
+    decoder = IncrementalDecoder(List[Coin], ParseLimits(max_bytes=1 << 20))
+    with pytest.raises(ValueError):
+        decoder.feed(b"\xff\xff\xff\xff")
+    decoder = IncrementalDecoder(List[uint64], ParseLimits(max_list_length=10))
+    assert decoder.feed((10).to_bytes(4, "big") + bytes(80)) == [[0] * 10]
+    with pytest.raises(ValueError):
+        decoder.feed((11).to_bytes(4, "big"))
+
+    decoder = IncrementalDecoder(bytes, ParseLimits(max_blob_size=100))
+    assert decoder.feed(to_bytes(b"x" * 100)) == [b"x" * 100]
+    with pytest.raises(ValueError):
+        decoder.feed(to_bytes(b"x" * 101)[:4])
+
+    limits = ParseLimits(max_blob_size=1000, max_depth=4)
+    decoder = IncrementalDecoder(Program, limits)
+    program = Program.to([1, [2, 3]])
+    assert decoder.feed(bytes(program)) == [program]
+    for program in (Program.to(b"x" * 1000), Program.to([1, [2, [3]]])):
+        decoder = IncrementalDecoder(Program, limits)
+        with pytest.raises(ValueError):
+            decoder.feed(bytes(program))
+
+    # a `.parse` of unknown size can't read past `max_bytes` either
+    blob = to_bytes(Varint(1 << 40))
+    decoder = IncrementalDecoder(Varint, ParseLimits(max_bytes=len(blob)))
+    assert decoder.feed(blob) == [1 << 40]
+    decoder = IncrementalDecoder(Varint, ParseLimits(max_bytes=len(blob) - 1))
+    with pytest.raises(ValueError):
+        decoder.feed(blob)
+
+
+def test_no_retry_without_data():
+    # a `.parse` that came up short isn't tried again until there's enough data
+    blob = to_bytes(SizedBlob(b"x" * 1000))
+    decoder = IncrementalDecoder(SizedBlob)
+    SizedBlob.parse_count = 0
+    results = []
+    for b in blob:
+        results.extend(decoder.feed(bytes([b])))
+    assert results == [b"x" * 1000]
+    assert SizedBlob.parse_count == 3
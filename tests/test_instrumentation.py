@@ -0,0 +1,115 @@
+import io
+
+import pytest
+
+from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent, BLSSignature
+from chia_base.cbincode import (
+    from_bytes,
+    make_buffer_parser,
+    make_compiled_parser,
+    make_parser,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.core import Coin, CoinSpend
+from chia_base.util import instrumentation
+
+from samples import sample_bundle
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+
+def test_disabled_adds_no_wrappers():
+    assert not instrumentation.enabled()
+    assert instrumentation.codec_wrapper("parse") is None
+    parse = make_parser(Coin)
+    coin_spend = sample_bundle(1).coin_spends[0]
+    parse(io.BytesIO(to_bytes(coin_spend.coin)))
+    assert "parse" not in instrumentation.snapshot()
+
+
+def test_codec_counts(instrumented):
+    coin_spend = sample_bundle(1).coin_spends[0]
+    blob = to_bytes(coin_spend)
+
+    assert make_parser(CoinSpend)(io.BytesIO(blob)) == coin_spend
+    assert make_buffer_parser(CoinSpend)(blob)[0] == coin_spend
+    make_streamer(CoinSpend)(coin_spend, io.BytesIO())
+    make_compiled_parser(CoinSpend)(io.BytesIO(blob))
+
+    stats = instrumented.snapshot()
+    assert stats["parse"]["CoinSpend"]["calls"] == 1
+    assert stats["parse"]["CoinSpend"]["bytes"] == len(blob)
+    assert stats["parse"]["Coin"]["bytes"] == 72
+    assert stats["parse"]["Program"]["calls"] == 2
+    assert stats["parse"]["CoinSpend"]["seconds"] > 0
+    assert stats["buffer_parse"]["CoinSpend"]["bytes"] == len(blob)
+    assert stats["stream"]["CoinSpend"]["bytes"] == len(blob)
+    assert stats["compiled_parse"]["CoinSpend"]["calls"] == 1
+
+    instrumented.reset()
+    assert instrumented.snapshot() == {}
+
+
+def test_type_label():
+    from typing import List, Optional, Tuple
+
+    assert instrumentation.type_label(List[Coin]) == "list[Coin]"
+    assert instrumentation.type_label(Tuple[int, bytes]) == "tuple[int, bytes]"
+    assert instrumentation.type_label(Optional[Coin]) == "Union[Coin, NoneType]"
+
+
+def test_bls_timing(instrumented):
+    se = BLSSecretExponent.from_int(1)
+    sig = se.sign(b"hello")
+    pk = se.public_key()
+    assert sig.verify([(pk, b"hello")])
+    assert BLSSignature.from_bytes(bytes(sig)) == sig
+    assert BLSPublicKey.from_bytes(bytes(pk)).child(1) == pk.child(1)
+    assert from_bytes(BLSSignature, bytes(sig)) == sig
+
+    stats = instrumented.snapshot()
+    assert stats["sign"]["BLSSecretExponent"]["calls"] == 1
+    assert stats["verify"]["BLSSignature"]["calls"] == 1
+    assert stats["child"]["BLSPublicKey"]["calls"] == 2
+    assert stats["from_bytes"]["BLSSignature"]["calls"] == 2
+    assert stats["from_bytes"]["BLSSignature"]["bytes"] == 192
+    assert stats["from_bytes"]["BLSPublicKey"]["bytes"] == 48
+
+
+def test_disable_restores_originals():
+    from_bytes_f = BLSSignature.__dict__["from_bytes"]
+    verify = BLSSignature.verify
+    parse = make_parser(Coin)
+    instrumentation.enable()
+    try:
+        assert BLSSignature.__dict__["from_bytes"] is not from_bytes_f
+        assert make_parser(Coin) is not parse
+    finally:
+        instrumentation.disable()
+    assert BLSSignature.__dict__["from_bytes"] is from_bytes_f
+    assert BLSSignature.verify is verify
+    assert instrumentation.codec_wrapper("parse") is None
+    instrumentation.reset()
+
+
+def test_prometheus_text(instrumented):
+    coin = sample_bundle(1).coin_spends[0].coin
+    to_bytes(coin)
+    make_parser(Coin)(io.BytesIO(to_bytes(coin)))
+    text = instrumented.prometheus_text()
+    assert "# TYPE chia_base_calls_total counter\n" in text
+    assert 'chia_base_calls_total{op="parse",type="Coin"} 1\n' in text
+    assert 'chia_base_bytes_total{op="parse",type="Coin"} 72\n' in text
+    assert 'chia_base_seconds_total{op="parse",type="Coin"} ' in text
+    assert 'op="compiled_stream",type="Coin"' in text
+    assert instrumentation._escape_label('a"b\\c') == 'a\\"b\\\\c'
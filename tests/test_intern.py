@@ -0,0 +1,73 @@
+import struct
+
+from typing import List
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import bytes32
+from chia_base.cbincode import (
+    InternTable,
+    from_bytes,
+    make_interning_parser,
+    to_bytes,
+)
+from chia_base.core import Coin, SpendBundle
+
+from samples import sample_bundle
+
+PUZZLES = [Program.to([1, [2, i], list(range(20))]) for i in range(3)]
+
+
+def test_intern_table_lru():
+    table = InternTable(max_size=2)
+    a = table.get(bytes32, b"a" * 32, bytes32)
+    assert table.get(bytes32, b"a" * 32, bytes32) is a
+    b = table.get(bytes32, b"b" * 32, bytes32)
+    # `a` is now the most recently used, so `b` goes first
+    assert table.get(bytes32, b"a" * 32, bytes32) is a
+    table.get(bytes32, b"c" * 32, bytes32)
+    assert len(table) == 2
+    assert table.get(bytes32, b"b" * 32, bytes32) is not b
+    assert table.get(bytes32, b"a" * 32, bytes32) is not a
+    assert (table.hits, table.misses) == (2, 5)
+    table.clear()
+    assert len(table) == 0 and table.hits == 0
+
+
+def test_interning_parser():
+    bundles = [sample_bundle(4, _, PUZZLES) for _ in range(5)]
+    table = InternTable()
+    parsed = [from_bytes(SpendBundle, to_bytes(_), intern=table) for _ in bundles]
+    assert parsed == bundles
+    assert make_interning_parser(SpendBundle, table) is make_interning_parser(
+        SpendBundle, table
+    )
+
+    puzzles = {id(cs.puzzle_reveal) for b in parsed for cs in b.coin_spends}
+    puzzle_hashes = {id(cs.coin.puzzle_hash) for b in parsed for cs in b.coin_spends}
+    assert len(puzzles) == len(PUZZLES)
+    assert len(puzzle_hashes) == len(PUZZLES)
+    # the solutions differ, and so do parent ids
+    solutions = {id(cs.solution) for b in parsed for cs in b.coin_spends}
+    assert len(solutions) == 20
+    for cs in parsed[0].coin_spends:
+        assert type(cs.coin.puzzle_hash) is bytes32
+
+    # a different table shares nothing with the first
+    other = from_bytes(SpendBundle, to_bytes(bundles[0]), intern=InternTable())
+    assert (
+        other.coin_spends[0].puzzle_reveal is not parsed[0].coin_spends[0].puzzle_reveal
+    )
+
+
+def test_interning_parser_errors():
+    table = InternTable()
+    blob = to_bytes(sample_bundle(4, 0, PUZZLES))
+    with pytest.raises(ValueError):
+        make_interning_parser(SpendBundle, table)(blob[:-1])
+    with pytest.raises(ValueError):
+        make_interning_parser(List[Coin], table)(struct.pack("!L", 1) + bytes(40))
+    with pytest.raises(ValueError):
+        from_bytes(SpendBundle, blob, trusted=True, intern=table)
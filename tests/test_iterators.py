@@ -0,0 +1,48 @@
+from typing import List
+
+import io
+
+import pytest
+
+from chia_base.atoms import uint64
+from chia_base.cbincode import from_bytes, iter_parse, stream_iter, to_bytes
+from chia_base.core import Coin
+from chia_base.util.std_hash import std_hash
+
+
+def coins(count: int):
+    for i in range(count):
+        yield Coin(std_hash(bytes([i])), std_hash(b"ph"), uint64(i))
+
+
+def test_iter_parse():
+    expected = list(coins(10))
+    blob = bytes.fromhex("0000000a") + b"".join(to_bytes(c) for c in expected)
+    f = io.BytesIO(blob + b"trailer")
+    items = iter_parse(List[Coin], f)
+    assert f.tell() == 4
+    assert next(items) == expected[0]
+    assert f.tell() == 4 + 72
+    assert [expected[0]] + list(items) == expected
+    assert f.read() == b"trailer"
+
+    with pytest.raises(ValueError):
+        iter_parse(Coin, f)
+
+
+def test_stream_iter():
+    expected = list(coins(5))
+    for length in [None, 5]:
+        f = io.BytesIO()
+        # a generator has no `len`, so the count is patched in at the end
+        assert stream_iter(List[Coin], coins(5), f, length=length) == 5
+        assert from_bytes(List[Coin], f.getvalue()) == expected
+
+    f = io.BytesIO()
+    stream_iter(List[Coin], expected, f)
+    assert from_bytes(List[Coin], f.getvalue()) == expected
+
+    with pytest.raises(ValueError):
+        stream_iter(List[Coin], coins(5), io.BytesIO(), length=4)
+    with pytest.raises(ValueError):
+        stream_iter(List[Coin], coins(5), io.BytesIO(), length=6)
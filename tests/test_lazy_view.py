@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import types
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import bytes32, uint8, uint64
+from chia_base.cbincode import (
+    fixed_size,
+    make_lazy_view,
+    make_skipper,
+    to_bytes,
+    view_of,
+)
+from chia_base.cbincode.lazy_view import _MISSING
+from chia_base.core import Coin, CoinSpend
+from chia_base.util.std_hash import std_hash
+
+
+@dataclass
+class Record:
+    flag: uint8
+    coin: Coin
+    memo: bytes
+    tags: List[Optional[str]]
+    puzzle: Program
+    amount: uint64
+
+
+def sample_record():
+    coin = Coin(std_hash(b"1"), std_hash(b"2"), uint64(1000))
+    return Record(1, coin, b"memo", ["a", None, "b"], Program.to([1, 2]), uint64(7))
+
+
+def test_skipper():
+    record = sample_record()
+    blob = to_bytes(record)
+    assert make_skipper(Record)(b"xx" + blob + b"yy", 2) == 2 + len(blob)
+    coins_blob = bytes.fromhex("00000003") + to_bytes(record.coin) * 3
+    assert make_skipper(List[Coin])(coins_blob) == 4 + 3 * 72
+    assert fixed_size(Coin) == 72
+    assert fixed_size(bytes32) == 32
+    assert fixed_size(Record) is None
+    with pytest.raises(ValueError):
+        make_skipper(Coin)(bytes(71))
+
+
+def test_lazy_view_module():
+    # the package has no attribute hiding the submodule
+    import chia_base.cbincode.lazy_view as module
+
+    assert isinstance(module, types.ModuleType)
+
+
+def test_lazy_view():
+    record = sample_record()
+    blob = b"xx" + to_bytes(record)
+    view = view_of(Record, blob, 2)
+    assert type(view).__name__ == "RecordView"
+    assert view.offset == 2
+    # fields at a constant offset don't need any skipping
+    assert view.memo == b"memo"
+    assert view._offsets == [0, 1, 73]
+    assert view.amount == 7
+    assert view.coin == record.coin
+    assert view.end_offset == len(blob)
+    assert view.materialize() == record
+
+    cs = CoinSpend(record.coin, Program.to([1, 2]), Program.to(5))
+    cs_view = make_lazy_view(CoinSpend)(to_bytes(cs))
+    assert cs_view.coin.puzzle_hash == cs.coin.puzzle_hash
+    assert cs_view._values[1:] == [_MISSING, _MISSING]
+    assert cs_view.solution == cs.solution
+
+    with pytest.raises(ValueError):
+        make_lazy_view(bytes32)
@@ -0,0 +1,175 @@
+import io
+import struct
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint8, uint64
+from chia_base.cbincode import (
+    LimitedReader,
+    ParseLimits,
+    make_buffer_parser,
+    make_compiled_parser,
+    make_limited_parser,
+    make_parser,
+    make_skipper,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.cbincode.aio import FrameCodec
+from chia_base.cbincode.limits import program_depth, type_depth
+from chia_base.cbincode.parser import READ_CHUNK_SIZE
+from chia_base.cbincode.sizer import min_serialized_size
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+@dataclass(frozen=True)
+class Message:
+    memos: List[bytes]
+    coins: List[Coin]
+    puzzle: Program
+    note: Optional[str]
+
+
+@dataclass(frozen=True)
+class Nested:
+    values: List[List[Tuple[uint8, uint8]]]
+
+
+def make_message() -> Message:
+    coins = [Coin(std_hash(b"%d" % i), std_hash(b"ph"), uint64(i)) for i in range(3)]
+    return Message([b"a", b"bcd"], coins, Program.to([1, [2, [3]]]), "hi")
+
+
+def test_min_serialized_size():
+    assert min_serialized_size(Coin) == 72
+    assert min_serialized_size(CoinSpend) == 74
+    assert min_serialized_size(List[Coin]) == 4
+    assert min_serialized_size(Optional[Coin]) == 1
+    assert min_serialized_size(Message) == 4 + 4 + 1 + 1
+
+
+def test_depths():
+    assert type_depth(Coin) == 1
+    assert type_depth(SpendBundle) == 4
+    assert type_depth(Nested) == 4
+    assert program_depth(bytes(Program.to(5))) == 0
+    assert program_depth(bytes(Program.to((1, 2)))) == 1
+    assert program_depth(bytes(Program.to([1, [2, [3]]]))) == 5
+    assert program_depth(b"\xff" * 20000 + b"\x80" * 20001) == 20000
+
+
+def test_list_longer_than_buffer():
+    # five bytes claiming four billion coins
+    blob = struct.pack("!LB", 0xFFFFFFFF, 0)
+    for parse in (make_buffer_parser(List[Coin]), make_buffer_parser(List[CoinSpend])):
+        with pytest.raises(ValueError, match="can't fit"):
+            parse(blob)
+    with pytest.raises(ValueError, match="can't fit"):
+        make_skipper(List[CoinSpend])(blob)
+    with pytest.raises(ValueError, match="can't fit"):
+        make_buffer_parser(List[uint64])(blob)
+
+
+def test_large_blob_prefix_reads_in_chunks():
+    blob = struct.pack("!L", 0xFFFFFFF0) + b"x" * (READ_CHUNK_SIZE + 10)
+    for parse in (make_parser(bytes), make_compiled_parser(bytes)):
+        with pytest.raises(ValueError, match="unexpected EOS"):
+            parse(io.BytesIO(blob))
+    big = bytes(range(256)) * (READ_CHUNK_SIZE // 100)
+    f = io.BytesIO()
+    f.write(struct.pack("!L", len(big)))
+    f.write(big)
+    for parse in (make_parser(bytes), make_compiled_parser(bytes)):
+        assert parse(io.BytesIO(f.getvalue())) == big
+
+
+def test_limited_parser_accepts():
+    message = make_message()
+    blob = to_bytes(message)
+    limits = ParseLimits(
+        max_bytes=len(blob), max_list_length=3, max_blob_size=20, max_depth=5
+    )
+    parse = make_limited_parser(Message, limits)
+    assert parse(blob) == (message, len(blob))
+    assert parse(b"\0" + blob, 1) == (message, len(blob) + 1)
+    assert make_limited_parser(Message, limits) is parse
+    assert make_limited_parser(Message, ParseLimits()) is not parse
+
+
+def test_limited_parser_rejects():
+    message = make_message()
+    blob = to_bytes(message)
+
+    def parse(**kwargs):
+        return make_limited_parser(Message, ParseLimits(**kwargs))(blob)
+
+    with pytest.raises(ValueError):
+        parse(max_bytes=len(blob) - 1)
+    with pytest.raises(ValueError, match="list length of 3 exceeds limit of 2"):
+        parse(max_list_length=2)
+    with pytest.raises(ValueError, match="blob size of 3 exceeds"):
+        parse(max_blob_size=2)
+    with pytest.raises(ValueError, match="program depth of 5 exceeds"):
+        parse(max_depth=4)
+    with pytest.raises(ValueError, match="type depth of 4 exceeds"):
+        make_limited_parser(Nested, ParseLimits(max_depth=3))
+
+    puzzle = Program.to(list(range(100)))
+    big = Message([], [], puzzle, None)
+    with pytest.raises(ValueError, match="program size"):
+        make_limited_parser(Message, ParseLimits(max_blob_size=100))(to_bytes(big))
+
+    # the list length is checked before any item is parsed
+    hostile = struct.pack("!L", 1000) + b"\0" * 20
+    with pytest.raises(ValueError, match="list length"):
+        make_limited_parser(List[bytes], ParseLimits(max_list_length=999))(hostile)
+
+
+def test_limited_bulk_list():
+    # lists of fixed-width ints are parsed in bulk, but checked the same way
+    values = [uint64(_) for _ in range(5)]
+    f = io.BytesIO()
+    make_streamer(List[uint64])(values, f)
+    blob = f.getvalue()
+    parse = make_limited_parser(List[uint64], ParseLimits(max_list_length=5))
+    assert parse(blob) == (values, len(blob))
+    with pytest.raises(ValueError, match="list length of 5 exceeds limit of 4"):
+        make_limited_parser(List[uint64], ParseLimits(max_list_length=4))(blob)
+    with pytest.raises(ValueError, match="can't fit"):
+        make_limited_parser(List[uint64], ParseLimits(max_bytes=len(blob) - 1))(blob)
+
+    hostile = struct.pack("!L", 0xFFFFFFFF) + bytes(100)
+    with pytest.raises(ValueError, match="list length"):
+        make_limited_parser(List[uint64], ParseLimits(max_list_length=1000))(hostile)
+    for parse_stream in (make_parser(List[uint64]), make_compiled_parser(List[uint64])):
+        with pytest.raises(ValueError, match="exceeds"):
+            parse_stream(LimitedReader(io.BytesIO(hostile), 1000))
+        assert parse_stream(LimitedReader(io.BytesIO(blob), len(blob))) == values
+
+
+def test_limited_reader():
+    blob = to_bytes(make_message())
+    f = LimitedReader(io.BytesIO(blob), len(blob))
+    assert make_parser(Message)(f) == make_message()
+    assert f.remaining == 0
+
+    hostile = struct.pack("!L", 0xFFFFFFFF)
+    with pytest.raises(ValueError, match="exceeds"):
+        make_parser(bytes)(LimitedReader(io.BytesIO(hostile), 1000))
+    with pytest.raises(ValueError):
+        LimitedReader(io.BytesIO(blob), 10).read()
+
+
+def test_frame_codec_limits():
+    message = make_message()
+    codec = FrameCodec(Message, limits=ParseLimits(max_list_length=2))
+    payload = codec.encode(message)[4:]
+    with pytest.raises(ValueError, match="list length"):
+        codec.decode(payload)
+    assert FrameCodec(Message).decode(payload) == message
@@ -0,0 +1,38 @@
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint64
+from chia_base.cbincode import MappedFile, to_bytes
+from chia_base.core import Coin, CoinSpend
+from chia_base.util.std_hash import std_hash
+
+
+def test_mapped_file(tmp_path):
+    puzzle = Program.to([1, 2, 3])
+    coin_spends = [
+        CoinSpend(
+            Coin(std_hash(bytes([i])), puzzle.tree_hash(), uint64(i)),
+            puzzle,
+            Program.to(list(range(i))),
+        )
+        for i in range(20)
+    ]
+    path = tmp_path / "coin_spends.bin"
+    path.write_bytes(b"".join(to_bytes(_) for _ in coin_spends))
+
+    with MappedFile(path, CoinSpend) as f:
+        assert list(f) == coin_spends
+        offsets = f.record_offsets()
+        assert len(offsets) == 20
+        assert offsets[0] == 0
+        record, next_offset = f.parse_at(offsets[7])
+        assert record == coin_spends[7]
+        assert next_offset == offsets[8]
+        with pytest.raises(IndexError):
+            f.parse_at(len(f))
+
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    with MappedFile(path, Coin) as f:
+        assert list(f) == []
@@ -0,0 +1,79 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import io
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import uint64
+from chia_base.cbincode import make_streamer
+from chia_base.cbincode.parallel import (
+    parallel_map,
+    record_offsets,
+    shard_ranges,
+)
+from chia_base.core import Coin, CoinSpend
+from chia_base.util.std_hash import std_hash
+
+
+def coin_name(coin_spend: CoinSpend):
+    return coin_spend.coin.name()
+
+
+def coin_of(coin_spend: CoinSpend):
+    return coin_spend.coin
+
+
+def sample_blob(count):
+    f = io.BytesIO()
+    stream = make_streamer(CoinSpend)
+    spends = []
+    for i in range(count):
+        coin = Coin(std_hash(b"%d" % i), std_hash(b"ph"), uint64(i))
+        spend = CoinSpend(coin, Program.to([1, b"x" * (i % 50)]), Program.to(i))
+        spends.append(spend)
+        stream(spend, f)
+    return spends, f.getvalue()
+
+
+def test_record_offsets_and_shards():
+    spends, blob = sample_blob(30)
+    offsets = record_offsets(CoinSpend, blob)
+    assert len(offsets) == 31 and offsets[-1] == len(blob)
+    ranges = shard_ranges(offsets, 4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(blob)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(start in offsets and end in offsets for start, end in ranges)
+    assert len(shard_ranges(offsets, 100)) == 30
+    assert shard_ranges([0], 4) == []
+
+
+def test_parallel_processes(tmp_path):
+    spends, blob = sample_blob(200)
+    names = [spend.coin.name() for spend in spends]
+    assert parallel_map(CoinSpend, blob, coin_name, max_workers=2) == names
+    path = tmp_path / "spends.bin"
+    path.write_bytes(blob)
+    assert parallel_map(CoinSpend, path, coin_name, max_workers=2) == names
+    coins = parallel_map(CoinSpend, str(path), coin_of, max_workers=2)
+    assert coins == [spend.coin for spend in spends]
+    assert parallel_map(CoinSpend, path, max_workers=2) == spends
+    assert parallel_map(CoinSpend, b"", coin_name) == []
+
+
+class UnusedExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs):
+        raise AssertionError("no work should be sent to a process pool")
+
+
+def test_parallel_processes_default():
+    # without `f`, records are parsed in place rather than sent back from a pool
+    spends, blob = sample_blob(100)
+    executor = UnusedExecutor()
+    assert parallel_map(CoinSpend, blob, executor=executor) == spends
+    assert parallel_map(CoinSpend, memoryview(blob), executor=executor) == spends
+
+
+def test_parallel_threads():
+    spends, blob = sample_blob(50)
+    with ThreadPoolExecutor(3) as executor:
+        assert parallel_map(CoinSpend, blob, executor=executor) == spends
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import gc
+import threading
+import weakref
+
+from chia_base.atoms import bytes32, uint64
+from chia_base.cbincode import (
+    CodecRegistry,
+    from_bytes,
+    make_parser,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.core import Coin
+from chia_base.meta.typing import GenericAlias
+
+
+def test_registry_caches():
+    assert make_parser(Coin) is make_parser(Coin)
+    assert make_streamer(List[Coin]) is make_streamer(List[Coin])
+    assert make_parser(List[bytes]) is make_parser(List[bytes])
+    assert make_parser(Coin) is not make_parser(List[Coin])
+
+    registry = CodecRegistry()
+    built = []
+
+    def factory(t):
+        built.append(t)
+        return lambda: t
+
+    for _ in range(3):
+        registry.get("parse", Coin, factory)
+        registry.get("parse", List[Coin], factory)
+        registry.get("parse", List[uint64], factory)
+        registry.get("parse", List[bytes], factory)
+    assert built == [Coin, List[Coin], List[uint64], List[bytes]]
+    assert registry.stats() == dict(hits=8, misses=4, size=4)
+    registry.clear()
+    assert registry.stats() == dict(hits=0, misses=0, size=0)
+
+
+def test_registry_weak():
+    registry = CodecRegistry()
+
+    @dataclass
+    class Temp:
+        a: uint64
+
+    registry.get("parse", Temp, make_parser)
+    # `typing.List[Temp]` would be kept alive by `typing`'s own cache
+    registry.get("parse", GenericAlias(list, (Temp,)), make_parser)
+    assert registry.size() == 2
+    assert from_bytes(Temp, to_bytes(Temp(uint64(5)))) == Temp(uint64(5))
+
+    temp_ref = weakref.ref(Temp)
+    del Temp
+    gc.collect()
+    assert temp_ref() is None
+    assert registry.size() == 0
+
+
+def test_registry_weak_composite():
+    # a codec for a generic whose first argument is an atom must not be stored on
+    # the atom, or it would keep `Temp` alive forever
+    registry = CodecRegistry()
+
+    @dataclass
+    class Temp:
+        a: uint64
+
+    for t in [
+        GenericAlias(tuple, (bytes32, Temp)),
+        GenericAlias(tuple, (Temp, bytes32)),
+        GenericAlias(list, (GenericAlias(tuple, (uint64, Temp, Coin)),)),
+    ]:
+        registry.get("parse", t, make_parser)
+    assert registry.size() == 3
+    assert registry.get("parse", Tuple[bytes32, Coin], make_parser)
+
+    temp_ref = weakref.ref(Temp)
+    del Temp, t
+    gc.collect()
+    assert temp_ref() is None
+    assert registry.size() == 1
+
+
+def test_registry_composite_hit(monkeypatch):
+    # a hit on a composite type doesn't walk the type to find its owner again
+    registry = CodecRegistry()
+    t = List[Coin]
+    parse = registry.get("parse", t, make_parser)
+
+    def fail(t):
+        raise AssertionError("owner looked up again")
+
+    monkeypatch.setattr("chia_base.cbincode.registry._owner_for_type", fail)
+    assert registry.get("parse", t, make_parser) is parse
+    assert registry.get("parse", t, make_parser) is parse
+
+
+def test_registry_threads():
+    registry = CodecRegistry()
+    results = []
+
+    def work():
+        results.append(registry.get("stream", List[Coin], make_streamer))
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 8
+    assert all(r is results[0] for r in results)
@@ -0,0 +1,189 @@
+import dataclasses
+import gc
+import io
+import weakref
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+from chia_base.atoms import uint64
+from chia_base.cbincode import (
+    from_bytes,
+    make_buffer_parser,
+    make_buffer_streamer,
+    make_compiled_streamer,
+    make_streamer,
+    serialized_size,
+    to_bytes,
+)
+from chia_base.cbincode.retain import (
+    _SOURCES,
+    retains_source,
+    set_source,
+    source_bytes,
+)
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+from samples import sample_bundle
+
+
+@dataclass
+class Mutable:
+    memo: bytes
+
+
+@dataclass(frozen=True)
+class Slotted:
+    __slots__ = ("memo",)
+    memo: bytes
+
+
+@dataclass(frozen=True)
+class Holder:
+    spend: CoinSpend
+    memos: List[bytes]
+
+
+@dataclass(frozen=True)
+class Nested:
+    lists: List[List[bytes]]
+    tail: Tuple[uint64, List[bytes]]
+
+
+@dataclass(frozen=True)
+class MutableHolder:
+    inner: Mutable
+    memos: List[bytes]
+
+
+def test_retains_source():
+    assert retains_source(SpendBundle)
+    assert retains_source(CoinSpend)
+    assert retains_source(Holder)
+    # fixed size, not frozen, or no weak references
+    assert not retains_source(Coin)
+    assert not retains_source(Mutable)
+    assert not retains_source(Slotted)
+    assert not retains_source(List[CoinSpend])
+    # holds a `dataclass` that can change in place
+    assert not retains_source(MutableHolder)
+
+
+def test_retained_source():
+    bundle = sample_bundle()
+    blob = to_bytes(bundle)
+    assert source_bytes(from_bytes(SpendBundle, blob)) is None
+
+    retained = from_bytes(SpendBundle, blob, retain=True)
+    assert retained == bundle
+    assert source_bytes(retained) == blob
+    assert to_bytes(retained) is source_bytes(retained)
+    # only the outermost object keeps the bytes
+    for coin_spend in retained.coin_spends:
+        assert source_bytes(coin_spend) is None
+        assert source_bytes(coin_spend.coin) is None
+
+    assert std_hash(to_bytes(retained)) == std_hash(blob)
+    assert make_buffer_parser(SpendBundle, trusted=True, retain=True)(blob)[0] == bundle
+
+
+def test_streamers_use_source():
+    bundle = sample_bundle()
+    blob = to_bytes(bundle)
+    retained = from_bytes(SpendBundle, blob, retain=True)
+
+    # prove the source is what's written by swapping in different bytes
+    fake = b"\x01" * 7
+    set_source(retained, fake)
+    f = io.BytesIO()
+    make_streamer(SpendBundle)(retained, f)
+    assert f.getvalue() == fake
+    f = io.BytesIO()
+    make_compiled_streamer(SpendBundle)(retained, f)
+    assert f.getvalue() == fake
+    buf = bytearray(10)
+    assert make_buffer_streamer(SpendBundle)(retained, buf, 2) == 9
+    assert buf[2:9] == fake
+
+    # nested retained objects, inside an object that isn't
+    holder = Holder(retained.coin_spends[1], [b"a", b"bc"])
+    set_source(retained.coin_spends[1], fake)
+    f = io.BytesIO()
+    make_streamer(List[bytes])(holder.memos, f)
+    expected = fake + f.getvalue()
+    for stream in (make_streamer(Holder), make_compiled_streamer(Holder)):
+        f = io.BytesIO()
+        stream(holder, f)
+        assert f.getvalue() == expected
+
+
+def test_round_trip_nested():
+    bundle = sample_bundle()
+    holder = Holder(bundle.coin_spends[0], [b"x", b"yz"])
+    blob = to_bytes(holder)
+    retained = from_bytes(Holder, blob, retain=True)
+    assert source_bytes(retained) == blob
+    assert source_bytes(retained.spend) is None
+    for stream in (make_streamer(Holder), make_compiled_streamer(Holder)):
+        f = io.BytesIO()
+        stream(retained, f)
+        assert f.getvalue() == blob
+    assert serialized_size(retained) == len(blob)
+
+
+def test_replace_drops_source():
+    blob = to_bytes(sample_bundle())
+    retained = from_bytes(SpendBundle, blob, retain=True)
+    coin_spends = retained.coin_spends[:2]
+    changed = dataclasses.replace(retained, coin_spends=coin_spends)
+    assert source_bytes(changed) is None
+    assert to_bytes(changed) != blob
+    assert from_bytes(SpendBundle, to_bytes(changed)).coin_spends == coin_spends
+
+
+def test_sources_dropped_with_object():
+    blob = to_bytes(sample_bundle())
+    retained = from_bytes(SpendBundle, blob, retain=True)
+    count = len(_SOURCES)
+    retained_ref = weakref.ref(retained)
+    del retained
+    gc.collect()
+    assert retained_ref() is None
+    assert len(_SOURCES) < count
+
+
+def test_changed_list_drops_source():
+    bundle = sample_bundle()
+    blob = to_bytes(bundle)
+
+    retained = from_bytes(SpendBundle, blob, retain=True)
+    retained.coin_spends.append(bundle.coin_spends[0])
+    assert source_bytes(retained) is None
+    assert from_bytes(SpendBundle, to_bytes(retained)) == retained
+
+    # same length, different item
+    retained = from_bytes(SpendBundle, blob, retain=True)
+    retained.coin_spends[0] = bundle.coin_spends[2]
+    for stream in (make_streamer(SpendBundle), make_compiled_streamer(SpendBundle)):
+        f = io.BytesIO()
+        stream(retained, f)
+        assert from_bytes(SpendBundle, f.getvalue()) == retained
+    assert to_bytes(retained) != blob
+
+    # lists inside lists and tuples are checked too
+    nested = Nested([[b"a"], [b"b", b"c"]], (uint64(1), [b"d"]))
+    retained_nested = from_bytes(Nested, to_bytes(nested), retain=True)
+    assert source_bytes(retained_nested) == to_bytes(nested)
+    retained_nested.tail[1].append(b"e")
+    assert source_bytes(retained_nested) is None
+    assert from_bytes(Nested, to_bytes(retained_nested)) == retained_nested
+
+
+def test_list_of_retained():
+    bundle = sample_bundle()
+    f = io.BytesIO()
+    make_streamer(List[SpendBundle])([bundle, bundle], f)
+    bundles = make_buffer_parser(List[SpendBundle], retain=True)(f.getvalue())[0]
+    assert [source_bytes(_) for _ in bundles] == [to_bytes(bundle)] * 2
@@ -0,0 +1,172 @@
+import hashlib
+import io
+import os
+import socket
+
+from typing import List
+
+
+from chia_base.cbincode import (
+    BufferSink,
+    HashSink,
+    SegmentSink,
+    cbincode_hash,
+    from_bytes,
+    make_compiled_streamer,
+    make_streamer,
+    to_bytes,
+)
+from chia_base.core import Coin, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+from samples import sample_bundle
+
+
+def test_hash_sink():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    for stream in (make_streamer(SpendBundle), make_compiled_streamer(SpendBundle)):
+        sink = HashSink()
+        stream(bundle, sink)
+        assert sink.tell() == len(blob)
+        assert sink.digest() == std_hash(blob)
+        assert sink.hexdigest() == std_hash(blob).hex()
+
+    sink = HashSink(hashlib.blake2b())
+    make_streamer(SpendBundle)(bundle, sink)
+    assert sink.digest() == hashlib.blake2b(blob).digest()
+
+
+def test_hash_sink_tee():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    f = io.BytesIO()
+    sink = HashSink(tee=f)
+    make_streamer(SpendBundle)(bundle, sink)
+    assert f.getvalue() == blob
+    assert sink.digest() == std_hash(blob)
+
+    left, right = socket.socketpair()
+    with left, right:
+        sink = HashSink(tee=left)
+        make_compiled_streamer(Coin)(bundle.coin_spends[0].coin, sink)
+        assert right.recv(100) == to_bytes(bundle.coin_spends[0].coin)
+
+
+def test_cbincode_hash():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    assert cbincode_hash(bundle) == std_hash(blob)
+    assert cbincode_hash(from_bytes(SpendBundle, blob, retain=True)) == std_hash(blob)
+    coin = bundle.coin_spends[0].coin
+    assert cbincode_hash(coin) == std_hash(to_bytes(coin))
+    coins = [_.coin for _ in bundle.coin_spends]
+    f = io.BytesIO()
+    make_streamer(List[Coin])(coins, f)
+    assert cbincode_hash(coins, List[Coin]) == std_hash(f.getvalue())
+
+
+class RecordingHashSink(HashSink):
+    "a `HashSink` that notes the largest write"
+
+    instances: List["RecordingHashSink"] = []
+
+    def __init__(self):
+        super().__init__()
+        self.largest = 0
+        self.instances.append(self)
+
+    def write(self, data) -> int:
+        self.largest = max(self.largest, len(data))
+        return super().write(data)
+
+
+def test_cbincode_hash_writes_piece_by_piece(monkeypatch):
+    # the serialization is never held in memory all at once
+    monkeypatch.setattr("chia_base.cbincode.util.HashSink", RecordingHashSink)
+    bundle = sample_bundle(5)
+    bundle = SpendBundle(bundle.coin_spends * 40, bundle.aggregated_signature)
+    blob = to_bytes(bundle)
+    assert cbincode_hash(bundle) == std_hash(blob)
+    (sink,) = RecordingHashSink.instances
+    assert sink.tell() == len(blob)
+    # the signature is the largest single value
+    assert sink.largest == 96
+
+
+def test_segment_sink():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    big = bytes(range(256)) * 20
+    for stream in (make_streamer(SpendBundle), make_compiled_streamer(SpendBundle)):
+        sink = SegmentSink()
+        stream(bundle, sink)
+        assert sink.tell() == len(blob)
+        assert sink.getvalue() == blob
+
+    sink = SegmentSink()
+    make_streamer(List[bytes])([b"a", big, b"bc"], sink)
+    segments = sink.segments()
+    assert len(segments) == 3
+    assert segments[1] is big
+    f = io.BytesIO()
+    make_streamer(List[bytes])([b"a", big, b"bc"], f)
+    assert b"".join(segments) == f.getvalue()
+    sink.clear()
+    assert sink.tell() == 0 and sink.segments() == []
+
+
+def test_segment_sink_writev():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    big = bytes(range(256)) * 20
+    sink = SegmentSink(min_segment_size=16)
+    make_streamer(SpendBundle)(bundle, sink)
+    sink.write(big)
+    r, w = os.pipe()
+    try:
+        assert sink.writev(w) == len(blob) + len(big)
+        assert sink.tell() == 0
+        assert os.read(r, 100000) == blob + big
+    finally:
+        os.close(r)
+        os.close(w)
+
+    left, right = socket.socketpair()
+    with left, right:
+        make_compiled_streamer(SpendBundle)(bundle, sink)
+        assert sink.sendmsg(left) == len(blob)
+        assert right.recv(100000) == blob
+
+
+def test_segment_sink_partial_writes():
+    sink = SegmentSink(min_segment_size=4)
+    for _ in range(10):
+        sink.write(b"abcdef")
+    received = []
+
+    def send_three(buffers):
+        # like a `writev` that gets interrupted
+        data = b"".join(buffers)[:3]
+        received.append(data)
+        return len(data)
+
+    assert sink._send(send_three) == 60
+    assert b"".join(received) == b"abcdef" * 10
+
+
+def test_buffer_sink():
+    bundle = sample_bundle(5)
+    blob = to_bytes(bundle)
+    sink = BufferSink()
+    make_streamer(SpendBundle)(bundle, sink)
+    assert sink.getvalue() == blob
+    buffer = sink._buffer
+    sink.clear()
+    coin = bundle.coin_spends[0].coin
+    make_compiled_streamer(type(coin))(coin, sink)
+    assert sink.tell() == 72
+    assert sink.getvalue() == to_bytes(coin)
+    # the memory is reused
+    assert sink._buffer is buffer and len(buffer) == len(blob)
+    assert bytes(sink.getbuffer()) == to_bytes(coin)
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import io
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import bytes32, uint8, uint64
+from chia_base.bls12_381 import BLSSecretExponent, BLSSignature
+from chia_base.cbincode import (
+    make_buffer_streamer,
+    make_sizer,
+    make_streamer,
+    serialized_size,
+    to_bytes,
+)
+from chia_base.cbincode.sizer import sizer_for_type
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+@dataclass
+class Record:
+    flag: uint8
+    coin: Coin
+    memo: bytes
+    tags: List[Optional[str]]
+    pair: Tuple[uint64, Program]
+    signature: BLSSignature
+
+
+def sample_record():
+    coin = Coin(std_hash(b"1"), std_hash(b"2"), uint64(1000))
+    sig = BLSSecretExponent.from_int(1).sign(b"foo")
+    pair = (uint64(7), Program.to([1, 2]))
+    return Record(1, coin, b"memo", ["a", None, "ü"], pair, sig)
+
+
+def reference_bytes(obj):
+    f = io.BytesIO()
+    make_streamer(type(obj))(obj, f)
+    return f.getvalue()
+
+
+def test_constant_sizes():
+    assert sizer_for_type(bytes32).size == 32
+    assert sizer_for_type(uint64).size == 8
+    assert sizer_for_type(Coin).size == 72
+    assert sizer_for_type(BLSSignature).size == 96
+    assert sizer_for_type(Tuple[uint8, bytes32]).size == 33
+    assert sizer_for_type(CoinSpend).size is None
+    assert sizer_for_type(List[Coin]).size is None
+
+
+def test_serialized_size():
+    record = sample_record()
+    coin_spend = CoinSpend(record.coin, Program.to(1), Program.to([5, 6]))
+    bundle = SpendBundle([coin_spend] * 3, record.signature)
+    for obj in (record, record.coin, coin_spend, bundle):
+        assert serialized_size(obj) == len(reference_bytes(obj))
+    assert make_sizer(List[Coin])([record.coin] * 5) == 4 + 5 * 72
+
+
+def test_buffer_streamer():
+    record = sample_record()
+    blob = reference_bytes(record)
+    buf = bytearray(len(blob) + 4)
+    end = make_buffer_streamer(Record)(record, buf, 2)
+    assert end == 2 + len(blob)
+    assert bytes(buf[2:end]) == blob
+    assert to_bytes(record) == blob
+
+
+def test_buffer_streamer_never_resizes():
+    record = sample_record()
+    size = serialized_size(record)
+    buf = bytearray(size - 1)
+    with pytest.raises(ValueError):
+        make_buffer_streamer(Record)(record, buf, 0)
+    assert len(buf) == size - 1
+    with pytest.raises(ValueError):
+        make_buffer_streamer(bytes32)(b"short", bytearray(32), 0)
@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import pytest
+
+from clvm_rs import Program  # type: ignore
+
+from chia_base.atoms import bytes32, uint8, uint64
+from chia_base.bls12_381 import BLSPublicKey, BLSSecretExponent, BLSSignature
+from chia_base.cbincode import from_bytes, make_buffer_parser, to_bytes
+from chia_base.core import Coin, CoinSpend, SpendBundle
+from chia_base.util.std_hash import std_hash
+
+
+@dataclass(frozen=True)
+class Record:
+    flag: uint8
+    keys: List[BLSPublicKey]
+    secret: BLSSecretExponent
+    memo: Optional[bytes]
+    pair: Tuple[str, bytes32]
+    bundle: SpendBundle
+
+
+@dataclass
+class Checked:
+    amount: uint64
+
+    def __post_init__(self):
+        if self.amount > 100:
+            raise ValueError("too much")
+
+
+@dataclass(frozen=True)
+class Slotted:
+    __slots__ = ("amount", "memo")
+    amount: uint64
+    memo: bytes
+
+
+def sample_objects():
+    secret = BLSSecretExponent.from_int(7)
+    coin = Coin(std_hash(b"1"), std_hash(b"2"), uint64(1000))
+    spend = CoinSpend(coin, Program.to([1, 2]), Program.to([3, [4]]))
+    bundle = SpendBundle([spend, spend], secret.sign(b"foo"))
+    keys = [secret.public_key(), BLSPublicKey.generator()]
+    record = Record(3, keys, secret, None, ("hi", std_hash(b"3")), bundle)
+    slotted = Slotted(uint64(5), b"memo")
+    signature = bundle.aggregated_signature
+    return [coin, spend, bundle, record, keys[0], signature, slotted]
+
+
+@pytest.mark.parametrize("obj", sample_objects())
+def test_strict_trusted_equivalence(obj):
+    cls = type(obj)
+    blob = to_bytes(obj)
+    strict = from_bytes(cls, blob)
+    trusted = from_bytes(cls, blob, trusted=True)
+    assert strict == trusted == obj
+    assert type(trusted) is cls
+    assert to_bytes(trusted) == blob
+
+
+def test_trusted_skips_init():
+    original = sample_objects()[0]
+    coin = from_bytes(Coin, to_bytes(original), trusted=True)
+    with pytest.raises(AttributeError):
+        coin.amount = 5
+    assert hash(coin) == hash(original)
+    assert coin.name() == original.name()
+    # classes with `__post_init__` still go through `__init__`
+    with pytest.raises(ValueError):
+        from_bytes(Checked, to_bytes(uint64(500)), trusted=True)
+
+
+def test_trusted_truncated():
+    blob = to_bytes(sample_objects()[-1])
+    parse = make_buffer_parser(BLSSignature, trusted=True)
+    with pytest.raises(ValueError):
+        parse(blob[:-1])